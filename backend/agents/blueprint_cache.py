@@ -0,0 +1,209 @@
+"""
+Blueprint Cache
+Goal-keyed LRU/TTL cache with single-flight coalescing in front of the planner.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from schemas.workflow import WorkflowBlueprint
+from services.cancellation import CancelToken, PlanCancelled
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION_RE = re.compile(r"[\s.!?,;:]+$")
+
+# How often a caller waiting on another caller's run checks its own cancel token
+CANCEL_POLL_SECONDS = 0.25
+
+
+def normalize_goal(goal: str) -> str:
+    """Collapse case, whitespace and trailing punctuation so trivial re-wordings share a key"""
+    normalized = _WHITESPACE_RE.sub(" ", goal.strip().lower())
+    return _TRAILING_PUNCTUATION_RE.sub("", normalized)
+
+
+def hash_context(context: Optional[Dict[str, Any]]) -> str:
+    """Canonical hash of the request context (key order does not matter)"""
+    canonical = json.dumps(context or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(goal: str, context: Optional[Dict[str, Any]] = None, variant: str = "") -> str:
+    """Build the cache key for a goal/context pair (and planner variant, e.g. mode)"""
+    return f"{variant}|{normalize_goal(goal)}|{hash_context(context)}"
+
+
+def fresh_copy(blueprint: WorkflowBlueprint, goal: Optional[str] = None) -> WorkflowBlueprint:
+    """Copy a shared blueprint, giving it a new id and (optionally) the caller's wording of the goal"""
+    update: Dict[str, Any] = {"workflow_id": str(uuid.uuid4())}
+    if goal is not None:
+        update["goal"] = goal
+    return blueprint.model_copy(update=update, deep=True)
+
+
+class _InFlight:
+    """A planning run that other callers with the same key can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[WorkflowBlueprint] = None
+        self.error: Optional[BaseException] = None
+
+
+class BlueprintCache:
+    """
+    Thread-safe LRU cache of planned blueprints.
+
+    Entries expire after `ttl_seconds`. Concurrent misses for the same key are
+    coalesced so only one caller runs the planner while the others wait for
+    its result. Every returned blueprint gets a fresh `workflow_id`.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, WorkflowBlueprint]]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_plan(
+        self,
+        goal: str,
+        context: Optional[Dict[str, Any]],
+        plan: Callable[[], Tuple[WorkflowBlueprint, bool]],
+        variant: str = "",
+        cancel: Optional[CancelToken] = None
+    ) -> WorkflowBlueprint:
+        """
+        Return a cached blueprint for the goal, or run `plan` to produce one.
+
+        Args:
+            goal: Natural language goal
+            context: Request context, hashed into the key
+            plan: Callable returning (blueprint, cacheable). Results flagged as
+                not cacheable (e.g. quota fallbacks) are shared with waiting
+                callers but not stored.
+            variant: Kept apart in the key, e.g. the planner mode
+            cancel: Token of this caller. A waiting caller stops waiting when
+                its own token is cancelled, and runs the plan itself if the
+                run it was waiting on was cancelled.
+
+        Returns:
+            A copy of the blueprint with a fresh workflow_id
+        """
+        if self.max_entries <= 0:
+            blueprint, _ = plan()
+            return blueprint
+
+        key = make_cache_key(goal, context, variant)
+
+        while True:
+            with self._lock:
+                cached = self._lookup(key)
+                if cached is not None:
+                    self.hits += 1
+                    return fresh_copy(cached, goal)
+
+                waiter = self._in_flight.get(key)
+                if waiter is not None:
+                    self.coalesced += 1
+                    leader = False
+                else:
+                    self.misses += 1
+                    waiter = _InFlight()
+                    self._in_flight[key] = waiter
+                    leader = True
+
+            if leader:
+                break
+            while not waiter.done.wait(CANCEL_POLL_SECONDS if cancel is not None else None):
+                cancel.check()
+            if isinstance(waiter.error, PlanCancelled):
+                # Another caller's run was abandoned; this one still wants the plan
+                continue
+            if waiter.error is not None:
+                raise waiter.error
+            return fresh_copy(waiter.result, goal)
+
+        try:
+            blueprint, cacheable = plan()
+        except BaseException as e:
+            waiter.error = e
+            with self._lock:
+                self._in_flight.pop(key, None)
+            waiter.done.set()
+            raise
+
+        waiter.result = blueprint
+        with self._lock:
+            if cacheable:
+                self._store(key, blueprint)
+            self._in_flight.pop(key, None)
+        waiter.done.set()
+        return blueprint
+
+    def peek(self, goal: str, context: Optional[Dict[str, Any]], variant: str = "") -> Optional[WorkflowBlueprint]:
+        """A copy of the cached blueprint for the goal, or None (never plans)"""
+        if self.max_entries <= 0:
+            return None
+        key = make_cache_key(goal, context, variant)
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is None:
+                return None
+            self.hits += 1
+        return fresh_copy(cached, goal)
+
+    def clear(self) -> None:
+        """Drop all cached entries (in-flight runs are unaffected)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters used to size the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "in_flight": len(self._in_flight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
+
+    def _lookup(self, key: str) -> Optional[WorkflowBlueprint]:
+        """Return a live entry and mark it most recently used (lock held)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, blueprint = entry
+        if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return blueprint
+
+    def _store(self, key: str, blueprint: WorkflowBlueprint) -> None:
+        """Insert an entry, evicting the least recently used ones (lock held)"""
+        self._entries[key] = (time.monotonic(), blueprint.model_copy(deep=True))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,59 @@
+"""
+Crew LLM
+CrewAI LLM backed by one of the planner's ChatOpenAI clients. CrewAI turns any
+non-CrewAI `llm=` into its own LiteLLM client, keeping only the model name,
+temperature and key; wrapping the ChatOpenAI client keeps crew calls on the
+same path as the fast planner: prompt cache, metrics callbacks, the
+rate-limited HTTP transport (with its cancel checks) and max_retries=0.
+"""
+from typing import Any, Dict, List, Optional, Union
+
+# Context windows of the models the planner is normally run with; others get the smallest
+CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+
+def context_window(model: str) -> int:
+    """Context window of a model; dated names use their base model's"""
+    matches = [name for name in CONTEXT_WINDOWS if model == name or model.startswith(name + "-")]
+    return CONTEXT_WINDOWS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_WINDOW
+
+
+def make_crew_llm(chat: Any, model: str, temperature: Optional[float] = None) -> Any:
+    """Build the CrewAI LLM around `chat` (CrewAI is imported lazily with the agents)"""
+    from crewai import BaseLLM
+
+    class CrewChatLLM(BaseLLM):
+        def __init__(self):
+            super().__init__(model=model, temperature=temperature)
+            self.chat = chat
+
+        def call(
+            self,
+            messages: Union[str, List[Dict[str, str]]],
+            tools: Optional[List[dict]] = None,
+            callbacks: Optional[List[Any]] = None,
+            available_functions: Optional[Dict[str, Any]] = None,
+            **kwargs: Any
+        ) -> str:
+            # CrewAI's callbacks are LiteLLM-style; metrics come from the client's own handler
+            response = self.chat.invoke(messages, stop=self.stop or None)
+            return response.content
+
+        def supports_function_calling(self) -> bool:
+            # The planner agents have no tools
+            return False
+
+        def supports_stop_words(self) -> bool:
+            return True
+
+        def get_context_window_size(self) -> int:
+            return context_window(model)
+
+    return CrewChatLLM()
@@ -0,0 +1,199 @@
+"""
+Crew Pool
+Prebuilt planner crews, checked out by one planner run at a time. Each crew
+has its own agents, LLM clients, tasks and Crew object, built once from
+prompt templates and reset after every run, so concurrent runs never share
+mutable agent state and no run pays for building them.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from services.cancellation import CancelToken
+
+# How often a run waiting for a free crew re-checks its cancel token
+CHECKOUT_POLL_SECONDS = 0.25
+
+
+class PlannerCrew:
+    """
+    One reusable crew. Task descriptions are templates filled from the
+    kickoff inputs, so the same Task objects serve every goal.
+    """
+
+    def __init__(self, crew: Any, agents: List[Any], tasks: List[Any]):
+        self.crew = crew
+        self.agents = agents
+        self.tasks = tasks
+        self.runs = 0
+
+    def run(
+        self,
+        inputs: Dict[str, Any],
+        step_callback: Optional[Callable[[Any], None]] = None,
+        task_callback: Optional[Callable[[Any], None]] = None
+    ) -> Any:
+        """kickoff() with this run's inputs and callbacks, resetting the crew afterwards"""
+        self.crew.step_callback = step_callback
+        self.crew.task_callback = task_callback
+        try:
+            return self.crew.kickoff(inputs=inputs)
+        finally:
+            self.runs += 1
+            self.reset()
+
+    def reset(self) -> None:
+        """Drop per-run state: CrewAI copies the crew callbacks onto tasks and agents that have none"""
+        self.crew.step_callback = None
+        self.crew.task_callback = None
+        for task in self.tasks:
+            task.callback = None
+            task.output = None
+        for agent in self.agents:
+            agent.step_callback = None
+
+
+class CrewPool:
+    """
+    Fixed-size pool of PlannerCrews, built on demand (or all at once by
+    warm_up()). A crew whose run raised is discarded and rebuilt later
+    rather than reused in an unknown state.
+
+    Args:
+        factory: Builds one PlannerCrew
+        size: Most crews in existence, i.e. concurrent deep-mode runs
+    """
+
+    def __init__(self, factory: Callable[[], PlannerCrew], size: int = 4):
+        self.factory = factory
+        self.size = max(1, size)
+        self._idle: List[PlannerCrew] = []
+        self._built = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        # Metrics (guarded by _cond)
+        self.builds = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.discarded = 0
+        self.max_in_use = 0
+        self._waited_seconds = 0.0
+
+    def warm_up(self) -> int:
+        """Build crews until the pool is full; returns how many were built"""
+        built = 0
+        while self._reserve():
+            try:
+                crew = self._build()
+            except BaseException:
+                with self._cond:
+                    self._built -= 1
+                raise
+            self._add(crew)
+            built += 1
+        return built
+
+    @contextmanager
+    def checkout(self, cancel: Optional[CancelToken] = None) -> Iterator[PlannerCrew]:
+        """
+        Take an idle crew (building one if the pool is not full yet), waiting
+        for one to be returned otherwise.
+
+        Raises:
+            PlanCancelled: if `cancel` is cancelled while waiting
+        """
+        crew = self._acquire(cancel)
+        try:
+            yield crew
+        except BaseException:
+            self._release(crew, discard=True)
+            raise
+        self._release(crew, discard=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "size": self.size,
+                "built": self._built,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "utilization": self._in_use / self.size,
+                "max_in_use": self.max_in_use,
+                "builds": self.builds,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "waited_seconds": round(self._waited_seconds, 3),
+                "discarded": self.discarded,
+            }
+
+    def _acquire(self, cancel: Optional[CancelToken]) -> PlannerCrew:
+        started = None
+        with self._cond:
+            while True:
+                if cancel is not None:
+                    try:
+                        cancel.check()
+                    except BaseException:
+                        if started is not None:
+                            self._waited_seconds += time.monotonic() - started
+                        raise
+                if self._idle:
+                    crew = self._idle.pop()
+                    break
+                if self._built < self.size:
+                    self._built += 1
+                    crew = None
+                    break
+                if started is None:
+                    started = time.monotonic()
+                    self.waits += 1
+                self._cond.wait(CHECKOUT_POLL_SECONDS if cancel is not None else None)
+            self._checked_out(started)
+        if crew is None:
+            try:
+                crew = self._build()
+            except BaseException:
+                with self._cond:
+                    self._built -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+        return crew
+
+    def _checked_out(self, started: Optional[float]) -> None:
+        """Update counters for a checkout (lock held)"""
+        self.checkouts += 1
+        self._in_use += 1
+        self.max_in_use = max(self.max_in_use, self._in_use)
+        if started is not None:
+            self._waited_seconds += time.monotonic() - started
+
+    def _release(self, crew: PlannerCrew, discard: bool) -> None:
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                self._built -= 1
+                self.discarded += 1
+            else:
+                self._idle.append(crew)
+            self._cond.notify()
+
+    def _reserve(self) -> bool:
+        with self._cond:
+            if self._built >= self.size:
+                return False
+            self._built += 1
+            return True
+
+    def _add(self, crew: PlannerCrew) -> None:
+        with self._cond:
+            self._idle.append(crew)
+            self._cond.notify()
+
+    def _build(self) -> PlannerCrew:
+        crew = self.factory()
+        with self._cond:
+            self.builds += 1
+        return crew
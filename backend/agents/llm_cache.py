@@ -0,0 +1,182 @@
+"""
+LLM Cache
+File-backed prompt/response cache plugged into ChatOpenAI through LangChain's
+cache interface, with size-based eviction and per-stage hit counters.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from services.metrics import metrics
+
+
+LLM_CACHE_REQUESTS = metrics.counter(
+    "llm_cache_requests_total",
+    "LLM prompt cache lookups by planner stage and outcome",
+    ["stage", "outcome"]
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+)
+"""
+
+# Refresh an entry's LRU timestamp at most this often, to keep hits read-mostly
+_TOUCH_INTERVAL_SECONDS = 60.0
+
+
+class DiskLLMCache:
+    """
+    SQLite-backed store of serialized LLM responses.
+
+    Keys hash the model configuration string LangChain builds (model name,
+    temperature and other call parameters) together with the exact prompt
+    messages. When the stored bytes exceed `max_bytes`, the least recently
+    used entries are evicted down to 90% of the limit.
+    """
+
+    def __init__(self, path: str = "llm_cache.db", max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(_SCHEMA)
+        conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+        conn.commit()
+        row = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        self._entries, self._bytes = row
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        """Cache key for a prompt under a model configuration"""
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Serialized response for a key, or None"""
+        conn = self._connection()
+        row = conn.execute("SELECT value, last_access FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        value, last_access = row
+        now = time.time()
+        if now - last_access > _TOUCH_INTERVAL_SECONDS:
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        """Store a serialized response, evicting old entries if over budget"""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        conn = self._connection()
+        with self._lock:
+            previous = conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time())
+            )
+            if previous is None:
+                self._entries += 1
+                self._bytes += size
+            else:
+                self._bytes += size - previous[0]
+            self.writes += 1
+            if self._bytes > self.max_bytes:
+                self._evict(conn, int(self.max_bytes * 0.9))
+            conn.commit()
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        conn = self._connection()
+        with self._lock:
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+            self._entries = 0
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit-rate counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _evict(self, conn: sqlite3.Connection, target_bytes: int) -> None:
+        """Delete least recently used entries until under `target_bytes` (lock held)"""
+        rows = conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._bytes <= target_bytes:
+                break
+            doomed.append((key,))
+            self._bytes -= size
+            self._entries -= 1
+        conn.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+def make_stage_cache(store: DiskLLMCache, stage: str) -> Any:
+    """
+    LangChain BaseCache view of the shared store that attributes hits and
+    misses to one planner stage (LangChain is imported lazily with the LLM).
+    """
+    from langchain_core.caches import BaseCache
+    from langchain_core.load import dumps, loads
+
+    class StageLLMCache(BaseCache):
+        def lookup(self, prompt: str, llm_string: str) -> Any:
+            value = store.get(store.make_key(prompt, llm_string))
+            if value is None:
+                LLM_CACHE_REQUESTS.inc(stage=stage, outcome="miss")
+                return None
+            try:
+                generations = loads(value)
+            except Exception:
+                LLM_CACHE_REQUESTS.inc(stage=stage, outcome="miss")
+                return None
+            LLM_CACHE_REQUESTS.inc(stage=stage, outcome="hit")
+            return generations
+
+        def update(self, prompt: str, llm_string: str, return_val: Any) -> None:
+            store.put(store.make_key(prompt, llm_string), dumps(list(return_val)))
+
+        def clear(self, **kwargs: Any) -> None:
+            store.clear()
+
+    return StageLLMCache()
@@ -0,0 +1,319 @@
+"""
+LLM Client
+Shared HTTP layer for the planner's OpenAI calls: one pooled connection set
+for every worker thread, global requests-per-minute and tokens-per-minute
+buckets kept in sync with the provider's x-ratelimit-* headers, and retries
+with jittered backoff inside a deadline.
+"""
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from services.cancellation import current_token
+from services.metrics import metrics
+
+
+LLM_THROTTLE_SECONDS = metrics.histogram(
+    "llm_throttle_wait_seconds",
+    "Time LLM requests wait for rate-limit budget before being sent"
+)
+LLM_RETRIES = metrics.counter(
+    "llm_retries_total",
+    "LLM HTTP requests retried by reason",
+    ["reason"]
+)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Completion tokens assumed when a request does not set max_tokens
+DEFAULT_COMPLETION_ESTIMATE = 512
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class LLMRateLimitExceeded(Exception):
+    """Raised when no rate-limit budget frees up before the request's deadline"""
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from OpenAI reset headers ("1s", "6m0s", "20ms") or Retry-After ("2")"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `limit` per minute (0 = unlimited)"""
+
+    def __init__(self, limit: float):
+        self.limit = max(0.0, float(limit))
+        self.level = self.limit
+        self.updated = time.monotonic()
+
+    def set_limit(self, limit: float) -> None:
+        was_unlimited = not self.limit
+        self.limit = max(0.0, float(limit))
+        self.level = self.limit if was_unlimited else min(self.level, self.limit)
+
+    def refill(self, now: float) -> None:
+        if self.limit:
+            self.level = min(self.limit, self.level + (now - self.updated) * self.limit / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (requests above capacity wait for a full bucket)"""
+        if not self.limit:
+            return 0.0
+        amount = min(amount, self.limit)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.limit
+
+    def take(self, amount: float) -> None:
+        if self.limit:
+            self.level -= min(amount, self.limit)
+
+    def sync(self, remaining: float, reset_seconds: Optional[float]) -> None:
+        """Clamp to the provider's view; never raise the level above what we track locally"""
+        if not self.limit:
+            return
+        self.level = min(self.level, remaining)
+        if reset_seconds is not None and remaining <= 0:
+            # Nothing left until the reset: the next unit frees up no earlier than that
+            self.level = min(self.level, 1.0 - reset_seconds * self.limit / 60.0)
+
+
+class LLMRateLimiter:
+    """
+    Global request and token budget shared by all planner threads.
+
+    Limits of 0 are learned from the x-ratelimit-limit-* response headers.
+    A 429 pauses every caller until the provider's reset time instead of
+    letting the other threads keep hitting the limit.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self._configured = (requests_per_minute > 0, tokens_per_minute > 0)
+        self._requests = _Bucket(requests_per_minute)
+        self._tokens = _Bucket(tokens_per_minute)
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+        # Metrics (guarded by _cond)
+        self.acquired = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.rate_limited = 0
+        self.waited_seconds = 0.0
+
+    def acquire(self, tokens: float, deadline: float) -> bool:
+        """Block until one request and `tokens` tokens are available; False if past `deadline`"""
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._requests.refill(now)
+                self._tokens.refill(now)
+                wait = max(
+                    self._paused_until - now,
+                    self._requests.wait_time(1),
+                    self._tokens.wait_time(tokens)
+                )
+                if wait <= 0:
+                    self._requests.take(1)
+                    self._tokens.take(tokens)
+                    self.acquired += 1
+                    waited = now - started
+                    if waited > 0.001:
+                        self.throttled += 1
+                        self.waited_seconds += waited
+                        LLM_THROTTLE_SECONDS.observe(waited)
+                    return True
+                if now + wait > deadline:
+                    self.timeouts += 1
+                    return False
+                self._cond.wait(wait)
+
+    def observe(self, headers: httpx.Headers) -> None:
+        """Sync the buckets with x-ratelimit-* headers from a response"""
+        with self._cond:
+            now = time.monotonic()
+            for bucket, kind, configured in (
+                (self._requests, "requests", self._configured[0]),
+                (self._tokens, "tokens", self._configured[1]),
+            ):
+                limit = _header_number(headers, f"x-ratelimit-limit-{kind}")
+                if limit and not configured and limit != bucket.limit:
+                    bucket.refill(now)
+                    bucket.set_limit(limit)
+                remaining = _header_number(headers, f"x-ratelimit-remaining-{kind}")
+                if remaining is not None:
+                    bucket.refill(now)
+                    bucket.sync(remaining, parse_duration(headers.get(f"x-ratelimit-reset-{kind}")))
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for `seconds` after the provider rejected a request"""
+        with self._cond:
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current budget levels, limits and throttling counters"""
+        with self._cond:
+            now = time.monotonic()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            return {
+                "requests_per_minute": self._requests.limit,
+                "tokens_per_minute": self._tokens.limit,
+                "requests_available": self._requests.level,
+                "tokens_available": self._tokens.level,
+                "paused_seconds": max(0.0, self._paused_until - now),
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "timeouts": self.timeouts,
+                "rate_limited": self.rate_limited,
+                "waited_seconds": self.waited_seconds,
+            }
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """
+    httpx transport that schedules each request through the rate limiter and
+    retries transient failures with full-jitter exponential backoff until
+    `deadline_seconds` after the first attempt.
+
+    429 responses whose error code is insufficient_quota are returned at
+    once: waiting will not help, and the planner falls back to the mock.
+    """
+
+    def __init__(
+        self,
+        limiter: LLMRateLimiter,
+        max_connections: int = 20,
+        deadline_seconds: float = 60.0,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0
+    ):
+        self.limiter = limiter
+        self.deadline_seconds = deadline_seconds
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._transport = httpx.HTTPTransport(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        deadline = time.monotonic() + self.deadline_seconds
+        # A planner run's own deadline also bounds the wait, retries and read timeout
+        cancel = current_token()
+        if cancel is not None:
+            cancel.check()
+            remaining = cancel.remaining()
+            if remaining is not None:
+                deadline = min(deadline, time.monotonic() + remaining)
+                timeout = dict(request.extensions.get("timeout") or {})
+                timeout["read"] = min(timeout.get("read") or remaining, remaining)
+                request.extensions["timeout"] = timeout
+        tokens = estimate_request_tokens(request)
+        attempt = 0
+        while True:
+            if cancel is not None:
+                cancel.check()
+            if not self.limiter.acquire(tokens, deadline):
+                raise LLMRateLimitExceeded(
+                    f"LLM rate limit budget not available within {self.deadline_seconds:.0f}s"
+                )
+            try:
+                response = self._transport.handle_request(request)
+            except (httpx.ConnectError, httpx.ReadTimeout, httpx.RemoteProtocolError) as e:
+                delay = self._backoff(attempt)
+                if time.monotonic() + delay > deadline:
+                    raise
+                LLM_RETRIES.inc(reason=type(e).__name__)
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            self.limiter.observe(response.headers)
+            if response.status_code not in RETRYABLE_STATUS:
+                return response
+
+            retry_after = parse_duration(response.headers.get("retry-after"))
+            if response.status_code == 429:
+                response.read()
+                if _error_code(response) == "insufficient_quota":
+                    return response
+                reset = retry_after or parse_duration(response.headers.get("x-ratelimit-reset-requests"))
+                self.limiter.pause(reset if reset is not None else self._backoff(attempt))
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            if time.monotonic() + delay > deadline:
+                return response
+            response.close()
+            LLM_RETRIES.inc(reason=str(response.status_code))
+            attempt += 1
+            if response.status_code != 429:
+                time.sleep(delay)
+            # 429s wait inside acquire(), on the shared pause
+
+    def close(self) -> None:
+        self._transport.close()
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+def estimate_request_tokens(request: httpx.Request) -> float:
+    """Rough prompt + completion token count of a chat completion request"""
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return DEFAULT_COMPLETION_ESTIMATE
+    if not isinstance(body, dict):
+        return DEFAULT_COMPLETION_ESTIMATE
+    prompt_chars = sum(len(json.dumps(m.get("content") or "")) for m in body.get("messages") or [])
+    completion = body.get("max_completion_tokens") or body.get("max_tokens") or DEFAULT_COMPLETION_ESTIMATE
+    return prompt_chars / 4 + completion
+
+
+def _header_number(headers: httpx.Headers, name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _error_code(response: httpx.Response) -> Optional[str]:
+    try:
+        error = response.json().get("error") or {}
+    except ValueError:
+        return None
+    return error.get("code") or error.get("type")
+
+
+def build_http_client(
+    limiter: LLMRateLimiter,
+    max_connections: int = 20,
+    deadline_seconds: float = 60.0,
+    timeout: float = 120.0
+) -> httpx.Client:
+    """Pooled, rate-limited client to hand to ChatOpenAI(http_client=...)"""
+    transport = RateLimitedTransport(limiter, max_connections=max_connections, deadline_seconds=deadline_seconds)
+    return httpx.Client(transport=transport, timeout=timeout)
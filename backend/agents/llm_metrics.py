@@ -0,0 +1,70 @@
+"""
+LLM Metrics
+LangChain callback handler recording latency, token usage and estimated cost
+for every call made through the planner's ChatOpenAI clients, crew agents
+included (see agents/crew_llm.py).
+"""
+import time
+from typing import Any, Dict, Tuple
+
+from services.metrics import LLM_COST, LLM_ERRORS, LLM_SECONDS, LLM_TOKENS
+
+
+# USD per 1K (prompt, completion) tokens; unknown models are not costed
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated cost of one call; dated model names use their base model's price"""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        matches = [name for name in MODEL_PRICES if model.startswith(name + "-")]
+        if not matches:
+            return 0.0
+        prices = MODEL_PRICES[max(matches, key=len)]
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1000
+
+
+def make_llm_metrics_handler(model: str) -> Any:
+    """Build the callback handler (LangChain is imported lazily with the LLM)"""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class LLMMetricsHandler(BaseCallbackHandler):
+        def __init__(self):
+            self._started: Dict[Any, float] = {}
+
+        def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: Any, **kwargs: Any) -> None:
+            self._started[run_id] = time.perf_counter()
+
+        def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: Any, **kwargs: Any) -> None:
+            self._started[run_id] = time.perf_counter()
+
+        def on_llm_end(self, response: Any, *, run_id: Any, **kwargs: Any) -> None:
+            started = self._started.pop(run_id, None)
+            if getattr(response, "llm_output", None) is None:
+                # Prompt cache hit (counted by the cache): no request was made
+                return
+            if started is not None:
+                LLM_SECONDS.observe(time.perf_counter() - started, model=model)
+            usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+            prompt_tokens = int(usage.get("prompt_tokens") or 0)
+            completion_tokens = int(usage.get("completion_tokens") or 0)
+            if prompt_tokens:
+                LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+            if completion_tokens:
+                LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+            cost = estimate_cost(model, prompt_tokens, completion_tokens)
+            if cost:
+                LLM_COST.inc(cost, model=model)
+
+        def on_llm_error(self, error: BaseException, *, run_id: Any, **kwargs: Any) -> None:
+            self._started.pop(run_id, None)
+            LLM_ERRORS.inc(model=model)
+
+    return LLMMetricsHandler()
@@ -0,0 +1,360 @@
+"""
+Mock Workflow Rules
+Declarative rule table for MOCK_MODE and the quota fallback, compiled once
+into a single-pass keyword matcher.
+"""
+from collections import deque
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Tuple
+
+from schemas.workflow import WorkflowStep
+
+
+# Each rule matches when every group in "requires" has at least one keyword in
+# the goal (substring match, case-insensitive). Among matching rules the one
+# with the highest priority wins, then the one matching the most of its
+# keywords, then the earliest in the table. Steps are chained in order; a
+# step with "when" is only included if one of those keywords is present.
+MOCK_RULES: List[Dict[str, Any]] = [
+    {
+        "name": "form_to_airtable",
+        "priority": 50,
+        "requires": [["typeform", "form"], ["airtable"]],
+        "steps": [
+            {
+                "name": "Trigger: Form Submission",
+                "description": "Detect when a form is submitted",
+                "action_type": "webhook",
+                "tool": "typeform",
+                "parameters": {"form_id": "to_be_configured"},
+            },
+            {
+                "name": "Add to Airtable",
+                "description": "Add the form data to Airtable",
+                "action_type": "api_call",
+                "tool": "airtable",
+                "parameters": {"base_id": "to_be_configured", "table": "Leads"},
+            },
+            {
+                "name": "Send Welcome Email",
+                "description": "Send a welcome email to the new lead",
+                "action_type": "api_call",
+                "tool": "sendgrid",
+                "parameters": {"template_id": "welcome_email"},
+                "when": ["email", "welcome"],
+            },
+        ],
+    },
+    {
+        # Any other goal mentioning a form stops here, as in the original
+        # if/elif chain, which produced no steps for it
+        "name": "form_other",
+        "priority": 45,
+        "requires": [["typeform", "form"]],
+        "steps": [],
+    },
+    {
+        "name": "email_to_trello",
+        "priority": 40,
+        "requires": [["email"], ["trello"]],
+        "steps": [
+            {
+                "name": "Trigger: New Email",
+                "description": "Detect incoming email from customer",
+                "action_type": "webhook",
+                "tool": "gmail",
+                "parameters": {"filter": "from:customer"},
+            },
+            {
+                "name": "Create Trello Task",
+                "description": "Create a new task in Trello board",
+                "action_type": "api_call",
+                "tool": "trello",
+                "parameters": {"board_id": "to_be_configured", "list": "Inbox"},
+            },
+        ],
+    },
+    {
+        "name": "order_inventory",
+        "priority": 30,
+        "requires": [["order", "inventory"]],
+        "steps": [
+            {
+                "name": "Trigger: New Order",
+                "description": "Detect when a new order is received",
+                "action_type": "webhook",
+                "tool": "shopify",
+                "parameters": {"event": "order.created"},
+            },
+            {
+                "name": "Update Inventory",
+                "description": "Update inventory spreadsheet",
+                "action_type": "api_call",
+                "tool": "google_sheets",
+                "parameters": {"spreadsheet_id": "to_be_configured"},
+            },
+            {
+                "name": "Notify Team",
+                "description": "Send notification to team on Slack",
+                "action_type": "api_call",
+                "tool": "slack",
+                "parameters": {"channel": "#orders"},
+                "when": ["slack", "notify"],
+            },
+        ],
+    },
+    {
+        "name": "crm_contact",
+        "priority": 20,
+        "requires": [["crm", "contact"]],
+        "steps": [
+            {
+                "name": "Trigger: New Contact",
+                "description": "Detect when a contact is added to CRM",
+                "action_type": "webhook",
+                "tool": "hubspot",
+                "parameters": {"event": "contact.created"},
+            },
+            {
+                "name": "Send Email Sequence",
+                "description": "Send personalized email sequence",
+                "action_type": "api_call",
+                "tool": "mailchimp",
+                "parameters": {"sequence_id": "welcome_sequence"},
+            },
+        ],
+    },
+    {
+        "name": "newsletter_signup",
+        "priority": 10,
+        "requires": [["newsletter", "mailchimp"]],
+        "steps": [
+            {
+                "name": "Trigger: Newsletter Subscription",
+                "description": "Detect new newsletter subscription",
+                "action_type": "webhook",
+                "tool": "website",
+                "parameters": {"endpoint": "/subscribe"},
+            },
+            {
+                "name": "Add to Mailchimp",
+                "description": "Add subscriber to Mailchimp list",
+                "action_type": "api_call",
+                "tool": "mailchimp",
+                "parameters": {"list_id": "to_be_configured"},
+            },
+            {
+                "name": "Send Welcome Series",
+                "description": "Trigger welcome email series",
+                "action_type": "api_call",
+                "tool": "mailchimp",
+                "parameters": {"automation_id": "welcome_series"},
+            },
+        ],
+    },
+]
+
+# Used when no rule matches
+DEFAULT_MOCK_RULE: Dict[str, Any] = {
+    "name": "generic",
+    "priority": 0,
+    "requires": [],
+    "steps": [
+        {
+            "name": "Trigger: Event",
+            "description": "Detect the trigger event",
+            "action_type": "webhook",
+            "tool": "generic",
+            "parameters": {},
+        },
+        {
+            "name": "Process Data",
+            "description": "Process and transform the data",
+            "action_type": "data_transform",
+            "tool": "processor",
+            "parameters": {},
+        },
+        {
+            "name": "Complete Action",
+            "description": "Complete the desired action",
+            "action_type": "api_call",
+            "tool": "integration",
+            "parameters": {},
+        },
+    ],
+}
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed keyword set.
+
+    `find` reports every keyword occurring anywhere in the text, including
+    overlapping ones ("form" inside "typeform"), in a single pass whose cost
+    does not depend on the number of keywords.
+    """
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = list(keywords)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[FrozenSet[int]] = [frozenset()]
+
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(frozenset())
+                state = next_state
+            self._output[state] = self._output[state] | {keyword_id}
+
+        # Breadth-first construction of failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] | self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> FrozenSet[int]:
+        """Return the ids of all keywords that occur in `text`"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return frozenset(found)
+
+
+class StepTemplate(NamedTuple):
+    """Immutable, prebuilt step; `when` holds keyword ids gating the step"""
+    name: str
+    description: str
+    action_type: str
+    tool: str
+    parameters: Mapping[str, Any]
+    when: Optional[FrozenSet[int]]
+
+
+class CompiledRule(NamedTuple):
+    """A rule with keywords interned to ids and its step templates prebuilt"""
+    name: str
+    priority: int
+    order: int
+    requires: Tuple[FrozenSet[int], ...]
+    keywords: FrozenSet[int]
+    templates: Tuple[StepTemplate, ...]
+
+
+class MockRuleEngine:
+    """
+    Selects and instantiates mock workflow templates for a goal.
+
+    Rules are compiled once: all keywords go into one KeywordMatcher and an
+    inverted index maps each keyword to the rules that use it, so a lookup
+    only scores rules that share a keyword with the goal.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], default_rule: Dict[str, Any]):
+        keyword_ids: Dict[str, int] = {}
+
+        def intern(keyword: str) -> int:
+            keyword = keyword.lower()
+            if keyword not in keyword_ids:
+                keyword_ids[keyword] = len(keyword_ids)
+            return keyword_ids[keyword]
+
+        def compile_rule(rule: Dict[str, Any], order: int) -> CompiledRule:
+            requires = tuple(
+                frozenset(intern(keyword) for keyword in group)
+                for group in rule.get("requires", [])
+            )
+            templates = []
+            for step in rule["steps"]:
+                when = step.get("when")
+                templates.append(StepTemplate(
+                    name=step["name"],
+                    description=step["description"],
+                    action_type=step["action_type"],
+                    tool=step["tool"],
+                    parameters=MappingProxyType(dict(step.get("parameters", {}))),
+                    when=frozenset(intern(keyword) for keyword in when) if when else None
+                ))
+            keywords = frozenset().union(*requires) if requires else frozenset()
+            return CompiledRule(
+                name=rule["name"],
+                priority=rule.get("priority", 0),
+                order=order,
+                requires=requires,
+                keywords=keywords,
+                templates=tuple(templates)
+            )
+
+        self.rules = [compile_rule(rule, order) for order, rule in enumerate(rules)]
+        self.default_rule = compile_rule(default_rule, len(self.rules))
+
+        self._rules_by_keyword: Dict[int, List[CompiledRule]] = {}
+        for rule in self.rules:
+            for keyword_id in rule.keywords:
+                self._rules_by_keyword.setdefault(keyword_id, []).append(rule)
+
+        keywords = sorted(keyword_ids, key=keyword_ids.get)
+        self.matcher = KeywordMatcher(keywords)
+
+    def select(self, goal: str) -> Tuple[CompiledRule, FrozenSet[int]]:
+        """Return the best rule for the goal and the keyword ids found in it"""
+        found = self.matcher.find(goal.lower())
+        best = self.default_rule
+        best_score = None
+        seen = set()
+        for keyword_id in found:
+            for rule in self._rules_by_keyword.get(keyword_id, ()):
+                if rule.order in seen:
+                    continue
+                seen.add(rule.order)
+                if not all(group & found for group in rule.requires):
+                    continue
+                score = (rule.priority, len(rule.keywords & found), -rule.order)
+                if best_score is None or score > best_score:
+                    best, best_score = rule, score
+        return best, found
+
+    def build_steps(self, goal: str) -> List[WorkflowStep]:
+        """Instantiate the selected rule's steps as a linked chain"""
+        rule, found = self.select(goal)
+        templates = [
+            template for template in rule.templates
+            if template.when is None or template.when & found
+        ]
+        steps = []
+        for i, template in enumerate(templates):
+            steps.append(WorkflowStep.model_construct(
+                id=f"step-{i + 1}",
+                name=template.name,
+                description=template.description,
+                action_type=template.action_type,
+                tool=template.tool,
+                parameters=dict(template.parameters),
+                next_step_id=f"step-{i + 2}" if i + 1 < len(templates) else None
+            ))
+        return steps
+
+
+# Compiled once at import
+mock_rule_engine = MockRuleEngine(MOCK_RULES, DEFAULT_MOCK_RULE)
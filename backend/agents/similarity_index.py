@@ -0,0 +1,182 @@
+"""
+Similarity Index
+Incremental TF-IDF index over hashed word n-grams of planned goals, used to
+reuse a near-identical earlier plan or to show the planner its nearest
+neighbours as few-shot examples.
+
+Postings are NumPy arrays per hashed feature, so a query touches only the
+documents sharing a term with it, and the rarest terms first: scoring is a
+single bincount over the selected postings followed by a top-k partition.
+"""
+import math
+import re
+import threading
+import zlib
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from i if in into is it me my of on or our so that the "
+    "their them then this to up us we when whenever with you your".split()
+)
+
+
+class SimilarMatch(NamedTuple):
+    key: str
+    text: str
+    score: float
+
+
+class _Postings:
+    """Growable (document id, weight) arrays for one feature"""
+
+    __slots__ = ("ids", "weights", "size")
+
+    def __init__(self):
+        self.ids = np.empty(4, dtype=np.int32)
+        self.weights = np.empty(4, dtype=np.float32)
+        self.size = 0
+
+    def append(self, doc_id: int, weight: float) -> None:
+        if self.size == len(self.ids):
+            self.ids = np.resize(self.ids, self.size * 2)
+            self.weights = np.resize(self.weights, self.size * 2)
+        self.ids[self.size] = doc_id
+        self.weights[self.size] = weight
+        self.size += 1
+
+
+def goal_features(text: str, buckets: int) -> Dict[int, int]:
+    """Hashed word unigrams and bigrams (stopwords dropped) with their counts"""
+    tokens = [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    counts: Dict[int, int] = {}
+    for gram in grams:
+        bucket = zlib.crc32(gram.encode("utf-8")) % buckets
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return counts
+
+
+class SimilarityIndex:
+    """
+    Cosine similarity over TF-IDF vectors of short texts.
+
+    Document weights use the IDF at insertion time, so adding a document
+    never rewrites older postings; query weights use the current IDF.
+    Terms found in more than `max_df` of the documents are ignored at query
+    time, and at most `max_postings` postings are scored per query (rarest
+    terms first), which keeps lookups fast at 100k+ entries. Entries are
+    never removed; once `max_entries` is reached new texts are not indexed.
+    """
+
+    def __init__(
+        self,
+        buckets: int = 1 << 20,
+        max_df: float = 0.25,
+        max_postings: int = 20000,
+        max_entries: int = 200000
+    ):
+        self.buckets = buckets
+        self.max_df = max_df
+        self.max_postings = max_postings
+        self.max_entries = max_entries
+        self._postings: Dict[int, _Postings] = {}
+        self._keys: List[str] = []
+        self._texts: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.postings = 0
+        self.queries = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: str, text: str) -> bool:
+        """Index `text` under `key`; False if the key is already indexed or the index is full"""
+        features = goal_features(text, self.buckets)
+        with self._lock:
+            if key in self._positions or len(self._keys) >= self.max_entries:
+                return False
+            doc_id = len(self._keys)
+            weights = {
+                feature: (1.0 + math.log(count)) * self._idf(feature, doc_id + 1)
+                for feature, count in features.items()
+            }
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for feature, weight in weights.items():
+                postings = self._postings.get(feature)
+                if postings is None:
+                    postings = self._postings[feature] = _Postings()
+                postings.append(doc_id, weight / norm)
+            self.postings += len(weights)
+            self._keys.append(key)
+            self._texts.append(text)
+            self._positions[key] = doc_id
+            return True
+
+    def search(self, text: str, k: int = 3, min_score: float = 0.0) -> List[SimilarMatch]:
+        """The `k` most similar indexed texts, best first"""
+        features = goal_features(text, self.buckets)
+        with self._lock:
+            self.queries += 1
+            total = len(self._keys)
+            if not total or not features:
+                return []
+            # The norm covers every query term, so skipped terms only lower scores
+            terms: List[Tuple[float, float, _Postings]] = []
+            query_norm = 0.0
+            for feature, count in features.items():
+                idf = self._idf(feature, total)
+                weight = (1.0 + math.log(count)) * idf
+                query_norm += weight * weight
+                postings = self._postings.get(feature)
+                if postings is None or postings.size > self.max_df * total and total >= 20:
+                    continue
+                terms.append((idf, weight, postings))
+            if not terms:
+                return []
+            terms.sort(key=lambda term: -term[0])
+            query_norm = math.sqrt(query_norm)
+            id_parts, weight_parts, scanned = [], [], 0
+            for _, weight, postings in terms:
+                if scanned and scanned + postings.size > self.max_postings:
+                    break
+                id_parts.append(postings.ids[:postings.size])
+                weight_parts.append(postings.weights[:postings.size] * (weight / query_norm))
+                scanned += postings.size
+            ids = np.concatenate(id_parts)
+            weights = np.concatenate(weight_parts)
+            keys, texts = self._keys, self._texts
+
+        candidates, inverse = np.unique(ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        if len(scores) > k:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [
+            SimilarMatch(keys[candidates[i]], texts[candidates[i]], float(scores[i]))
+            for i in top
+            if scores[i] >= min_score
+        ]
+
+    def stats(self) -> Dict[str, float]:
+        """Index size and query count"""
+        with self._lock:
+            return {
+                "entries": len(self._keys),
+                "features": len(self._postings),
+                "postings": self.postings,
+                "queries": self.queries,
+            }
+
+    def _idf(self, feature: int, total: int) -> float:
+        postings = self._postings.get(feature)
+        df = postings.size if postings is not None else 0
+        return math.log((1 + total) / (1 + df)) + 1.0
+
@@ -2,14 +2,124 @@
 Workflow Planner Agent
 Uses CrewAI to orchestrate workflow planning from natural language goals.
 """
+import json
+import logging
 import os
+import threading
+import time
 import uuid
-from typing import Dict, Any, List
-from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Any, Iterable, List, Tuple, Callable, Optional
 from pydantic import BaseModel
 
-from schemas.workflow import WorkflowBlueprint, WorkflowStep
+from schemas.workflow import WorkflowBlueprint, WorkflowStep, PlannedStepEdit, PlannedWorkflow
+from agents.blueprint_cache import BlueprintCache, fresh_copy
+from agents.crew_pool import CrewPool, PlannerCrew
+from agents.mock_rules import mock_rule_engine
+from agents.similarity_index import SimilarityIndex
+from services.cancellation import CancelToken, PlanCancelled, bind, check_cancelled, current_token, enter_stage
+from services.logs import capture_transcript, current_transcript, flush_transcript, record_transcript
+from services.metrics import MOCK_FALLBACKS, PLAN_SECONDS, SIMILAR_PLANS, STAGE_SECONDS
+from workflow.graph import WorkflowGraph, blueprint_from_steps, edited_blueprint, successor_ids
+
+# CrewAI and LangChain are heavy to import, so they are loaded on first real use
+if TYPE_CHECKING:
+    from agents.llm_cache import DiskLLMCache
+    from agents.llm_client import LLMRateLimiter
+    from crewai import Agent
+    from langchain_openai import ChatOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Callback receiving (event_name, payload) progress events while a plan is produced
+PlanEventCallback = Callable[[str, Dict[str, Any]], None]
+
+# Crew tasks in execution order, as reported in progress events
+CREW_STAGES = ["goal_analysis", "workflow_design", "blueprint"]
+
+# Planner modes: "deep" runs the three-agent crew, "fast" makes one structured LLM call
+PLANNER_MODES = ("deep", "fast")
+
+# Most planned-but-not-yet-stored workflow ids remembered for index_plan()
+PENDING_INDEX_SIZE = 1024
+
+# Longest request context (as JSON) interpolated into a prompt
+CONTEXT_PROMPT_CHARS = 4000
+
+FAST_PLANNER_PROMPT = """You are a workflow automation expert. Design a complete, executable
+automation workflow for the user's goal.
+
+Rules:
+- The first step is the trigger (usually action_type "webhook").
+- action_type is one of: webhook, api_call, data_transform, notification, condition.
+- tool is the lowercase service name (e.g. typeform, airtable, sendgrid, slack).
+- Use ids "step-1", "step-2", ... and link each step to the next via next_step_id;
+  when a step branches, list the other successors in next_step_ids. Final steps
+  have next_step_id null. The workflow must not contain cycles.
+- Put required configuration in parameters, using "to_be_configured" for values
+  the user must supply."""
+
+
+# Deep-mode task descriptions, filled from the kickoff inputs ({goal}, {context},
+# {examples}) so pooled crews can be reused for any goal
+ANALYZE_TASK_TEMPLATE = """
+            Analyze this automation goal: "{goal}"
+            
+            Extract:
+            1. The trigger (what starts the workflow)
+            2. The desired outcome
+            3. The tools/services needed
+            4. Any specific requirements or constraints
+            
+            Context provided: {context}
+            
+            Provide a structured analysis of the goal.
+            """
+
+DESIGN_TASK_TEMPLATE = """
+            Based on the goal analysis, design a step-by-step workflow.
+            
+            For each step, specify:
+            - Step name and description
+            - Action type (api_call, data_transform, notification, etc.)
+            - Tool/service to use (airtable, sendgrid, webhook, etc.)
+            - Required parameters
+            - Next step in sequence
+            
+            Make sure the workflow is complete and achieves the goal.
+            {examples}"""
+
+BLUEPRINT_TASK_TEMPLATE = """
+            Convert the workflow design into a React Flow blueprint.
+            
+            Generate:
+            1. Nodes array with React Flow node format:
+               - id: unique identifier
+               - type: "default" or "input" or "output"
+               - position: x and y coordinates (numbers)
+               - data: object with label, description, tool, and action_type fields
+            
+            2. Edges array with React Flow edge format:
+               - id: unique identifier
+               - source: source node id
+               - target: target node id
+               
+            3. Ensure nodes are positioned in a readable flow (left to right)
+            
+            Return the blueprint in JSON format.
+            """
+
+
+EDIT_PLANNER_PROMPT = """You are a workflow automation expert editing an existing workflow.
+Apply the user's instruction to the targeted steps only.
+
+Rules:
+- Return the replacement for every targeted step you keep, with the same id.
+  Leave a targeted step out to delete it.
+- New steps need ids that are not already used in the workflow.
+- Link steps with next_step_id / next_step_ids; you may point at any existing step.
+- Use the same action_type and tool conventions as the rest of the workflow.
+- Do not return steps that were not targeted."""
 
 
 class WorkflowPlanner:
@@ -19,169 +129,641 @@ class WorkflowPlanner:
     """
     
     def __init__(self):
-        """Initialize the workflow planner with CrewAI agents"""
+        """
+        Initialize the workflow planner.
+        
+        The LLM client and CrewAI crews are created lazily on first real use
+        (or by warm_up()), so MOCK_MODE workers never import CrewAI/LangChain.
+        """
         # Model options (in order of preference):
         # - gpt-4o: Latest and most capable (requires API access)
         # - gpt-4-turbo: Good performance (may require access)
         # - gpt-4: Reliable but older
         # - gpt-3.5-turbo: Most widely available, good for testing (default)
-        model_name = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-        self.llm = ChatOpenAI(
-            model=model_name,
-            temperature=0.7,
-            openai_api_key=os.getenv("OPENAI_API_KEY")
+        self.model_name = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+        self._llm: Optional["ChatOpenAI"] = None
+        self._init_lock = threading.RLock()
+        
+        self.default_mode = os.getenv("PLANNER_MODE", "deep").lower()
+        
+        # Goal-keyed blueprint cache (BLUEPRINT_CACHE_SIZE=0 disables it)
+        self.cache = BlueprintCache(
+            max_entries=int(os.getenv("BLUEPRINT_CACHE_SIZE", "256")),
+            ttl_seconds=float(os.getenv("BLUEPRINT_CACHE_TTL", "600"))
         )
         
-        # Create specialized agents
-        self.goal_analyzer = self._create_goal_analyzer()
-        self.workflow_designer = self._create_workflow_designer()
-        self.blueprint_generator = self._create_blueprint_generator()
+        # Disk-backed LLM prompt cache for the listed stages (empty disables it).
+        # Identical prompts under the same model settings reuse the stored response.
+        self.llm_cache_stages = {
+            stage.strip()
+            for stage in os.getenv("LLM_CACHE_STAGES", "goal_analysis,workflow_design").split(",")
+            if stage.strip()
+        }
+        self.llm_cache: Optional["DiskLLMCache"] = None
+        self._stage_llms: Dict[str, "ChatOpenAI"] = {}
+        
+        # Shared LLM HTTP client and rate limiter, created with the first LLM
+        self._http_client = None
+        self.rate_limiter: Optional["LLMRateLimiter"] = None
+        
+        # Goals of earlier LLM plans. A near-identical goal (without context)
+        # reuses the stored plan; close ones are shown to the LLM as examples.
+        # blueprint_lookup maps a workflow id to its stored blueprint. Plans are
+        # indexed by the caller once stored (index_plan), under the stored id;
+        # _unindexed holds the ids of plans parsed from LLM output until then.
+        self.similarity = SimilarityIndex(max_entries=int(os.getenv("SIMILARITY_INDEX_SIZE", "200000")))
+        self._unindexed: "OrderedDict[str, None]" = OrderedDict()
+        self._unindexed_lock = threading.Lock()
+        self.similarity_reuse_threshold = float(os.getenv("SIMILARITY_REUSE_THRESHOLD", "0.9"))
+        self.similarity_example_threshold = float(os.getenv("SIMILARITY_EXAMPLE_THRESHOLD", "0.3"))
+        self.blueprint_lookup: Optional[Callable[[str], Optional[WorkflowBlueprint]]] = None
+        
+        # Deep-mode crews (agents with their own LLM clients, tasks and Crew),
+        # one per concurrent run; defaults to one per planner worker
+        self.crews = CrewPool(
+            self._build_crew,
+            size=int(os.getenv("PLANNER_CREW_POOL_SIZE", os.getenv("PLANNER_WORKERS", "4")))
+        )
+    
+    @property
+    def llm(self) -> "ChatOpenAI":
+        """Shared LLM client, created on first use"""
+        if self._llm is None:
+            with self._init_lock:
+                if self._llm is None:
+                    self._llm = self._build_llm()
+        return self._llm
+    
+    def _build_llm(self, cache: Any = None) -> "ChatOpenAI":
+        """ChatOpenAI client with metrics, optionally backed by a prompt cache"""
+        from langchain_openai import ChatOpenAI
+        from agents.llm_metrics import make_llm_metrics_handler
+        return ChatOpenAI(
+            model=self.model_name,
+            temperature=0.7,
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            callbacks=[make_llm_metrics_handler(self.model_name)],
+            cache=cache,
+            http_client=self._shared_http_client(),
+            # Retries happen in the rate-limited transport, against the shared budget
+            max_retries=0
+        )
     
-    def _create_goal_analyzer(self) -> Agent:
+    def _shared_http_client(self) -> Any:
+        """Pooled, rate-limited HTTP client used by every ChatOpenAI instance"""
+        with self._init_lock:
+            if self._http_client is None:
+                from agents.llm_client import LLMRateLimiter, build_http_client
+                self.rate_limiter = LLMRateLimiter(
+                    requests_per_minute=float(os.getenv("LLM_RPM", "0")),
+                    tokens_per_minute=float(os.getenv("LLM_TPM", "0"))
+                )
+                self._http_client = build_http_client(
+                    self.rate_limiter,
+                    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+                    deadline_seconds=float(os.getenv("LLM_RETRY_DEADLINE", "60"))
+                )
+            return self._http_client
+    
+    def _llm_for_stage(self, stage: str) -> "ChatOpenAI":
+        """Shared LLM client for a single-call stage; cached stages get their own client"""
+        if stage not in self.llm_cache_stages:
+            return self.llm
+        with self._init_lock:
+            llm = self._stage_llms.get(stage)
+            if llm is None:
+                llm = self._stage_llms[stage] = self._build_llm(self._stage_cache(stage))
+            return llm
+    
+    def _stage_cache(self, stage: str) -> Any:
+        """Prompt cache for a stage (None when the stage is not cached)"""
+        if stage not in self.llm_cache_stages:
+            return None
+        with self._init_lock:
+            if self.llm_cache is None:
+                from agents.llm_cache import DiskLLMCache
+                self.llm_cache = DiskLLMCache(
+                    path=os.getenv("LLM_CACHE_PATH", "llm_cache.db"),
+                    max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+                )
+        from agents.llm_cache import make_stage_cache
+        return make_stage_cache(self.llm_cache, stage)
+    
+    def rate_limiter_stats(self) -> Dict[str, Any]:
+        """LLM rate-limit budget and throttling counters (empty until the LLM is used)"""
+        if self.rate_limiter is None:
+            return {}
+        return self.rate_limiter.stats()
+    
+    def llm_cache_stats(self) -> Dict[str, Any]:
+        """Prompt cache statistics (empty until a cached stage has run)"""
+        if self.llm_cache is None:
+            return {}
+        stats = self.llm_cache.stats()
+        stats["stages"] = sorted(self.llm_cache_stages)
+        return stats
+    
+    def crew_pool_stats(self) -> Dict[str, Any]:
+        """Crew pool size, utilization and checkout waits"""
+        return self.crews.stats()
+    
+    def warm_up(self) -> None:
+        """Load CrewAI/LangChain and build the whole crew pool ahead of the first request"""
+        self.crews.warm_up()
+    
+    def _build_crew(self) -> PlannerCrew:
+        """
+        One deep-mode crew. Its agents get their own ChatOpenAI clients; the
+        HTTP connection pool, rate limiter and prompt cache stay shared.
+        """
+        from crewai import Task, Crew, Process
+        goal_analyzer = self._create_goal_analyzer(self._crew_llm("goal_analysis"))
+        workflow_designer = self._create_workflow_designer(self._crew_llm("workflow_design"))
+        blueprint_generator = self._create_blueprint_generator(self._crew_llm("blueprint"))
+        agents = [goal_analyzer, workflow_designer, blueprint_generator]
+        tasks = [
+            Task(
+                description=ANALYZE_TASK_TEMPLATE,
+                agent=goal_analyzer,
+                expected_output="Structured analysis with trigger, outcome, tools, and requirements"
+            ),
+            Task(
+                description=DESIGN_TASK_TEMPLATE,
+                agent=workflow_designer,
+                expected_output="Detailed workflow design with sequential steps"
+            ),
+            Task(
+                description=BLUEPRINT_TASK_TEMPLATE,
+                agent=blueprint_generator,
+                expected_output="React Flow compatible blueprint JSON"
+            ),
+        ]
+        crew = Crew(
+            agents=agents,
+            tasks=tasks,
+            process=Process.sequential,
+            verbose=False
+        )
+        return PlannerCrew(crew, agents, tasks)
+    
+    def _crew_llm(self, stage: str) -> Any:
+        """
+        CrewAI LLM for one agent. CrewAI replaces a ChatOpenAI `llm=` with its
+        own LiteLLM client, so the ChatOpenAI client (cache, metrics, transport)
+        is wrapped in a CrewAI LLM instead.
+        """
+        from agents.crew_llm import make_crew_llm
+        return make_crew_llm(self._build_llm(self._stage_cache(stage)), self.model_name, temperature=0.7)
+    
+    def _create_goal_analyzer(self, llm: Any) -> "Agent":
         """Agent that analyzes and understands the user's goal"""
+        from crewai import Agent
         return Agent(
             role="Goal Analyst",
             goal="Analyze user goals and extract key requirements, triggers, and outcomes",
             backstory="""You are an expert business process analyst with years of experience
             understanding automation needs. You excel at breaking down complex business goals
             into clear, actionable requirements.""",
-            verbose=True,
+            verbose=False,
             allow_delegation=False,
-            llm=self.llm
+            # Retries happen in the rate-limited transport; CrewAI's task re-runs
+            # would also repeat cancelled and quota-failed tasks
+            max_retry_limit=0,
+            llm=llm
         )
     
-    def _create_workflow_designer(self) -> Agent:
+    def _create_workflow_designer(self, llm: Any) -> "Agent":
         """Agent that designs the workflow steps"""
+        from crewai import Agent
         return Agent(
             role="Workflow Architect",
             goal="Design multi-step workflows that achieve business automation goals",
             backstory="""You are a workflow automation expert who specializes in designing
             efficient, reliable business process automations. You understand how to connect
             different tools and services to create seamless workflows.""",
-            verbose=True,
+            verbose=False,
             allow_delegation=False,
-            llm=self.llm
+            max_retry_limit=0,
+            llm=llm
         )
     
-    def _create_blueprint_generator(self) -> Agent:
+    def _create_blueprint_generator(self, llm: Any) -> "Agent":
         """Agent that generates React Flow compatible blueprints"""
+        from crewai import Agent
         return Agent(
             role="Blueprint Engineer",
             goal="Generate visual blueprints in React Flow format from workflow designs",
             backstory="""You are a technical engineer who specializes in converting workflow
             designs into structured data formats. You understand React Flow node and edge
             structures and create clean, visual representations of workflows.""",
-            verbose=True,
+            verbose=False,
             allow_delegation=False,
-            llm=self.llm
+            max_retry_limit=0,
+            llm=llm
         )
     
-    def plan_workflow(self, goal: str, context: Dict[str, Any] = None) -> WorkflowBlueprint:
+    def plan_workflow(
+        self,
+        goal: str,
+        context: Dict[str, Any] = None,
+        on_event: Optional[PlanEventCallback] = None,
+        mode: Optional[str] = None,
+        cancel: Optional[CancelToken] = None
+    ) -> WorkflowBlueprint:
         """
         Main method to plan a workflow from a natural language goal.
         
         Args:
             goal: Natural language description of the automation goal
             context: Optional context about the user's business/tools
+            on_event: Optional callback for "stage" progress events, called
+                from the planning thread as each crew task starts/completes
+            mode: "deep" (three-agent crew) or "fast" (single structured call);
+                defaults to the PLANNER_MODE environment variable
+            cancel: Optional token carrying the request's deadlines; checked
+                between crew tasks and before every LLM call
             
         Returns:
             WorkflowBlueprint with React Flow compatible structure
+        
+        Raises:
+            PlanCancelled: if the token was cancelled or a deadline passed
         """
         context = context or {}
+        mode = mode or self.default_mode
+        if mode not in PLANNER_MODES:
+            raise ValueError(f"Unknown planner mode: {mode}")
+        with bind(cancel):
+            check_cancelled()
+            return self.cache.get_or_plan(
+                goal,
+                context,
+                lambda: self._plan_uncached(goal, context, on_event, mode),
+                variant=mode,
+                cancel=cancel
+            )
+    
+    def cached_plan(
+        self,
+        goal: str,
+        context: Dict[str, Any] = None,
+        mode: Optional[str] = None
+    ) -> Optional[WorkflowBlueprint]:
+        """The cached blueprint for this goal if there is one, without planning"""
+        return self.cache.peek(goal, context or {}, variant=mode or self.default_mode)
+    
+    def template_workflow(self, goal: str) -> WorkflowBlueprint:
+        """Instant rule-based blueprint, used as a placeholder while the real plan runs"""
+        return self._generate_mock_workflow(goal)
+    
+    def _plan_uncached(
+        self,
+        goal: str,
+        context: Dict[str, Any],
+        on_event: Optional[PlanEventCallback] = None,
+        mode: str = "deep"
+    ) -> Tuple[WorkflowBlueprint, bool]:
+        """
+        Run the planner without the cache.
         
+        Returns:
+            (blueprint, cacheable) - quota fallbacks are not cacheable so the
+            real plan is produced once the API recovers
+        """
         # Check if we should use mock mode (when API quota is exceeded or MOCK_MODE is enabled)
         use_mock_mode = os.getenv("MOCK_MODE", "false").lower() == "true"
-        
-        if use_mock_mode:
-            # Generate workflow from simple pattern matching (no API calls)
-            return self._generate_mock_workflow(goal)
+        started = time.perf_counter()
+        outcome = "error"
         
         try:
-            # Create tasks for the crew
-            analyze_task = Task(
-                description=f"""
-                Analyze this automation goal: "{goal}"
-                
-                Extract:
-                1. The trigger (what starts the workflow)
-                2. The desired outcome
-                3. The tools/services needed
-                4. Any specific requirements or constraints
-                
-                Context provided: {str(context)}
-                
-                Provide a structured analysis of the goal.
-                """,
-                agent=self.goal_analyzer,
-                expected_output="Structured analysis with trigger, outcome, tools, and requirements"
-            )
+            if use_mock_mode:
+                # Generate workflow from simple pattern matching (no API calls)
+                MOCK_FALLBACKS.inc(reason="mock_mode")
+                outcome = "mock"
+                return self._generate_mock_workflow(goal), True
             
-            design_task = Task(
-                description=f"""
-                Based on the goal analysis, design a step-by-step workflow.
-                
-                For each step, specify:
-                - Step name and description
-                - Action type (api_call, data_transform, notification, etc.)
-                - Tool/service to use (airtable, sendgrid, webhook, etc.)
-                - Required parameters
-                - Next step in sequence
-                
-                Make sure the workflow is complete and achieves the goal.
-                """,
-                agent=self.workflow_designer,
-                expected_output="Detailed workflow design with sequential steps"
-            )
+            reused, examples = self._similar_plans(goal, context)
+            if reused is not None:
+                _emit(on_event, "reused", {"workflow_id": reused.workflow_id, "goal": reused.goal})
+                outcome = "reused"
+                return fresh_copy(reused, goal), True
             
-            blueprint_task = Task(
-                description="""
-                Convert the workflow design into a React Flow blueprint.
-                
-                Generate:
-                1. Nodes array with React Flow node format:
-                   - id: unique identifier
-                   - type: "default" or "input" or "output"
-                   - position: x and y coordinates (numbers)
-                   - data: object with label, description, tool, and action_type fields
-                
-                2. Edges array with React Flow edge format:
-                   - id: unique identifier
-                   - source: source node id
-                   - target: target node id
-                   
-                3. Ensure nodes are positioned in a readable flow (left to right)
-                
-                Return the blueprint in JSON format.
-                """,
-                agent=self.blueprint_generator,
-                expected_output="React Flow compatible blueprint JSON"
-            )
-            
-            # Create and run the crew
-            crew = Crew(
-                agents=[self.goal_analyzer, self.workflow_designer, self.blueprint_generator],
-                tasks=[analyze_task, design_task, blueprint_task],
-                process=Process.sequential,
-                verbose=True
+            # Agent transcripts are kept in memory and only logged for sampled or failed runs
+            with capture_transcript() as transcript:
+                try:
+                    if mode == "fast":
+                        blueprint = self._plan_fast(goal, context, on_event, examples)
+                    else:
+                        blueprint = self._plan_deep(goal, context, on_event, examples)
+                    outcome = "ok"
+                    # Deep mode still returns a canned blueprint (see
+                    # _generate_blueprint_from_result), which must not be reused
+                    if mode == "fast":
+                        self._remember_unindexed(blueprint.workflow_id)
+                    return blueprint, True
+                except Exception as e:
+                    # Client libraries wrap errors raised inside the HTTP transport,
+                    # so a cancelled run can surface as a connection error
+                    try:
+                        check_cancelled()
+                    except PlanCancelled:
+                        outcome = "cancelled"
+                        raise
+                    # If it's a quota/rate-limit error that outlasted the retries, fall back to mock mode
+                    if _is_quota_error(e):
+                        logger.warning("API quota exceeded, falling back to mock workflow", extra={"fields": {"error": str(e)}})
+                        _emit(on_event, "fallback", {"reason": "quota", "detail": str(e)})
+                        MOCK_FALLBACKS.inc(reason="quota")
+                        outcome = "fallback"
+                        return self._generate_mock_workflow(goal), False
+                    # Re-raise other errors
+                    raise
+                finally:
+                    flush_transcript(transcript, failed=outcome != "ok", mode=mode, outcome=outcome, goal=goal)
+        finally:
+            PLAN_SECONDS.observe(time.perf_counter() - started, mode=mode, result=outcome)
+    
+    def _similar_plans(
+        self,
+        goal: str,
+        context: Dict[str, Any]
+    ) -> Tuple[Optional[WorkflowBlueprint], List[WorkflowBlueprint]]:
+        """
+        Look up earlier plans for similar goals.
+        
+        Returns:
+            (reusable, examples) - a stored blueprint to reuse as-is when the
+            closest goal scores above SIMILARITY_REUSE_THRESHOLD and the request
+            has no context, otherwise up to two blueprints to use as few-shot
+            examples
+        """
+        lookup = self.blueprint_lookup
+        if lookup is None or not len(self.similarity):
+            return None, []
+        examples: List[WorkflowBlueprint] = []
+        for match in self.similarity.search(goal, k=2, min_score=self.similarity_example_threshold):
+            try:
+                blueprint = lookup(match.key)
+            except Exception as e:
+                logger.warning("Similar plan lookup failed", extra={"fields": {"workflow_id": match.key, "error": str(e)}})
+                blueprint = None
+            if blueprint is None:
+                continue
+            if not examples and not context and match.score >= self.similarity_reuse_threshold:
+                SIMILAR_PLANS.inc(outcome="reused")
+                return blueprint, []
+            examples.append(blueprint)
+        SIMILAR_PLANS.inc(outcome="examples" if examples else "none")
+        return None, examples
+    
+    def index_plan(self, blueprint: WorkflowBlueprint, workflow_id: Optional[str] = None) -> bool:
+        """
+        Add a plan to the similarity index as it is stored, if it was parsed
+        from LLM output by this planner (cache copies, templates, mock and
+        fallback blueprints are not).
+        
+        Args:
+            blueprint: Blueprint as returned by plan_workflow
+            workflow_id: Id it is stored under, if not its own
+        
+        Returns:
+            Whether the plan is reusable, i.e. should be stored as such
+        """
+        with self._unindexed_lock:
+            if blueprint.workflow_id not in self._unindexed:
+                return False
+            del self._unindexed[blueprint.workflow_id]
+        self.similarity.add(workflow_id or blueprint.workflow_id, blueprint.goal)
+        return True
+    
+    def load_similarity(self, plans: Iterable[Tuple[str, str]]) -> int:
+        """Index stored (workflow_id, goal) pairs, e.g. at startup; returns how many were added"""
+        return sum(1 for workflow_id, goal in plans if self.similarity.add(workflow_id, goal))
+    
+    def _remember_unindexed(self, workflow_id: str) -> None:
+        with self._unindexed_lock:
+            self._unindexed[workflow_id] = None
+            while len(self._unindexed) > PENDING_INDEX_SIZE:
+                self._unindexed.popitem(last=False)
+    
+    def similarity_stats(self) -> Dict[str, Any]:
+        """Similarity index size and query count"""
+        return self.similarity.stats()
+    
+    def _plan_deep(
+        self,
+        goal: str,
+        context: Dict[str, Any],
+        on_event: Optional[PlanEventCallback] = None,
+        examples: Optional[List[WorkflowBlueprint]] = None
+    ) -> WorkflowBlueprint:
+        """Plan with a pooled three-agent crew"""
+        inputs = {
+            "goal": goal,
+            "context": _format_context(context),
+            "examples": _format_examples(examples)
+        }
+        # Waiting for a free crew counts against the request's deadline
+        with self.crews.checkout(current_token()) as crew:
+            enter_stage(CREW_STAGES[0])
+            _emit(on_event, "stage", {"stage": CREW_STAGES[0], "status": "started"})
+            result = crew.run(
+                inputs,
+                step_callback=self._make_step_callback(),
+                task_callback=self._make_task_callback(on_event)
             )
-            
-            # Execute the crew
-            result = crew.kickoff()
-            
-            # Parse the result and generate the blueprint
-            # For now, we'll create a structured response
-            # TODO: Parse the CrewAI result more intelligently
-            blueprint = self._generate_blueprint_from_result(goal, result)
-            
-            return blueprint
-        except Exception as e:
-            error_msg = str(e).lower()
-            # If it's a quota/API error, fall back to mock mode
-            if "quota" in error_msg or "429" in error_msg or "insufficient" in error_msg:
-                print(f"⚠️  API quota exceeded. Falling back to mock mode. Error: {e}")
-                return self._generate_mock_workflow(goal)
-            # Re-raise other errors
-            raise
+        
+        # Parse the result and generate the blueprint
+        # For now, we'll create a structured response
+        # TODO: Parse the CrewAI result more intelligently
+        blueprint = self._generate_blueprint_from_result(goal, result)
+        
+        return blueprint
+    
+    def _plan_fast(
+        self,
+        goal: str,
+        context: Dict[str, Any],
+        on_event: Optional[PlanEventCallback] = None,
+        examples: Optional[List[WorkflowBlueprint]] = None
+    ) -> WorkflowBlueprint:
+        """
+        Plan with a single LLM call whose output is constrained to the
+        PlannedWorkflow schema, then parse it directly into steps.
+        """
+        enter_stage("fast_plan")
+        _emit(on_event, "stage", {"stage": "fast_plan", "status": "started"})
+        started = time.perf_counter()
+        structured_llm = self._llm_for_stage("fast_plan").with_structured_output(PlannedWorkflow)
+        human = f'Automation goal: "{goal}"'
+        if context:
+            human += f"\n\nContext: {_format_context(context)}"
+        human += _format_examples(examples)
+        record_transcript("prompt", human)
+        planned = structured_llm.invoke([
+            ("system", FAST_PLANNER_PROMPT),
+            ("human", human)
+        ])
+        record_transcript("fast_plan", planned)
+        # Drop duplicate ids and dangling references, reject empty or cyclic plans
+        graph = WorkflowGraph(planned.steps)
+        if graph.duplicate_ids or graph.dangling:
+            graph = WorkflowGraph(graph.sanitized_steps())
+        graph.validate()
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="fast_plan")
+        _emit(on_event, "stage", {"stage": "fast_plan", "status": "completed", "steps": len(graph)})
+        return blueprint_from_steps(goal, graph.steps, graph=graph)
+    
+    def replan_steps(
+        self,
+        blueprint: WorkflowBlueprint,
+        step_ids: List[str],
+        instruction: str,
+        context: Dict[str, Any] = None,
+        cancel: Optional[CancelToken] = None
+    ) -> WorkflowBlueprint:
+        """
+        Re-plan only the targeted steps of an existing blueprint with one small
+        LLM call; untouched steps are kept as they are.
+        
+        Returns:
+            The edited blueprint (same workflow_id)
+        
+        Raises:
+            ValueError: if a targeted step id is not in the blueprint
+            WorkflowGraphError: if the edit leaves an invalid graph
+            PlanCancelled: if `cancel` was cancelled or a deadline passed
+        """
+        known = {step.id for step in blueprint.steps}
+        unknown = [step_id for step_id in step_ids if step_id not in known]
+        if unknown or not step_ids:
+            raise ValueError(f"Unknown step ids: {', '.join(unknown) or '(none given)'}")
+        
+        use_mock_mode = os.getenv("MOCK_MODE", "false").lower() == "true"
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            if use_mock_mode:
+                MOCK_FALLBACKS.inc(reason="mock_mode")
+                edited = self._mock_step_edit(blueprint, step_ids, instruction)
+                outcome = "mock"
+            else:
+                try:
+                    with bind(cancel):
+                        enter_stage("edit")
+                        edited = self._llm_step_edit(blueprint, step_ids, instruction, context or {})
+                    outcome = "ok"
+                except Exception as e:
+                    if cancel is not None:
+                        try:
+                            cancel.check()
+                        except PlanCancelled:
+                            outcome = "cancelled"
+                            raise
+                    if not _is_quota_error(e):
+                        raise
+                    logger.warning("API quota exceeded, falling back to mock edit", extra={"fields": {"error": str(e)}})
+                    MOCK_FALLBACKS.inc(reason="quota")
+                    edited = self._mock_step_edit(blueprint, step_ids, instruction)
+                    outcome = "fallback"
+            return _merge_step_edit(blueprint, step_ids, edited)
+        finally:
+            PLAN_SECONDS.observe(time.perf_counter() - started, mode="edit", result=outcome)
+    
+    def _llm_step_edit(
+        self,
+        blueprint: WorkflowBlueprint,
+        step_ids: List[str],
+        instruction: str,
+        context: Dict[str, Any]
+    ) -> List[WorkflowStep]:
+        """Ask the LLM for replacements of the targeted steps, sending the rest only in outline"""
+        started = time.perf_counter()
+        targets = set(step_ids)
+        outline = [
+            step.model_dump() if step.id in targets else {
+                "id": step.id,
+                "name": step.name,
+                "tool": step.tool,
+                "next": successor_ids(step)
+            }
+            for step in blueprint.steps
+        ]
+        human = (
+            f'Workflow goal: "{blueprint.goal}"\n\n'
+            f"Workflow steps: {json.dumps(outline, default=str)}\n\n"
+            f"Targeted step ids: {', '.join(step_ids)}\n"
+            f"Instruction: {instruction}"
+        )
+        if context:
+            human += f"\n\nContext: {_format_context(context)}"
+        structured_llm = self._llm_for_stage("edit").with_structured_output(PlannedStepEdit)
+        planned = structured_llm.invoke([
+            ("system", EDIT_PLANNER_PROMPT),
+            ("human", human)
+        ])
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="edit")
+        return planned.steps
+    
+    def _mock_step_edit(
+        self,
+        blueprint: WorkflowBlueprint,
+        step_ids: List[str],
+        instruction: str
+    ) -> List[WorkflowStep]:
+        """Offline edit: record the instruction on each targeted step"""
+        targets = set(step_ids)
+        return [
+            step.model_copy(update={
+                "description": f"{step.description} ({instruction})",
+                "parameters": {**step.parameters, "instruction": instruction}
+            })
+            for step in blueprint.steps
+            if step.id in targets
+        ]
+    
+    def _make_step_callback(self) -> Callable[[Any], None]:
+        """Build a Crew step_callback that keeps each agent step in the run's transcript buffer"""
+        transcript = current_transcript()
+        
+        def step_callback(step_output: Any) -> None:
+            if transcript is not None:
+                transcript.add("step", step_output)
+        
+        return step_callback
+    
+    def _make_task_callback(self, on_event: Optional[PlanEventCallback]) -> Callable[[Any], None]:
+        """Build a Crew task_callback that times each finished task and reports it as a stage event"""
+        completed = [0]
+        last_finished = [time.perf_counter()]
+        cancel = current_token()
+        transcript = current_transcript()
+        
+        def task_callback(task_output: Any) -> None:
+            index = completed[0]
+            completed[0] += 1
+            if transcript is not None:
+                transcript.add("task", task_output)
+            if index >= len(CREW_STAGES):
+                return
+            now = time.perf_counter()
+            STAGE_SECONDS.observe(now - last_finished[0], stage=CREW_STAGES[index])
+            last_finished[0] = now
+            # Stop between tasks once the request is cancelled or out of time
+            if cancel is not None and index + 1 < len(CREW_STAGES):
+                cancel.enter_stage(CREW_STAGES[index + 1])
+            if on_event is None:
+                return
+            output = getattr(task_output, "raw", None) or str(task_output)
+            _emit(on_event, "stage", {
+                "stage": CREW_STAGES[index],
+                "status": "completed",
+                "output": output[:2000]
+            })
+            if index + 1 < len(CREW_STAGES):
+                _emit(on_event, "stage", {"stage": CREW_STAGES[index + 1], "status": "started"})
+        
+        return task_callback
     
     def _generate_blueprint_from_result(
         self, 
@@ -228,265 +810,120 @@ class WorkflowPlanner:
             )
         ]
         
-        # Generate React Flow nodes
-        nodes = []
-        for i, step in enumerate(steps):
-            nodes.append({
-                "id": step.id,
-                "type": "default",
-                "position": {"x": i * 300 + 100, "y": 150},
-                "data": {
-                    "label": step.name,
-                    "description": step.description,
-                    "tool": step.tool,
-                    "action_type": step.action_type
-                }
-            })
-        
-        # Mark first and last nodes
-        if nodes:
-            nodes[0]["type"] = "input"
-            nodes[-1]["type"] = "output"
-        
-        # Generate React Flow edges
-        edges = []
-        for i, step in enumerate(steps):
-            if step.next_step_id:
-                edges.append({
-                    "id": f"edge-{step.id}-{step.next_step_id}",
-                    "source": step.id,
-                    "target": step.next_step_id,
-                    "type": "smoothstep"
-                })
-        
-        return WorkflowBlueprint(
-            workflow_id=workflow_id,
-            goal=goal,
-            steps=steps,
-            edges=edges,
-            nodes=nodes
-        )
+        return blueprint_from_steps(goal, steps, workflow_id)
     
     def _generate_mock_workflow(self, goal: str) -> WorkflowBlueprint:
         """
-        Generate a mock workflow based on simple pattern matching.
+        Generate a mock workflow from the compiled rule table in agents.mock_rules.
         This is used when API quota is exceeded or MOCK_MODE is enabled.
         """
-        goal_lower = goal.lower()
-        workflow_id = str(uuid.uuid4())
-        steps = []
-        
-        # Pattern matching to generate relevant workflows
-        if "typeform" in goal_lower or "form" in goal_lower:
-            if "airtable" in goal_lower:
-                steps = [
-                    WorkflowStep(
-                        id="step-1",
-                        name="Trigger: Form Submission",
-                        description="Detect when a form is submitted",
-                        action_type="webhook",
-                        tool="typeform",
-                        parameters={"form_id": "to_be_configured"},
-                        next_step_id="step-2"
-                    ),
-                    WorkflowStep(
-                        id="step-2",
-                        name="Add to Airtable",
-                        description="Add the form data to Airtable",
-                        action_type="api_call",
-                        tool="airtable",
-                        parameters={"base_id": "to_be_configured", "table": "Leads"},
-                        next_step_id="step-3" if "email" in goal_lower else None
-                    )
-                ]
-                if "email" in goal_lower or "welcome" in goal_lower:
-                    steps.append(WorkflowStep(
-                        id="step-3",
-                        name="Send Welcome Email",
-                        description="Send a welcome email to the new lead",
-                        action_type="api_call",
-                        tool="sendgrid",
-                        parameters={"template_id": "welcome_email"},
-                        next_step_id=None
-                    ))
-                    steps[1].next_step_id = "step-3"
-        
-        elif "email" in goal_lower and "trello" in goal_lower:
-            steps = [
-                WorkflowStep(
-                    id="step-1",
-                    name="Trigger: New Email",
-                    description="Detect incoming email from customer",
-                    action_type="webhook",
-                    tool="gmail",
-                    parameters={"filter": "from:customer"},
-                    next_step_id="step-2"
-                ),
-                WorkflowStep(
-                    id="step-2",
-                    name="Create Trello Task",
-                    description="Create a new task in Trello board",
-                    action_type="api_call",
-                    tool="trello",
-                    parameters={"board_id": "to_be_configured", "list": "Inbox"},
-                    next_step_id=None
-                )
-            ]
-        
-        elif "order" in goal_lower or "inventory" in goal_lower:
-            steps = [
-                WorkflowStep(
-                    id="step-1",
-                    name="Trigger: New Order",
-                    description="Detect when a new order is received",
-                    action_type="webhook",
-                    tool="shopify",
-                    parameters={"event": "order.created"},
-                    next_step_id="step-2"
-                ),
-                WorkflowStep(
-                    id="step-2",
-                    name="Update Inventory",
-                    description="Update inventory spreadsheet",
-                    action_type="api_call",
-                    tool="google_sheets",
-                    parameters={"spreadsheet_id": "to_be_configured"},
-                    next_step_id="step-3" if "slack" in goal_lower or "notify" in goal_lower else None
-                )
-            ]
-            if "slack" in goal_lower or "notify" in goal_lower:
-                steps.append(WorkflowStep(
-                    id="step-3",
-                    name="Notify Team",
-                    description="Send notification to team on Slack",
-                    action_type="api_call",
-                    tool="slack",
-                    parameters={"channel": "#orders"},
-                    next_step_id=None
-                ))
-                steps[1].next_step_id = "step-3"
-        
-        elif "crm" in goal_lower or "contact" in goal_lower:
-            steps = [
-                WorkflowStep(
-                    id="step-1",
-                    name="Trigger: New Contact",
-                    description="Detect when a contact is added to CRM",
-                    action_type="webhook",
-                    tool="hubspot",
-                    parameters={"event": "contact.created"},
-                    next_step_id="step-2"
-                ),
-                WorkflowStep(
-                    id="step-2",
-                    name="Send Email Sequence",
-                    description="Send personalized email sequence",
-                    action_type="api_call",
-                    tool="mailchimp",
-                    parameters={"sequence_id": "welcome_sequence"},
-                    next_step_id=None
-                )
-            ]
-        
-        elif "newsletter" in goal_lower or "mailchimp" in goal_lower:
-            steps = [
-                WorkflowStep(
-                    id="step-1",
-                    name="Trigger: Newsletter Subscription",
-                    description="Detect new newsletter subscription",
-                    action_type="webhook",
-                    tool="website",
-                    parameters={"endpoint": "/subscribe"},
-                    next_step_id="step-2"
-                ),
-                WorkflowStep(
-                    id="step-2",
-                    name="Add to Mailchimp",
-                    description="Add subscriber to Mailchimp list",
-                    action_type="api_call",
-                    tool="mailchimp",
-                    parameters={"list_id": "to_be_configured"},
-                    next_step_id="step-3"
-                ),
-                WorkflowStep(
-                    id="step-3",
-                    name="Send Welcome Series",
-                    description="Trigger welcome email series",
-                    action_type="api_call",
-                    tool="mailchimp",
-                    parameters={"automation_id": "welcome_series"},
-                    next_step_id=None
-                )
-            ]
-        
-        else:
-            # Default generic workflow
-            steps = [
-                WorkflowStep(
-                    id="step-1",
-                    name="Trigger: Event",
-                    description="Detect the trigger event",
-                    action_type="webhook",
-                    tool="generic",
-                    parameters={},
-                    next_step_id="step-2"
-                ),
-                WorkflowStep(
-                    id="step-2",
-                    name="Process Data",
-                    description="Process and transform the data",
-                    action_type="data_transform",
-                    tool="processor",
-                    parameters={},
-                    next_step_id="step-3"
-                ),
-                WorkflowStep(
-                    id="step-3",
-                    name="Complete Action",
-                    description="Complete the desired action",
-                    action_type="api_call",
-                    tool="integration",
-                    parameters={},
-                    next_step_id=None
-                )
-            ]
-        
-        # Generate React Flow nodes
-        nodes = []
-        for i, step in enumerate(steps):
-            nodes.append({
-                "id": step.id,
-                "type": "default",
-                "position": {"x": i * 300 + 100, "y": 150},
-                "data": {
-                    "label": step.name,
-                    "description": step.description,
-                    "tool": step.tool,
-                    "action_type": step.action_type
-                }
-            })
-        
-        # Mark first and last nodes
-        if nodes:
-            nodes[0]["type"] = "input"
-            nodes[-1]["type"] = "output"
-        
-        # Generate React Flow edges
-        edges = []
+        steps = mock_rule_engine.build_steps(goal)
+        return blueprint_from_steps(goal, steps)
+
+
+def _merge_step_edit(
+    blueprint: WorkflowBlueprint,
+    step_ids: List[str],
+    edited: List[WorkflowStep]
+) -> WorkflowBlueprint:
+    """
+    Splice edited steps into a blueprint. New steps are inserted after the
+    last targeted step. Targeted steps missing from `edited` are deleted:
+    their predecessors are re-linked to the first new step(s) when the edit
+    added any (the deleted steps were replaced), else to their successors.
+    """
+    targets = set(step_ids)
+    original = {step.id: step for step in blueprint.steps}
+    replacements = {step.id: step for step in edited if step.id in targets}
+    added = [step for step in edited if step.id not in original]
+    removed = targets - set(replacements)
+    referenced = {next_id for step in edited for next_id in successor_ids(step)}
+    added_heads = [step.id for step in added if step.id not in referenced]
+    
+    def resolve(step_id: str, seen: frozenset = frozenset()) -> List[str]:
+        """Successor ids to use instead of a deleted step"""
+        if step_id not in removed:
+            return [step_id]
+        if added_heads:
+            return added_heads
+        if step_id in seen:
+            return []
+        ids = []
+        for next_id in successor_ids(original[step_id]):
+            ids.extend(resolve(next_id, seen | {step_id}))
+        return ids
+    
+    last_target = max(i for i, step in enumerate(blueprint.steps) if step.id in targets)
+    steps: List[WorkflowStep] = []
+    for i, step in enumerate(blueprint.steps):
+        if step.id in replacements:
+            steps.append(replacements[step.id])
+        elif step.id not in removed:
+            steps.append(step)
+        if i == last_target:
+            steps.extend(added)
+    
+    if removed:
+        relinked = []
         for step in steps:
-            if step.next_step_id:
-                edges.append({
-                    "id": f"edge-{step.id}-{step.next_step_id}",
-                    "source": step.id,
-                    "target": step.next_step_id,
-                    "type": "smoothstep"
-                })
-        
-        return WorkflowBlueprint(
-            workflow_id=workflow_id,
-            goal=goal,
-            steps=steps,
-            edges=edges,
-            nodes=nodes
-        )
+            next_ids = [target for next_id in successor_ids(step) for target in resolve(next_id)]
+            next_ids = list(dict.fromkeys(next_ids))
+            relinked.append(step.model_copy(update={
+                "next_step_id": next_ids[0] if next_ids else None,
+                "next_step_ids": next_ids[1:] or None
+            }))
+        steps = relinked
+    
+    # Drop duplicate ids and dangling references, reject empty or cyclic results
+    graph = WorkflowGraph(steps)
+    if graph.duplicate_ids or graph.dangling:
+        graph = WorkflowGraph(graph.sanitized_steps())
+    graph.validate()
+    # Untouched nodes keep their positions, so the patch only carries the edit
+    return edited_blueprint(blueprint, graph)
+
+
+def _is_quota_error(error: BaseException) -> bool:
+    """True for quota exhaustion or rate limiting that the LLM client gave up on"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if type(error).__name__ in ("LLMRateLimitExceeded", "RateLimitError"):
+            return True
+        if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == "insufficient_quota":
+            return True
+        message = str(error).lower()
+        if "quota" in message or "429" in message or "insufficient" in message:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def _format_context(context: Dict[str, Any]) -> str:
+    """Request context as compact JSON, cut at CONTEXT_PROMPT_CHARS so prompts stay bounded"""
+    text = json.dumps(context, default=str, ensure_ascii=False, separators=(",", ":"))
+    if len(text) > CONTEXT_PROMPT_CHARS:
+        text = text[:CONTEXT_PROMPT_CHARS] + "…(truncated)"
+    return text
+
+
+def _format_examples(examples: Optional[List[WorkflowBlueprint]]) -> str:
+    """Earlier plans for similar goals as a prompt section ("" when there are none)"""
+    if not examples:
+        return ""
+    lines = ["", "", "Plans made earlier for similar goals (adapt them, do not copy blindly):"]
+    for blueprint in examples:
+        lines.append(f'- Goal: "{blueprint.goal}"')
+        for step in blueprint.steps:
+            lines.append(f"    {step.id}: {step.name} [{step.action_type} via {step.tool}]")
+    return "\n".join(lines) + "\n"
+
 
+def _emit(on_event: Optional[PlanEventCallback], event: str, data: Dict[str, Any]) -> None:
+    """Deliver a progress event, never letting a listener failure break planning"""
+    if on_event is None:
+        return
+    try:
+        on_event(event, data)
+    except Exception as e:
+        logger.warning("Progress listener failed", extra={"fields": {"event": event, "error": str(e)}})
@@ -0,0 +1,2 @@
+"""Benchmarks for backend hot paths (run from backend/: python -m benchmarks.<name>)"""
+
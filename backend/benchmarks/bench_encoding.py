@@ -0,0 +1,98 @@
+"""
+Encoding Benchmark
+Compares response size and serialization time for large blueprints: FastAPI's
+default response_model path, model_dump_json, orjson, MessagePack, the
+"steps"/"graph" field views and gzip/brotli on top.
+
+Usage (from backend/):
+    python -m benchmarks.bench_encoding --steps 50 200 1000
+"""
+import argparse
+import json
+import random
+import time
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+
+from schemas.workflow import WorkflowStep
+from services import encoding
+from services.encoding import JSON, MSGPACK, compress, encode_blueprint
+from workflow.graph import blueprint_from_steps
+
+
+TOOLS = ["airtable", "sendgrid", "webhook", "slack", "gmail", "sheets"]
+ACTIONS = ["api_call", "data_transform", "notification", "condition"]
+
+
+def random_steps(count: int, seed: int) -> List[WorkflowStep]:
+    """Chained steps with occasional branches and realistic parameter payloads"""
+    rng = random.Random(seed)
+    steps = []
+    for i in range(count):
+        step_id = f"step-{i + 1}"
+        next_ids = None
+        if i + 2 < count and rng.random() < 0.1:
+            next_ids = [f"step-{rng.randrange(i + 2, count) + 1}"]
+        steps.append(WorkflowStep(
+            id=step_id,
+            name=f"Step {i + 1}: {rng.choice(ACTIONS).replace('_', ' ')}",
+            description=" ".join(rng.choice(["fetch", "record", "notify", "the", "customer", "team", "daily", "report"])
+                                 for _ in range(16)),
+            action_type=rng.choice(ACTIONS),
+            tool=rng.choice(TOOLS),
+            parameters={"table": f"table_{rng.randrange(20)}", "fields": [f"f{j}" for j in range(rng.randrange(1, 6))],
+                        "retry": {"attempts": 3, "backoff": 1.5}},
+            next_step_id=f"step-{i + 2}" if i + 1 < count else None,
+            next_step_ids=next_ids,
+        ))
+    return steps
+
+
+def timed(fn: Callable[[], bytes], repeat: int) -> tuple:
+    body = fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return body, (time.perf_counter() - started) * 1000 / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'steps':>6} {'encoding':<26} {'bytes':>10} {'gzip':>9} {'br':>9} {'ms':>8}")
+    for count in args.steps:
+        blueprint = blueprint_from_steps("Benchmark workflow", random_steps(count, args.seed))
+        stored = blueprint.model_dump_json()
+        cases = [
+            ("fastapi default", lambda: json.dumps(jsonable_encoder(blueprint)).encode("utf-8")),
+            ("model_dump_json", lambda: blueprint.model_dump_json().encode("utf-8")),
+            ("stored body", lambda: encode_blueprint(stored)),
+            ("fields=steps", lambda: encode_blueprint(blueprint, ("workflow_id", "goal", "steps"))),
+            ("fields=graph", lambda: encode_blueprint(blueprint, ("workflow_id", "goal", "nodes", "edges"))),
+            ("json + extra", lambda: encode_blueprint(blueprint, extra={"status": "ready"})),
+        ]
+        if encoding.orjson is not None:
+            cases.append(("orjson(model_dump)", lambda: encoding.orjson.dumps(blueprint.model_dump(mode="json"))))
+        if encoding.msgpack is not None:
+            cases.append(("msgpack", lambda: encode_blueprint(blueprint, media_type=MSGPACK)))
+            cases.append(("msgpack fields=graph", lambda: encode_blueprint(
+                blueprint, ("workflow_id", "goal", "nodes", "edges"), MSGPACK)))
+
+        for name, fn in cases:
+            body, ms = timed(fn, args.repeat)
+            gzipped, _ = compress(body, "gzip", min_size=0)
+            brotlied = f"{len(compress(body, 'br', min_size=0)[0]):>9}" if encoding.brotli is not None else f"{'-':>9}"
+            print(f"{count:>6} {name:<26} {len(body):>10} {len(gzipped):>9} {brotlied} {ms:>8.3f}")
+
+        body = encode_blueprint(blueprint, media_type=JSON)
+        _, gzip_ms = timed(lambda: compress(body, "gzip")[0], args.repeat)
+        print(f"{count:>6} {'(gzip level 5 cost)':<26} {'':>10} {'':>9} {'':>9} {gzip_ms:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Executor Benchmark
+Runs wide fan-out workflows (trigger -> N parallel branches -> join) through
+WorkflowExecutor with stub adapters, comparing one-step-at-a-time execution
+(every tool limited to 1 concurrent step) with the parallel DAG executor.
+
+Usage (from backend/):
+    python -m benchmarks.bench_executor --width 10 100 500 --depth 3 --latency 0.01
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from schemas.workflow import WorkflowStep
+from workflow.adapters import AdapterRegistry, StubAdapter
+from workflow.executor import WorkflowExecutor
+
+
+TOOLS = ["airtable", "sendgrid", "slack"]
+
+
+def fan_out_steps(width: int, depth: int) -> List[WorkflowStep]:
+    """Trigger, `width` branches of `depth` steps each, and a join step"""
+    def step(step_id: str, tool: str, next_ids: List[str]) -> WorkflowStep:
+        return WorkflowStep.model_construct(
+            id=step_id,
+            name=step_id,
+            description="",
+            action_type="api_call",
+            tool=tool,
+            parameters={},
+            next_step_id=next_ids[0] if next_ids else None,
+            next_step_ids=next_ids[1:] or None
+        )
+
+    steps = [step("trigger", "webhook", [f"b{b}-0" for b in range(width)])]
+    for b in range(width):
+        for d in range(depth):
+            next_ids = [f"b{b}-{d + 1}"] if d + 1 < depth else ["join"]
+            steps.append(step(f"b{b}-{d}", TOOLS[(b + d) % len(TOOLS)], next_ids))
+    steps.append(step("join", "webhook", []))
+    return steps
+
+
+async def timed_run(executor: WorkflowExecutor, steps: List[WorkflowStep]) -> float:
+    started = time.perf_counter()
+    result = await executor.run(steps)
+    if not result.succeeded:
+        raise RuntimeError("benchmark run failed")
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.01, help="stub adapter latency per step, seconds")
+    parser.add_argument("--chunks", type=int, default=4, help="output chunks per step")
+    parser.add_argument("--tool-limit", type=int, default=64, help="concurrent steps per tool in parallel mode")
+    parser.add_argument("--sequential-max", type=int, default=500, help="skip the sequential run above this many steps")
+    args = parser.parse_args()
+
+    registry = AdapterRegistry(default=StubAdapter(latency=args.latency, chunks=args.chunks))
+    sequential = WorkflowExecutor(registry, default_tool_limit=1, max_retries=0)
+    parallel = WorkflowExecutor(registry, default_tool_limit=args.tool_limit, max_retries=0)
+
+    print(f"{'width':>6} {'steps':>6} {'limit=1 s':>13} {'parallel s':>11} {'speedup':>8} {'steps/s':>9}")
+    for width in args.width:
+        steps = fan_out_steps(width, args.depth)
+        parallel_seconds = asyncio.run(timed_run(parallel, steps))
+        if len(steps) <= args.sequential_max:
+            sequential_seconds = asyncio.run(timed_run(sequential, steps))
+            sequential_text = f"{sequential_seconds:>13.3f}"
+            speedup = f"{sequential_seconds / parallel_seconds:>7.1f}x"
+        else:
+            sequential_text, speedup = f"{'-':>13}", f"{'-':>8}"
+        print(
+            f"{width:>6} {len(steps):>6} {sequential_text} {parallel_seconds:>11.3f} "
+            f"{speedup} {len(steps) / parallel_seconds:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
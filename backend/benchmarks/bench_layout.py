@@ -0,0 +1,59 @@
+"""
+Layout Benchmark
+Times full and incremental LayeredLayout runs on large random workflow DAGs.
+
+Usage (from backend/):
+    python -m benchmarks.bench_layout --nodes 1000 5000 --fanout 2
+"""
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from workflow.layout import LayeredLayout
+
+
+def random_dag(nodes: int, fanout: float, seed: int) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """Mostly-forward random graph with branching, merging and a few back edges"""
+    rng = random.Random(seed)
+    node_ids = [f"step-{i + 1}" for i in range(nodes)]
+    edges = []
+    for i in range(1, nodes):
+        for _ in range(max(1, int(rng.expovariate(1 / fanout)))):
+            edges.append((node_ids[rng.randrange(max(0, i - 50), i)], node_ids[i]))
+    for _ in range(nodes // 100):
+        a, b = sorted(rng.sample(range(nodes), 2))
+        edges.append((node_ids[b], node_ids[a]))
+    return node_ids, edges
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--fanout", type=float, default=1.5)
+    parser.add_argument("--edits", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>7} {'edges':>7} {'layers':>7} {'full ms':>9} {'update ms':>10}")
+    for nodes in args.nodes:
+        node_ids, edges = random_dag(nodes, args.fanout, args.seed)
+        layout = LayeredLayout()
+
+        started = time.perf_counter()
+        layout.layout(node_ids, edges)
+        full_ms = (time.perf_counter() - started) * 1000
+
+        rng = random.Random(args.seed)
+        started = time.perf_counter()
+        for i in range(args.edits):
+            target = node_ids[rng.randrange(nodes)]
+            new_id = f"edit-{i}"
+            layout.update(add_nodes=[new_id], add_edges=[(target, new_id)])
+        update_ms = (time.perf_counter() - started) * 1000 / args.edits
+
+        print(f"{nodes:>7} {len(edges):>7} {len(layout.layers):>7} {full_ms:>9.1f} {update_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
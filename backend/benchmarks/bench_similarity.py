@@ -0,0 +1,93 @@
+"""
+Similarity Benchmark
+Fills a SimilarityIndex with synthetic automation goals and measures insert
+throughput, query latency percentiles and whether paraphrases find their
+source goal (or an identical one).
+
+Usage (from backend/):
+    python -m benchmarks.bench_similarity --entries 1000 10000 100000 --queries 1000
+"""
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from agents.similarity_index import SimilarityIndex
+
+
+TRIGGERS = [
+    "someone fills out my {a} form", "a new {a} order comes in", "a payment succeeds in {a}",
+    "a lead is created in {a}", "a ticket is opened in {a}", "a file is uploaded to {a}",
+    "every morning at {n} am", "a row is added to {a}", "a meeting is booked in {a}",
+]
+ACTIONS = [
+    "add them to {b}", "send a welcome email with {b}", "post a message to {b}",
+    "create a task in {b}", "text the customer with {b}", "update the record in {b}",
+    "log it in {b}", "notify the {c} team on {b}", "generate an invoice in {b}",
+]
+TOOLS = [
+    "typeform", "airtable", "shopify", "stripe", "hubspot", "zendesk", "dropbox", "sheets",
+    "calendly", "sendgrid", "slack", "asana", "twilio", "salesforce", "notion", "quickbooks",
+    "mailchimp", "trello", "jira", "gmail", "discord", "intercom", "pipedrive", "zoom",
+]
+TEAMS = ["sales", "support", "finance", "ops", "marketing", "engineering"]
+PARAPHRASE_PREFIX = ["please", "can you", "i want to", "help me", "automatically"]
+
+
+def make_goal(rng: random.Random) -> str:
+    trigger = rng.choice(TRIGGERS).format(a=rng.choice(TOOLS), n=rng.randint(5, 11))
+    actions = [
+        rng.choice(ACTIONS).format(b=rng.choice(TOOLS), c=rng.choice(TEAMS))
+        for _ in range(rng.randint(1, 3))
+    ]
+    return f"When {trigger}, " + " and ".join(actions)
+
+
+def paraphrase(goal: str, rng: random.Random) -> str:
+    words = goal.split()
+    words.insert(0, rng.choice(PARAPHRASE_PREFIX))
+    if len(words) > 6:
+        del words[rng.randrange(1, len(words))]
+    return " ".join(words)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def run(entries: int, queries: int, seed: int) -> Tuple[float, float, float, float]:
+    rng = random.Random(seed)
+    goals = [make_goal(rng) for _ in range(entries)]
+    index = SimilarityIndex(max_entries=entries)
+    started = time.perf_counter()
+    for i, goal in enumerate(goals):
+        index.add(str(i), goal)
+    insert_rate = entries / (time.perf_counter() - started)
+
+    latencies, found = [], 0
+    for _ in range(queries):
+        target = rng.randrange(entries)
+        query = paraphrase(goals[target], rng)
+        started = time.perf_counter()
+        matches = index.search(query, k=3)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found += bool(matches) and matches[0].text == goals[target]
+    return insert_rate, percentile(latencies, 50), percentile(latencies, 99), found / queries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'entries':>8} {'inserts/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'top-1 recall':>13}")
+    for entries in args.entries:
+        insert_rate, p50, p99, recall = run(entries, args.queries, args.seed)
+        print(f"{entries:>8} {insert_rate:>10.0f} {p50:>8.3f} {p99:>8.3f} {recall:>13.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Startup Benchmark
+Measures backend import time and peak RSS in mock and real (crew) mode, each
+in a fresh interpreter, with and without planner warm-up.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup --runs 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+# Runs in the child interpreter; prints timings and peak RSS as JSON
+_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+if {warm_up}:
+    main.workflow_planner.warm_up()
+warmed = time.perf_counter()
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    rss_kb //= 1024
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "warm_up_ms": (warmed - imported) * 1000,
+    "rss_mb": rss_kb / 1024,
+    "crewai_loaded": "crewai" in sys.modules,
+}}))
+"""
+
+SCENARIOS = [
+    ("mock", {"MOCK_MODE": "true"}, False),
+    ("crew (lazy)", {"MOCK_MODE": "false"}, False),
+    ("crew (warmed)", {"MOCK_MODE": "false"}, True),
+]
+
+
+def run_probe(env_overrides, warm_up: bool, data_dir: str) -> dict:
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "sk-benchmark"), **env_overrides)
+    # Every database the backend opens at import goes to the scratch directory
+    env["WORKFLOW_DB_PATH"] = os.path.join(data_dir, "workflows.db")
+    env["LLM_CACHE_PATH"] = os.path.join(data_dir, "llm_cache.db")
+    env["JOB_QUEUE_PATH"] = os.path.join(data_dir, "jobs.db")
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(warm_up=warm_up)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<15} {'import ms':>10} {'warm-up ms':>11} {'peak RSS MB':>12} {'crewai':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, env, warm_up in SCENARIOS:
+            try:
+                samples = [run_probe(env, warm_up, tmp) for _ in range(args.runs)]
+            except subprocess.CalledProcessError as e:
+                print(f"{name:<15} failed: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+                continue
+            print(
+                f"{name:<15} "
+                f"{statistics.median(s['import_ms'] for s in samples):>10.0f} "
+                f"{statistics.median(s['warm_up_ms'] for s in samples):>11.0f} "
+                f"{statistics.median(s['rss_mb'] for s in samples):>12.1f} "
+                f"{str(samples[-1]['crewai_loaded']):>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Fake OpenAI Server
+Local stand-in for the OpenAI chat completions API, so the real crew and
+fast-planner code paths can be load tested without spending quota.
+
+Latency is a fixed time-to-first-token plus completion tokens divided by a
+token throughput, with optional jitter. A fraction of requests can be
+answered with 429 insufficient_quota to exercise the mock fallback path.
+
+Usage (from backend/):
+    python -m benchmarks.fake_openai --port 8900 --latency 0.3 --tokens-per-second 80
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 python main.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+# Returned as the structured output for fast-mode planning
+CANNED_STEPS: List[Dict[str, Any]] = [
+    {
+        "id": "step-1",
+        "name": "Trigger: Form Submission",
+        "description": "Webhook fires when the form is submitted",
+        "action_type": "webhook",
+        "tool": "typeform",
+        "parameters": {"form_id": "{{form_id}}"},
+        "next_step_id": "step-2"
+    },
+    {
+        "id": "step-2",
+        "name": "Store Record",
+        "description": "Create a record with the submitted fields",
+        "action_type": "api_call",
+        "tool": "airtable",
+        "parameters": {"base_id": "{{base_id}}", "table": "Leads"},
+        "next_step_id": "step-3"
+    },
+    {
+        "id": "step-3",
+        "name": "Notify Team",
+        "description": "Post a message about the new submission",
+        "action_type": "notification",
+        "tool": "slack",
+        "parameters": {"channel": "#leads"},
+        "next_step_id": None
+    },
+]
+
+# Free-text answer for crew tasks; CrewAI agents finish on "Final Answer:"
+CANNED_TEXT = (
+    "Thought: I now know the final answer\n"
+    "Final Answer: The workflow is triggered by a form submission, stores the "
+    "submitted fields as a record and notifies the team. " + json.dumps({"steps": CANNED_STEPS})
+)
+
+
+class FakeOpenAIConfig:
+    """Tunable behaviour, shared by all handler threads"""
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        tokens_per_second: float = 100.0,
+        completion_tokens: int = 200,
+        jitter: float = 0.1,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def delay(self) -> float:
+        """Seconds to hold a successful response"""
+        base = self.latency
+        if self.tokens_per_second > 0:
+            base += self.completion_tokens / self.tokens_per_second
+        with self._lock:
+            spread = self._rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, base * (1 + spread))
+
+    def should_fail(self) -> bool:
+        """Count the request and decide whether it gets a 429"""
+        with self._lock:
+            self.requests += 1
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return failed
+
+
+def _completion(body: Dict[str, Any], config: FakeOpenAIConfig) -> Dict[str, Any]:
+    """Chat completion shaped for the kind of request that was made"""
+    prompt_tokens = sum(len(str(m.get("content") or "")) for m in body.get("messages", [])) // 4
+    message: Dict[str, Any] = {"role": "assistant", "content": CANNED_TEXT}
+    finish_reason = "stop"
+
+    tools = body.get("tools") or []
+    response_format = body.get("response_format") or {}
+    if tools:
+        # Function-calling structured output: answer with the first tool
+        name = tools[0].get("function", {}).get("name", "PlannedWorkflow")
+        message = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps({"steps": CANNED_STEPS})}
+            }]
+        }
+        finish_reason = "tool_calls"
+    elif response_format.get("type") in ("json_schema", "json_object"):
+        message["content"] = json.dumps({"steps": CANNED_STEPS})
+
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-3.5-turbo"),
+        "choices": [{"index": 0, "message": message, "logprobs": None, "finish_reason": finish_reason}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": config.completion_tokens,
+            "total_tokens": prompt_tokens + config.completion_tokens
+        }
+    }
+
+
+def _make_handler(config: FakeOpenAIConfig) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+                return
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+                return
+            if config.should_fail():
+                time.sleep(config.latency)
+                self._send(429, {"error": {
+                    "message": "You exceeded your current quota, please check your plan and billing details.",
+                    "type": "insufficient_quota",
+                    "code": "insufficient_quota"
+                }})
+                return
+            time.sleep(config.delay())
+            self._send(200, _completion(body, config))
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/").endswith("/models"):
+                self._send(200, {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model"}]})
+            else:
+                self._send(200, {"status": "ok", "requests": config.requests, "errors": config.errors})
+
+        def _send(self, status: int, payload: Dict[str, Any]) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+class FakeOpenAIServer:
+    """Threaded HTTP server running in the background; use as a context manager"""
+
+    def __init__(self, config: Optional[FakeOpenAIConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeOpenAIConfig()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self.config))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.2, help="time to first token, seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--completion-tokens", type=int, default=200)
+    parser.add_argument("--jitter", type=float, default=0.1, help="relative +/- spread of the delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        jitter=args.jitter,
+        error_rate=args.error_rate
+    )
+    server = FakeOpenAIServer(config, args.host, args.port).start()
+    print(f"Fake OpenAI API listening on {server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Load Test
+Drives POST /api/workflow/generate at a fixed concurrency against a backend
+started in a subprocess, with ChatOpenAI pointed at the local fake OpenAI
+server, and reports throughput, latency percentiles and peak RSS.
+
+Scenarios:
+    crew   - MOCK_MODE=false, three-agent crew against the fake server
+    fast   - MOCK_MODE=false, single structured call (mode="fast")
+    mock   - MOCK_MODE=true, rule-based mock planner
+    quota  - MOCK_MODE=false, fake server answers every call with 429
+             insufficient_quota, exercising the mock fallback
+
+Goals are made unique per request and the blueprint/LLM caches are disabled
+unless --cache is given, so every request does a full planner run.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --scenarios mock fast --requests 200 --concurrency 16
+    python -m benchmarks.load_test --output results.json --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.fake_openai import FakeOpenAIConfig, FakeOpenAIServer
+
+
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "crew": {"env": {"MOCK_MODE": "false"}, "mode": "deep", "error_rate": 0.0},
+    "fast": {"env": {"MOCK_MODE": "false"}, "mode": "fast", "error_rate": 0.0},
+    "mock": {"env": {"MOCK_MODE": "true"}, "mode": None, "error_rate": 0.0},
+    "quota": {"env": {"MOCK_MODE": "false"}, "mode": "deep", "error_rate": 1.0},
+}
+
+GOALS = [
+    "When someone fills out my Typeform, add them to Airtable and send a welcome email",
+    "Post new Stripe payments to Slack and log them in a Google Sheet",
+    "Every morning, email me a summary of yesterday's support tickets",
+    "When a lead is created in HubSpot, notify the sales channel",
+    "Sync new Shopify orders to Airtable and text the customer a confirmation",
+]
+
+# Fields compared against a baseline; True means higher is better
+TRACKED = {"throughput_rps": True, "p50_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _memory_mb(pid: int) -> Dict[str, Optional[float]]:
+    """Current and peak RSS of a process from /proc (None where unavailable)"""
+    values: Dict[str, Optional[float]] = {"rss_mb": None, "peak_rss_mb": None}
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    values["rss_mb"] = int(line.split()[1]) / 1024
+                elif line.startswith("VmHWM:"):
+                    values["peak_rss_mb"] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return values
+
+
+class Backend:
+    """The FastAPI app running under uvicorn in a child process"""
+
+    def __init__(self, env: Dict[str, str], port: int):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+             "--port", str(port), "--log-level", "warning", "--no-access-log"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+
+    def wait_ready(self, timeout: float = 60.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Backend exited: {self.process.stderr.read()[-2000:]}")
+            try:
+                if httpx.get(self.url + "/", timeout=1.0).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError("Backend did not become ready in time")
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+async def drive(
+    url: str,
+    total: int,
+    concurrency: int,
+    mode: Optional[str],
+    users: int,
+    tag: str
+) -> Dict[str, Any]:
+    """Send `total` requests with `concurrency` in flight; return raw latencies and statuses"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(total))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        for i in counter:
+            payload: Dict[str, Any] = {"goal": f"{GOALS[i % len(GOALS)]} ({tag} #{i})"}
+            if mode:
+                payload["mode"] = mode
+            # Spread requests over several API keys so per-client queue limits do not dominate
+            headers = {"X-API-Key": f"bench-user-{i % users}"}
+            started = time.perf_counter()
+            try:
+                response = await client.post(url + "/api/workflow/generate", json=payload, headers=headers)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                latencies.append(elapsed)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=300.0, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+    return {"latencies": latencies, "statuses": statuses, "wall_seconds": wall}
+
+
+def summarize(raw: Dict[str, Any]) -> Dict[str, Any]:
+    latencies = sorted(raw["latencies"])
+    ok = len(latencies)
+    return {
+        "requests": sum(raw["statuses"].values()),
+        "ok": ok,
+        "statuses": raw["statuses"],
+        "wall_seconds": raw["wall_seconds"],
+        "throughput_rps": ok / raw["wall_seconds"] if raw["wall_seconds"] else 0.0,
+        "mean_ms": sum(latencies) / ok * 1000 if ok else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+    }
+
+
+def run_scenario(name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    spec = SCENARIOS[name]
+    config = FakeOpenAIConfig(
+        latency=args.llm_latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        jitter=args.jitter,
+        error_rate=spec["error_rate"] if args.error_rate is None else args.error_rate,
+        seed=args.seed
+    )
+    with FakeOpenAIServer(config) as fake, tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update({
+            "OPENAI_API_KEY": "sk-benchmark",
+            "OPENAI_BASE_URL": fake.base_url,
+            "OPENAI_API_BASE": fake.base_url,
+            "WORKFLOW_DB_PATH": os.path.join(tmp, "workflows.db"),
+            "LLM_CACHE_PATH": os.path.join(tmp, "llm_cache.db"),
+            "JOB_QUEUE_PATH": os.path.join(tmp, "jobs.db"),
+        })
+        if not args.cache:
+            env.update({"BLUEPRINT_CACHE_SIZE": "0", "LLM_CACHE_STAGES": ""})
+        env.update(spec["env"])
+        for item in args.env:
+            key, _, value = item.partition("=")
+            env[key] = value
+
+        backend = Backend(env, _free_port())
+        try:
+            backend.wait_ready()
+            if args.warmup:
+                asyncio.run(drive(backend.url, args.warmup, min(args.warmup, args.concurrency),
+                                  spec["mode"], args.users, "warmup"))
+            raw = asyncio.run(drive(backend.url, args.requests, args.concurrency,
+                                    spec["mode"], args.users, name))
+            result = summarize(raw)
+            result.update(_memory_mb(backend.process.pid))
+            result["llm_calls"] = config.requests
+            result["llm_429s"] = config.errors
+            return result
+        finally:
+            backend.stop()
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print deltas against a saved run; return the regressions beyond `tolerance`"""
+    regressions = []
+    print(f"\nvs baseline {baseline.get('timestamp', '?')} (tolerance {tolerance:.0%})")
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for field, higher_is_better in TRACKED.items():
+            old, new = previous.get(field), current.get(field)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "REGRESSION" if worse > tolerance else ""
+            print(f"  {name:<6} {field:<15} {old:>10.1f} -> {new:>10.1f} ({change:+.1%}) {flag}")
+            if flag:
+                regressions.append(f"{name} {field} {change:+.1%}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=4, help="untimed requests before measuring")
+    parser.add_argument("--users", type=int, default=8, help="distinct API keys to spread requests over")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake server time to first token, seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--completion-tokens", type=int, default=200)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=None, help="override the scenario's 429 rate")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--cache", action="store_true", help="keep the blueprint and LLM caches enabled")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra backend environment, e.g. PLANNER_WORKERS=8")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "scenarios": {},
+    }
+
+    print(f"{'scenario':<8} {'ok':>6} {'rps':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} "
+          f"{'peak MB':>8} {'llm calls':>9}  statuses")
+    for name in args.scenarios:
+        try:
+            summary = run_scenario(name, args)
+        except RuntimeError as e:
+            print(f"{name:<8} failed: {e}")
+            continue
+        results["scenarios"][name] = summary
+        peak = summary["peak_rss_mb"]
+        print(
+            f"{name:<8} {summary['ok']:>6} {summary['throughput_rps']:>8.2f} "
+            f"{summary['p50_ms']:>9.0f} {summary['p90_ms']:>9.0f} {summary['p99_ms']:>9.0f} "
+            f"{(f'{peak:.0f}' if peak is not None else '-'):>8} {summary['llm_calls']:>9}  "
+            f"{summary['statuses']}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,75 @@
 """
 Sender Backend - AI-Powered Workflow Generation API
 """
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, Dict, Any, AsyncIterator, List, Literal
+import asyncio
+import hashlib
+import json
+import logging
 import os
 from dotenv import load_dotenv
 
+from agents.blueprint_cache import fresh_copy, make_cache_key
 from agents.workflow_planner import WorkflowPlanner
-from schemas.workflow import WorkflowBlueprint
+from schemas.workflow import WorkflowBlueprint, WorkflowPatch
+from services.cancellation import DISCONNECTED, CancelToken, PlanCancelled
+from services.encoding import (
+    UnsupportedFormat, compress, encode_blueprint, etag_version, negotiate_encoding, negotiate_media_type,
+    parse_fields, representation_etag
+)
+from services.job_queue import SUCCEEDED as JOB_SUCCEEDED, Job, JobQueue, JobQueueFull
+from services.logs import RequestLogMiddleware, configure_logging, current_request_id
+from services.metrics import metrics
+from services.planner_executor import PlannerExecutor, PlannerOverloaded
+from services.refinements import FAILED, READY, REFINING, RefinementTracker
+from services.sessions import SESSION_ID_RE, SessionStore
+from services.workflow_store import StoredWorkflow, WorkflowStore
+from workflow.graph import WorkflowGraphError
+from workflow.patch import diff_blueprints, patch_blueprint
 
 # Load environment variables
 load_dotenv()
 
+# JSON-lines logs written by a background thread; see services/logs.py
+log_pipeline = configure_logging(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    fmt=os.getenv("LOG_FORMAT", "json"),
+    queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+    sample_rate=float(os.getenv("LOG_SAMPLE_RATE", "0.1")),
+    transcript_entries=int(os.getenv("LOG_TRANSCRIPT_ENTRIES", "50")),
+    transcript_chars=int(os.getenv("LOG_TRANSCRIPT_CHARS", "4000"))
+)
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Rebuild the similarity index and optionally warm up the planner on startup; flush background work on shutdown"""
+    mock_mode = os.getenv("MOCK_MODE", "false").lower() == "true"
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(None, _load_similarity)
+    if not mock_mode and os.getenv("PLANNER_WARMUP", "false").lower() == "true":
+        await loop.run_in_executor(None, workflow_planner.warm_up)
+    yield
+    # Let queued and running plans finish (in a thread, so the refinements
+    # awaiting them can still store their results), then flush the store
+    await loop.run_in_executor(None, planner_executor.shutdown)
+    if _refine_tasks:
+        await asyncio.gather(*_refine_tasks, return_exceptions=True)
+    workflow_store.close()
+    log_pipeline.stop()
+
+
 app = FastAPI(
     title="Sender API",
     description="AI-Powered Automation Platform Backend",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -28,16 +80,327 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+# Request id for log correlation (X-Request-ID in and out) and one access record per request
+app.add_middleware(RequestLogMiddleware)
 
 # Initialize Workflow Planner
 workflow_planner = WorkflowPlanner()
 
+# Dedicated, bounded pool for planner runs (kept off the default thread pool)
+planner_executor = PlannerExecutor(
+    max_workers=int(os.getenv("PLANNER_WORKERS", "4")),
+    max_queue=int(os.getenv("PLANNER_QUEUE_SIZE", "32")),
+    max_queue_per_tenant=int(os.getenv("PLANNER_TENANT_QUEUE_SIZE", "8"))
+)
+
+# Every generated blueprint is persisted here (writes happen off the request path)
+workflow_store = WorkflowStore(
+    path=os.getenv("WORKFLOW_DB_PATH", "workflows.db"),
+    hot_size=int(os.getenv("WORKFLOW_HOT_CACHE_SIZE", "1024"))
+)
+
+# Durable queue for {"job": true} generations, planned by worker.py processes
+job_queue = JobQueue(
+    path=os.getenv("JOB_QUEUE_PATH", "jobs.db"),
+    lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+    retry_backoff=float(os.getenv("JOB_RETRY_BACKOFF", "5")),
+    max_queued=int(os.getenv("JOB_QUEUE_MAX", "1000"))
+)
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+
+# Similar-goal reuse and few-shot examples read earlier plans from the store
+def _stored_blueprint(workflow_id: str) -> Optional[WorkflowBlueprint]:
+    stored = workflow_store.get(workflow_id)
+    return stored.blueprint() if stored is not None else None
+
+
+async def _stored_workflow(workflow_id: str) -> Optional[StoredWorkflow]:
+    """Store lookup for handlers: memory hits inline, SQLite reads in a thread"""
+    stored = workflow_store.get_cached(workflow_id)
+    if stored is None:
+        loop = asyncio.get_event_loop()
+        stored = await loop.run_in_executor(None, workflow_store.get, workflow_id)
+    return stored
+
+
+def _load_similarity() -> None:
+    """Index the goals of the reusable plans stored by earlier runs and other processes"""
+    plans = workflow_store.reusable_goals(workflow_planner.similarity.max_entries)
+    loaded = workflow_planner.load_similarity(plans)
+    logger.info("Similarity index loaded", extra={"fields": {"plans": loaded}})
+
+
+workflow_planner.blueprint_lookup = _stored_blueprint
+
+# Planner deadlines: overall per request (queue wait included) and per crew stage
+PLAN_TIMEOUT = float(os.getenv("PLAN_TIMEOUT", "180"))
+PLAN_STAGE_TIMEOUT = float(os.getenv("PLAN_STAGE_TIMEOUT", "120"))
+# How often a waiting handler checks whether its client has disconnected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+
+# Blueprint responses are compressed above this size (gzip, or br if installed)
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+RESPONSE_COMPRESS_LEVEL = int(os.getenv("RESPONSE_COMPRESS_LEVEL", "5"))
+
+# Server-side conversation state for requests that send a session_id
+sessions = SessionStore(
+    max_sessions=int(os.getenv("SESSION_MAX", "1000")),
+    ttl_seconds=float(os.getenv("SESSION_TTL", "3600")),
+    recent_turns=int(os.getenv("SESSION_RECENT_TURNS", "4")),
+    summary_chars=int(os.getenv("SESSION_SUMMARY_CHARS", "1200"))
+)
+
+# Progressive generations whose template is still being refined by the planner
+refinements = RefinementTracker(ttl_seconds=float(os.getenv("REFINEMENT_TTL", "3600")))
+_refine_tasks: set = set()
+
+# Export component stats alongside the hot-path metrics on /metrics
+metrics.register_stats(
+    "blueprint_cache", "Blueprint cache", workflow_planner.cache.stats,
+    counters=["hits", "misses", "coalesced", "evictions", "expirations"]
+)
+metrics.register_stats(
+    "planner_executor", "Planner executor", planner_executor.stats,
+    counters=["submitted", "completed", "failed", "abandoned", "rejected_tenant", "rejected_full"]
+)
+metrics.register_stats(
+    "crew_pool", "Planner crew pool", workflow_planner.crew_pool_stats,
+    counters=["builds", "checkouts", "waits", "waited_seconds", "discarded"]
+)
+metrics.register_stats(
+    "workflow_store", "Workflow store", workflow_store.stats,
+    counters=["hot_hits", "db_reads", "writes", "overflows"]
+)
+metrics.register_stats(
+    "llm_cache", "LLM prompt cache", workflow_planner.llm_cache_stats,
+    counters=["hits", "misses", "writes", "evictions"]
+)
+metrics.register_stats(
+    "llm_rate_limiter", "LLM rate limiter", workflow_planner.rate_limiter_stats,
+    counters=["acquired", "throttled", "timeouts", "rate_limited", "waited_seconds"]
+)
+metrics.register_stats(
+    "similarity_index", "Similar-goal index", workflow_planner.similarity_stats,
+    counters=["queries"]
+)
+metrics.register_stats(
+    "job_queue", "Planner job queue", job_queue.stats,
+    counters=["enqueued", "rejected", "claimed", "completed", "retried", "failed", "expired"]
+)
+metrics.register_stats(
+    "logs", "Log pipeline", log_pipeline.stats,
+    counters=["enqueued", "dropped"]
+)
+metrics.register_stats(
+    "sessions", "Conversation sessions", sessions.stats,
+    counters=["created", "turns", "evictions", "expirations"]
+)
+metrics.register_stats(
+    "refinements", "Progressive refinements", refinements.stats,
+    counters=["started", "succeeded", "failed"]
+)
+
 
 class WorkflowRequest(BaseModel):
     """Request model for workflow generation"""
     goal: str
     context: Optional[Dict[str, Any]] = None
+    # "deep" runs the three-agent crew, "fast" a single structured LLM call;
+    # defaults to the PLANNER_MODE environment variable
+    mode: Optional[Literal["deep", "fast"]] = None
+    # Answer at once with a rule-based template (HTTP 202, status "refining") and
+    # refine it in the background; only used by /api/workflow/generate
+    progressive: bool = False
+    # Enqueue for the planner worker processes (worker.py) and answer 202 with a
+    # job id to poll on /api/jobs/{job_id}; only used by /api/workflow/generate
+    job: bool = False
+    # Overall planning deadline in seconds, capped by PLAN_TIMEOUT
+    timeout: Optional[float] = None
+    # Conversation this turn belongs to: `goal` is only the new message and the
+    # server supplies the earlier turns, analysis and blueprint
+    session_id: Optional[str] = None
+
+
+class BatchWorkflowItem(BaseModel):
+    """
+    One goal of a batch. Takes the planning fields of WorkflowRequest;
+    `progressive`, `job` and `session_id` (or any other field) are rejected
+    with 422 rather than silently ignored.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    goal: str
+    context: Optional[Dict[str, Any]] = None
+    mode: Optional[Literal["deep", "fast"]] = None
+    # Planning deadline in seconds, counted from when the item starts
+    timeout: Optional[float] = None
+
+
+class BatchWorkflowRequest(BaseModel):
+    """Request model for batch workflow generation"""
+    requests: List[BatchWorkflowItem]
+    # Maximum planner runs in flight for this batch (capped by BATCH_MAX_CONCURRENCY)
+    concurrency: Optional[int] = None
+    # Stream per-item results as server-sent events instead of one JSON response
+    stream: bool = False
+
+
+class WorkflowEditRequest(BaseModel):
+    """Request model for re-planning selected steps of a stored workflow"""
+    instruction: str
+    step_ids: List[str]
+    context: Optional[Dict[str, Any]] = None
+
+
+class _SessionTurn:
+    """
+    One turn of a (possibly session-less) generation request. For session
+    requests it swaps in the session's compacted context, picks the goal
+    analysis out of the planner's progress events and records the turn once
+    the blueprint is ready.
+    """
+
+    def __init__(self, request: WorkflowRequest, on_event: Optional[Any] = None):
+        self.session_id = request.session_id
+        self.goal = request.goal
+        self.analysis: Optional[str] = None
+        self._on_event = on_event
+        if self.session_id is None:
+            self.request = request
+            return
+        if not SESSION_ID_RE.match(self.session_id):
+            raise HTTPException(status_code=400, detail="session_id must be 8-64 letters, digits, '-' or '_'")
+        context = sessions.context_for(self.session_id, request.context)
+        self.request = request.model_copy(update={"context": context})
+
+    @property
+    def on_event(self) -> Optional[Any]:
+        """Progress listener to hand to the planner (None if nobody listens)"""
+        return self._listen if self.session_id is not None else self._on_event
+
+    def _listen(self, event: str, data: Dict[str, Any]) -> None:
+        if event == "stage" and data.get("stage") == "goal_analysis" and data.get("status") == "completed":
+            self.analysis = data.get("output")
+        if self._on_event is not None:
+            self._on_event(event, data)
+
+    def finish(self, blueprint: Optional[WorkflowBlueprint] = None) -> None:
+        if self.session_id is not None:
+            sessions.record_turn(self.session_id, self.goal, blueprint, self.analysis)
+
+
+class _ResponseEncoding:
+    """
+    How a client wants blueprints back: `fields` (names or the views
+    "steps"/"graph"), JSON or MessagePack (`format` or Accept) and a
+    compression negotiated from Accept-Encoding. Built before planning so bad
+    options fail fast with 400/406.
+    """
+
+    def __init__(self, http_request: Request, fields: Optional[str], response_format: Optional[str]):
+        try:
+            self.fields = parse_fields(fields)
+            self.media_type = negotiate_media_type(http_request.headers.get("accept"), response_format)
+        except UnsupportedFormat as e:
+            raise HTTPException(status_code=406, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        self.coding = negotiate_encoding(http_request.headers.get("accept-encoding"))
+
+    def response(
+        self,
+        blueprint: Any,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        extra: Optional[Dict[str, Any]] = None
+    ) -> Response:
+        """
+        Encode a blueprint (model or stored JSON body) into a Response. An
+        ETag header (the stored version's tag) becomes this representation's tag.
+        """
+        body = encode_blueprint(blueprint, self.fields, self.media_type, extra)
+        body, coding = compress(body, self.coding, RESPONSE_COMPRESS_MIN_BYTES, RESPONSE_COMPRESS_LEVEL)
+        headers = {**(headers or {}), "Vary": "Accept, Accept-Encoding"}
+        if "ETag" in headers:
+            headers["ETag"] = self.etag(headers["ETag"])
+        if coding:
+            headers["Content-Encoding"] = coding
+        return Response(content=body, status_code=status_code, media_type=self.media_type, headers=headers)
+
+    def etag(self, etag: str) -> str:
+        """
+        Tag of the representation this request negotiated. It follows the
+        negotiated coding even when a small body is sent uncompressed, so it
+        is known before encoding (for 304s).
+        """
+        return representation_etag(etag, self.media_type, self.fields, self.coding)
+
+
+def _tenant_id(http_request: Request) -> str:
+    """Identify the caller for fair scheduling: API key if sent, else client address"""
+    api_key = http_request.headers.get("x-api-key") or http_request.headers.get("authorization")
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    if http_request.client:
+        return f"ip:{http_request.client.host}"
+    return "anonymous"
+
+
+def _cancel_token(timeout: Optional[float] = None) -> CancelToken:
+    """Token with the request's deadline (never beyond PLAN_TIMEOUT) and the stage deadline"""
+    limit = PLAN_TIMEOUT or None
+    if timeout and timeout > 0:
+        limit = min(timeout, limit) if limit else timeout
+    return CancelToken(timeout=limit, stage_timeout=PLAN_STAGE_TIMEOUT)
+
+
+async def _await_plan(http_request: Request, future: asyncio.Future, *cancels: CancelToken) -> Any:
+    """
+    Await planner work while watching the client connection. If the client
+    disconnects first, the tokens are cancelled (running plans stop at their
+    next check) and the future is cancelled (queued plans are dropped).
+    """
+    while True:
+        done, _ = await asyncio.wait({future}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return future.result()
+        if await http_request.is_disconnected():
+            for cancel in cancels:
+                cancel.cancel(DISCONNECTED)
+            future.cancel()
+            # Nobody reads the outcome any more (gather() may still finish with an error)
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            raise HTTPException(status_code=499, detail="Client closed request")
+
+
+def _cancelled_error(error: PlanCancelled) -> HTTPException:
+    """499 if the client went away, 504 if planning ran out of time"""
+    if error.reason == DISCONNECTED:
+        return HTTPException(status_code=499, detail="Client closed request")
+    return HTTPException(status_code=504, detail=str(error))
+
+
+def _submit_plan(http_request: Request, request: WorkflowRequest, **kwargs: Any) -> asyncio.Future:
+    """Queue a planner run, turning admission rejections into 429/503 responses"""
+    try:
+        future = planner_executor.submit(
+            _tenant_id(http_request),
+            workflow_planner.plan_workflow,
+            request.goal,
+            request.context or {},
+            mode=request.mode,
+            **kwargs
+        )
+    except PlannerOverloaded as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return asyncio.wrap_future(future)
 
 
 @app.get("/")
@@ -47,7 +410,12 @@ async def root():
 
 
 @app.post("/api/workflow/generate", response_model=WorkflowBlueprint)
-async def generate_workflow(request: WorkflowRequest):
+async def generate_workflow(
+    request: WorkflowRequest,
+    http_request: Request,
+    fields: Optional[str] = None,
+    response_format: Optional[str] = Query(None, alias="format")
+):
     """
     Generate a workflow blueprint from a natural language goal.
     
@@ -55,33 +423,607 @@ async def generate_workflow(request: WorkflowRequest):
     1. Understand the user's goal
     2. Break it down into steps
     3. Generate a React Flow compatible blueprint
+    
+    `fields` limits the response (e.g. "steps" or "graph"), `format=msgpack`
+    (or Accept: application/msgpack) returns MessagePack.
     """
+    encoding = _ResponseEncoding(http_request, fields, response_format)
+    turn = _SessionTurn(request)
+    if request.job:
+        if request.progressive:
+            raise HTTPException(status_code=400, detail="job and progressive cannot be combined")
+        return await _enqueue_job(turn, http_request)
+    if request.progressive:
+        return await _generate_progressive(turn, http_request, encoding)
+    
+    # Run the workflow planner (synchronous but slow, so run in the planner pool)
+    cancel = _cancel_token(request.timeout)
+    future = _submit_plan(http_request, turn.request, on_event=turn.on_event, cancel=cancel)
     try:
-        # Run the workflow planner (synchronous but CPU-intensive, so run in thread pool)
-        import asyncio
-        import traceback
-        loop = asyncio.get_event_loop()
-        blueprint = await loop.run_in_executor(
-            None,
-            workflow_planner.plan_workflow,
-            request.goal,
-            request.context or {}
+        blueprint = await _await_plan(http_request, future, cancel)
+        workflow_store.save(blueprint, reusable=workflow_planner.index_plan(blueprint))
+        turn.finish(blueprint)
+        return encoding.response(blueprint)
+    except HTTPException:
+        raise
+    except PlanCancelled as e:
+        raise _cancelled_error(e)
+    except Exception as e:
+        logger.exception("Error generating workflow", extra={"fields": {"goal": request.goal}})
+        raise HTTPException(status_code=500, detail=f"Error generating workflow: {e}")
+
+
+async def _generate_progressive(turn: _SessionTurn, http_request: Request, encoding: _ResponseEncoding) -> Response:
+    """
+    Return the template blueprint right away and refine it in the background.
+    The refined version replaces the template under the same workflow_id; fetch
+    it with GET /api/workflow/{id}?wait=N or subscribe on /api/workflow/{id}/ws.
+    """
+    request = turn.request
+    mock_mode = os.getenv("MOCK_MODE", "false").lower() == "true"
+    cached = None if mock_mode else workflow_planner.cached_plan(request.goal, request.context, request.mode)
+    if mock_mode or cached is not None:
+        # Nothing better is coming, so answer with the final blueprint
+        blueprint = cached
+        if blueprint is None:
+            cancel = _cancel_token(request.timeout)
+            future = _submit_plan(http_request, request, cancel=cancel)
+            try:
+                blueprint = await _await_plan(http_request, future, cancel)
+            except HTTPException:
+                raise
+            except PlanCancelled as e:
+                raise _cancelled_error(e)
+            except Exception as e:
+                logger.exception("Error generating workflow", extra={"fields": {"goal": request.goal}})
+                raise HTTPException(status_code=500, detail=f"Error generating workflow: {e}")
+        stored = workflow_store.save(blueprint, reusable=workflow_planner.index_plan(blueprint))
+        turn.finish(blueprint)
+        return _progressive_response(encoding, blueprint, READY, stored.etag)
+    
+    # The refinement outlives this request, so only its deadline can stop it
+    template = workflow_planner.template_workflow(request.goal)
+    future = _submit_plan(http_request, request, on_event=turn.on_event, cancel=_cancel_token(request.timeout))
+    stored = workflow_store.save(template)
+    refinements.start(template.workflow_id)
+    task = asyncio.create_task(_refine(template.workflow_id, future, turn))
+    _refine_tasks.add(task)
+    task.add_done_callback(_refine_tasks.discard)
+    return _progressive_response(encoding, template, REFINING, stored.etag)
+
+
+async def _refine(workflow_id: str, future: asyncio.Future, turn: _SessionTurn) -> None:
+    """Store the planner's blueprint in place of the template once it lands"""
+    try:
+        planned = await future
+        refined = planned.model_copy(update={"workflow_id": workflow_id})
+        # Indexed under the template's id, which is the one stored
+        stored = workflow_store.save(refined, reusable=workflow_planner.index_plan(planned, workflow_id))
+        refinements.finish(workflow_id, READY, etag=stored.etag)
+        turn.finish(refined)
+    except Exception as e:
+        logger.exception("Error refining workflow", extra={"fields": {"workflow_id": workflow_id}})
+        refinements.finish(workflow_id, FAILED, error=str(e))
+
+
+async def _enqueue_job(turn: _SessionTurn, http_request: Request) -> Response:
+    """
+    Queue the goal for the planner worker processes. The session turn is
+    recorded now, with the session context resolved into the job, since the
+    blueprint is produced in another process.
+    """
+    request = turn.request
+    payload = {
+        "goal": request.goal,
+        "context": request.context or {},
+        "mode": request.mode,
+        "timeout": request.timeout,
+        "request_id": current_request_id(),
+    }
+    loop = asyncio.get_event_loop()
+    try:
+        job = await loop.run_in_executor(None, job_queue.enqueue, payload, _tenant_id(http_request))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Job queue is full: {e}", headers={"Retry-After": "5"})
+    turn.finish()
+    return JSONResponse(
+        content=_job_body(job),
+        status_code=202,
+        headers={"Location": f"/api/jobs/{job.job_id}"}
+    )
+
+
+def _job_body(job: Job) -> Dict[str, Any]:
+    body = job.to_dict()
+    if job.status == JOB_SUCCEEDED:
+        body["result_url"] = f"/api/workflow/{job.workflow_id}"
+    return body
+
+
+def _progressive_response(encoding: _ResponseEncoding, blueprint: WorkflowBlueprint, status: str, etag: str) -> Response:
+    return encoding.response(
+        blueprint,
+        status_code=202 if status == REFINING else 200,
+        headers={
+            "ETag": etag,
+            "X-Workflow-Status": status,
+            "Location": f"/api/workflow/{blueprint.workflow_id}"
+        },
+        extra={"status": status}
+    )
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/api/workflow/generate/stream")
+async def generate_workflow_stream(request: WorkflowRequest, http_request: Request):
+    """
+    Generate a workflow blueprint, streaming progress as server-sent events.
+    
+    Events:
+    - started: request accepted
+    - stage: a crew task started/completed (goal_analysis, workflow_design, blueprint)
+    - fallback: the planner degraded to the mock workflow
+    - node / edge: one React Flow node or edge of the blueprint. The planner
+      produces the graph in one piece at the end, so these are a replay of
+      the finished blueprint, sent just before "complete"; clients can draw
+      them one by one, but they carry no earlier progress than "stage"
+    - complete: the full WorkflowBlueprint
+    - error: planning failed
+    """
+    loop = asyncio.get_event_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    done = object()
+    
+    def on_event(event: str, data: Dict[str, Any]) -> None:
+        # Called from the planner thread
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+    
+    # Admission happens before the stream opens so overload is a plain 429/503
+    turn = _SessionTurn(request, on_event)
+    cancel = _cancel_token(request.timeout)
+    future = _submit_plan(http_request, turn.request, on_event=turn.on_event, cancel=cancel)
+    future.add_done_callback(lambda _: events.put_nowait((done, None)))
+    
+    async def event_stream() -> AsyncIterator[str]:
+        yield _sse("started", {"goal": request.goal})
+        
+        try:
+            while True:
+                event, data = await events.get()
+                if event is done:
+                    break
+                yield _sse(event, data)
+        finally:
+            # The stream is closed early when the client disconnects
+            if not future.done():
+                cancel.cancel(DISCONNECTED)
+                future.cancel()
+        
+        try:
+            blueprint = future.result()
+        except PlanCancelled as e:
+            yield _sse("error", {"detail": str(e), "reason": e.reason})
+            return
+        except Exception as e:
+            logger.exception("Error generating workflow", extra={"fields": {"goal": request.goal}})
+            yield _sse("error", {"detail": f"Error generating workflow: {e}"})
+            return
+        
+        workflow_store.save(blueprint, reusable=workflow_planner.index_plan(blueprint))
+        turn.finish(blueprint)
+        # Replayed from the finished blueprint (no stage yields partial graphs)
+        for node in blueprint.nodes:
+            yield _sse("node", node)
+        for edge in blueprint.edges:
+            yield _sse("edge", edge)
+        yield _sse("complete", blueprint.model_dump())
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+BATCH_ADMISSION_RETRIES = 3
+
+
+@app.post("/api/workflow/generate/batch")
+async def generate_workflow_batch(batch: BatchWorkflowRequest, http_request: Request):
+    """
+    Generate blueprints for many goals at once.
+    
+    Identical goals (same normalized goal, context and mode) are planned once
+    and each occurrence gets its own copy. Unique goals are scheduled on the
+    planner pool with bounded concurrency. A failure only affects its own items.
+    Items take `goal`, `context`, `mode` and `timeout` only: progressive, job
+    and session generations go through /api/workflow/generate.
+    
+    Returns {"results": [...], "succeeded", "failed", "unique_goals"}, or with
+    `stream` set, server-sent "item" events followed by a "complete" summary.
+    """
+    if not batch.requests:
+        raise HTTPException(status_code=422, detail="Batch must contain at least one request")
+    if len(batch.requests) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} requests")
+    
+    tenant = _tenant_id(http_request)
+    concurrency = max(1, min(batch.concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    # Group item indexes by dedup key
+    groups: Dict[str, List[int]] = {}
+    for index, item in enumerate(batch.requests):
+        key = make_cache_key(item.goal, item.context, item.mode or workflow_planner.default_mode)
+        groups.setdefault(key, []).append(index)
+    
+    cancels: List[CancelToken] = []
+    
+    async def plan_group(indexes: List[int]) -> List[Dict[str, Any]]:
+        item = batch.requests[indexes[0]]
+        async with semaphore:
+            # The deadline starts when the item's turn comes, not with the batch
+            cancel = _cancel_token(item.timeout)
+            cancels.append(cancel)
+            for attempt in range(BATCH_ADMISSION_RETRIES + 1):
+                try:
+                    future = planner_executor.submit(
+                        tenant,
+                        workflow_planner.plan_workflow,
+                        item.goal,
+                        item.context or {},
+                        mode=item.mode,
+                        cancel=cancel
+                    )
+                    blueprint = await asyncio.wrap_future(future)
+                    break
+                except PlannerOverloaded as e:
+                    if attempt == BATCH_ADMISSION_RETRIES:
+                        return [
+                            {"index": i, "status": "error", "status_code": e.status_code, "error": str(e)}
+                            for i in indexes
+                        ]
+                    await asyncio.sleep(min(e.retry_after, 5))
+                except PlanCancelled as e:
+                    return [
+                        {"index": i, "status": "error", "status_code": _cancelled_error(e).status_code, "error": str(e)}
+                        for i in indexes
+                    ]
+                except Exception as e:
+                    logger.exception("Error generating workflow in batch", extra={"fields": {"goal": item.goal}})
+                    return [
+                        {"index": i, "status": "error", "status_code": 500, "error": f"Error generating workflow: {e}"}
+                        for i in indexes
+                    ]
+        
+        results = []
+        for position, i in enumerate(indexes):
+            if position == 0:
+                copy, reusable = blueprint, workflow_planner.index_plan(blueprint)
+            else:
+                copy, reusable = fresh_copy(blueprint, batch.requests[i].goal), False
+            workflow_store.save(copy, reusable=reusable)
+            results.append({"index": i, "status": "ok", "blueprint": copy.model_dump()})
+        return results
+    
+    tasks = [asyncio.ensure_future(plan_group(indexes)) for indexes in groups.values()]
+    
+    def summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        succeeded = sum(1 for result in results if result["status"] == "ok")
+        return {
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "unique_goals": len(groups)
+        }
+    
+    def abandon() -> None:
+        for cancel in cancels:
+            cancel.cancel(DISCONNECTED)
+        for task in tasks:
+            task.cancel()
+    
+    if batch.stream:
+        async def event_stream() -> AsyncIterator[str]:
+            results: List[Dict[str, Any]] = []
+            try:
+                for task in asyncio.as_completed(tasks):
+                    for result in await task:
+                        results.append(result)
+                        yield _sse("item", result)
+            finally:
+                # Closed early when the client disconnects
+                if len(results) < len(batch.requests):
+                    abandon()
+            yield _sse("complete", summary(results))
+        
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    gathered = asyncio.gather(*tasks)
+    try:
+        groups_done = await _await_plan(http_request, gathered)
+    except HTTPException:
+        abandon()
+        raise
+    results = [result for group in groups_done for result in group]
+    results.sort(key=lambda result: result["index"])
+    return {"results": results, **summary(results)}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics"""
+    # Some stats collectors query SQLite (the job queue), so render in a thread
+    loop = asyncio.get_event_loop()
+    body = await loop.run_in_executor(None, metrics.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/workflow/cache/stats")
+async def get_cache_stats():
+    """Blueprint cache hit/miss/coalesce counters"""
+    return workflow_planner.cache.stats()
+
+
+@app.get("/api/workflow/llm-cache/stats")
+async def get_llm_cache_stats():
+    """LLM prompt cache size and hit/miss counters"""
+    return workflow_planner.llm_cache_stats()
+
+
+@app.get("/api/session/{session_id}")
+async def get_session(session_id: str):
+    """Turn count, recent turns, folded summary and latest workflow id of a session"""
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+@app.delete("/api/session/{session_id}")
+async def delete_session(session_id: str):
+    """Forget a session; the next turn with this id starts a new conversation"""
+    if not sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, "deleted": True}
+
+
+async def _wait_for_job(job_id: str, wait: float) -> Job:
+    """The job, re-read every JOB_POLL_SECONDS until it finishes or `wait` (max 60 s) runs out"""
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + min(max(wait, 0.0), 60.0)
+    while True:
+        job = await loop.run_in_executor(None, job_queue.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        remaining = deadline - loop.time()
+        if job.finished or remaining <= 0:
+            return job
+        await asyncio.sleep(min(JOB_POLL_SECONDS, remaining))
+
+
+@app.get("/api/jobs/stats")
+async def get_job_stats():
+    """Jobs by status, oldest waiting job and this process's queue counters"""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, job_queue.stats)
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Status of a queued generation (long-polls up to `wait` seconds for it to finish)"""
+    return _job_body(await _wait_for_job(job_id, wait))
+
+
+@app.get("/api/jobs/{job_id}/result", response_model=WorkflowBlueprint)
+async def get_job_result(
+    job_id: str,
+    http_request: Request,
+    wait: float = 0,
+    fields: Optional[str] = None,
+    response_format: Optional[str] = Query(None, alias="format")
+):
+    """
+    Blueprint of a finished job (same `fields`/`format` options as the
+    workflow endpoints). 202 with the job status while it is still pending,
+    409 if it failed or was cancelled.
+    """
+    encoding = _ResponseEncoding(http_request, fields, response_format)
+    job = await _wait_for_job(job_id, wait)
+    if not job.finished:
+        return JSONResponse(content=_job_body(job), status_code=202, headers={"Retry-After": "1"})
+    if job.status != JOB_SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job {job.status}: {job.error or 'no result'}")
+    stored = await _stored_workflow(job.workflow_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return encoding.response(stored.body, headers={"ETag": stored.etag, "Location": f"/api/workflow/{job.workflow_id}"})
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job; finished jobs are returned unchanged"""
+    loop = asyncio.get_event_loop()
+    job = await loop.run_in_executor(None, job_queue.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_body(job)
+
+
+@app.get("/api/workflow/executor/stats")
+async def get_executor_stats():
+    """Planner queue depth, utilization, rejections and wait times"""
+    return planner_executor.stats()
+
+
+@app.get("/api/workflow/store/stats")
+async def get_store_stats():
+    """Workflow store hot-cache and write-behind counters"""
+    return workflow_store.stats()
+
+
+@app.get("/api/workflows")
+async def list_workflows(limit: int = 20, before: Optional[int] = None):
+    """List stored workflows, newest first; pass next_cursor as `before` for the next page"""
+    limit = max(1, min(limit, 100))
+    loop = asyncio.get_event_loop()
+    items, next_cursor = await loop.run_in_executor(None, workflow_store.list_workflows, limit, before)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@app.post("/api/workflow/{workflow_id}/replan", response_model=WorkflowPatch)
+async def replan_workflow_steps(workflow_id: str, request: WorkflowEditRequest, http_request: Request):
+    """
+    Re-plan only the given steps of a stored workflow and return a JSON Patch
+    from the stored version to the edited one. Send If-Match with the stored
+    ETag to reject the edit (412) if the workflow changed in the meantime.
+    """
+    stored = await _stored_workflow(workflow_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    if_match = http_request.headers.get("if-match")
+    # Any representation's tag (e.g. from a gzip or msgpack GET) names the same version
+    if if_match and stored.etag not in [etag_version(tag) for tag in if_match.split(",")] and if_match.strip() != "*":
+        raise HTTPException(status_code=412, detail="Workflow has changed", headers={"ETag": stored.etag})
+    
+    base = stored.blueprint()
+    cancel = _cancel_token()
+    try:
+        future = planner_executor.submit(
+            _tenant_id(http_request),
+            workflow_planner.replan_steps,
+            base,
+            request.step_ids,
+            request.instruction,
+            request.context or {},
+            cancel=cancel
         )
-        return blueprint
+    except PlannerOverloaded as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    try:
+        edited = await _await_plan(http_request, asyncio.wrap_future(future), cancel)
+    except HTTPException:
+        raise
+    except PlanCancelled as e:
+        raise _cancelled_error(e)
+    except (ValueError, WorkflowGraphError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        import traceback
-        error_detail = str(e)
-        error_traceback = traceback.format_exc()
-        print(f"Error generating workflow: {error_detail}")
-        print(f"Traceback: {error_traceback}")
-        raise HTTPException(status_code=500, detail=f"Error generating workflow: {error_detail}")
-
-
-@app.get("/api/workflow/{workflow_id}")
-async def get_workflow(workflow_id: str):
-    """Retrieve a previously generated workflow"""
-    # TODO: Implement workflow storage/retrieval
-    return {"message": "Workflow retrieval not yet implemented"}
+        logger.exception("Error re-planning workflow", extra={"fields": {"workflow_id": workflow_id}})
+        raise HTTPException(status_code=500, detail=f"Error re-planning workflow: {e}")
+    
+    patch = diff_blueprints(base, edited)
+    updated = workflow_store.save(patch_blueprint(base, patch))
+    return WorkflowPatch(workflow_id=workflow_id, base_etag=stored.etag, etag=updated.etag, patch=patch)
+
+
+@app.get("/api/workflow/{workflow_id}/status")
+async def get_workflow_status(workflow_id: str, wait: float = 0):
+    """Refinement status of a progressive generation (long-polls up to `wait` seconds)"""
+    status = await refinements.wait(workflow_id, min(wait, 60.0)) if wait > 0 else refinements.status(workflow_id)
+    if status is None:
+        if await _stored_workflow(workflow_id) is None:
+            raise HTTPException(status_code=404, detail="Workflow not found")
+        return {"workflow_id": workflow_id, "status": READY}
+    return status
+
+
+@app.websocket("/api/workflow/{workflow_id}/ws")
+async def workflow_updates(websocket: WebSocket, workflow_id: str):
+    """Send the workflow's status, then the refined blueprint once it lands"""
+    await websocket.accept()
+    try:
+        await _send_workflow_updates(websocket, workflow_id)
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
+
+
+async def _send_workflow_updates(websocket: WebSocket, workflow_id: str) -> None:
+    status = refinements.status(workflow_id)
+    if status is None and await _stored_workflow(workflow_id) is None:
+        await websocket.send_json({"event": "error", "detail": "Workflow not found"})
+        return
+    await websocket.send_json({"event": "status", "status": status["status"] if status else READY})
+    if status is not None and status["status"] == REFINING:
+        status = await _wait_for_refinement(websocket, workflow_id)
+        if status is not None and status["status"] == REFINING:
+            await websocket.send_json({"event": "timeout", "detail": "Refinement did not finish within the deadline"})
+            return
+    if status is not None and status["status"] == FAILED:
+        await websocket.send_json({"event": "failed", "detail": status["error"]})
+        return
+    stored = await _stored_workflow(workflow_id)
+    await websocket.send_json({"event": "refined", "etag": stored.etag, "blueprint": json.loads(stored.body)})
+
+
+async def _wait_for_refinement(websocket: WebSocket, workflow_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Wait for a refinement until the request deadline (as for a planner run),
+    raising WebSocketDisconnect as soon as the client goes away. Messages
+    from the client are ignored.
+    """
+    deadline = _cancel_token().remaining()
+    finished = asyncio.ensure_future(refinements.wait(workflow_id, deadline))
+    received = None
+    try:
+        while True:
+            received = asyncio.ensure_future(websocket.receive())
+            done, _ = await asyncio.wait({finished, received}, return_when=asyncio.FIRST_COMPLETED)
+            if finished in done:
+                return finished.result()
+            message = received.result()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+    finally:
+        finished.cancel()
+        if received is not None:
+            received.cancel()
+
+
+@app.get("/api/workflow/{workflow_id}", response_model=WorkflowBlueprint)
+async def get_workflow(
+    workflow_id: str,
+    http_request: Request,
+    wait: float = 0,
+    fields: Optional[str] = None,
+    response_format: Optional[str] = Query(None, alias="format")
+):
+    """
+    Retrieve a previously generated workflow (supports If-None-Match).
+    While a progressive generation is refining, `wait` long-polls up to that
+    many seconds (max 60) for the refined version. `fields` and `format`
+    work as for POST /api/workflow/generate.
+    """
+    encoding = _ResponseEncoding(http_request, fields, response_format)
+    status = refinements.status(workflow_id)
+    if status is not None and status["status"] == REFINING and wait > 0:
+        status = await refinements.wait(workflow_id, min(wait, 60.0))
+    stored = await _stored_workflow(workflow_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    
+    headers = {"ETag": stored.etag, "Cache-Control": "no-cache"}
+    etag = encoding.etag(stored.etag)
+    if status is not None:
+        headers["X-Workflow-Status"] = status["status"]
+    if_none_match = http_request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers={**headers, "ETag": etag, "Vary": "Accept, Accept-Encoding"})
+    return encoding.response(stored.body, headers=headers)
 
 
 if __name__ == "__main__":
@@ -14,6 +14,7 @@ class WorkflowStep(BaseModel):
     tool: str  # e.g., "airtable", "sendgrid", "webhook"
     parameters: Dict[str, Any]
     next_step_id: Optional[str] = None
+    next_step_ids: Optional[List[str]] = None  # additional successors when the workflow branches
 
 
 class WorkflowBlueprint(BaseModel):
@@ -24,3 +25,20 @@ class WorkflowBlueprint(BaseModel):
     edges: List[Dict[str, Any]]  # React Flow edges format
     nodes: List[Dict[str, Any]]  # React Flow nodes format
 
+
+class PlannedWorkflow(BaseModel):
+    """Structured LLM output for the single-call planner"""
+    steps: List[WorkflowStep]
+
+
+class PlannedStepEdit(BaseModel):
+    """Structured LLM output for re-planning selected steps"""
+    steps: List[WorkflowStep]  # replacements for the targeted steps plus any new steps
+
+
+class WorkflowPatch(BaseModel):
+    """JSON Patch (RFC 6902) turning the stored blueprint into the edited one"""
+    workflow_id: str
+    base_etag: str  # Version ETag (the plain JSON representation's) the patch applies to
+    etag: str  # Version ETag after the patch
+    patch: List[Dict[str, Any]]
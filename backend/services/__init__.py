@@ -0,0 +1,2 @@
+"""Backend services for scheduling and running the workflow planner"""
+
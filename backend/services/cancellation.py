@@ -0,0 +1,124 @@
+"""
+Cancellation
+Per-request deadlines and cooperative cancellation for planner runs. The
+request handler owns a CancelToken; the planner thread binds it for the run
+and checks it between crew tasks and before every LLM HTTP call, so work
+for a client that has gone away or run out of time stops early.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from services.metrics import PLANS_CANCELLED
+
+
+DISCONNECTED = "disconnected"
+DEADLINE = "deadline"
+STAGE_DEADLINE = "stage_deadline"
+# Queued jobs (worker.py): the job was cancelled, or its lease passed to another worker
+JOB_CANCELLED = "job_cancelled"
+# Queued jobs: the worker is shutting down and hands the job back to the queue
+WORKER_STOPPING = "worker_stopping"
+
+
+class PlanCancelled(Exception):
+    """Raised in the planner thread once its token is cancelled or past a deadline"""
+
+    def __init__(self, message: str, reason: str, stage: Optional[str] = None):
+        super().__init__(message)
+        self.reason = reason
+        self.stage = stage
+
+
+class CancelToken:
+    """
+    Cancellation flag with an optional overall deadline and per-stage deadline.
+
+    `timeout` counts from creation, so time spent queued for a planner worker
+    is part of it. `stage_timeout` restarts at each enter_stage(). Deadlines
+    are enforced at check(); the first reason to cancel is the one reported.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, stage_timeout: Optional[float] = None):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.stage_timeout = stage_timeout or None
+        self.stage: Optional[str] = None
+        self.reason: Optional[str] = None
+        self._stage_deadline: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self, reason: str = DISCONNECTED) -> bool:
+        """Cancel the run; False if it was already cancelled"""
+        with self._lock:
+            if self.reason is not None:
+                return False
+            self.reason = reason
+        PLANS_CANCELLED.inc(reason=reason)
+        return True
+
+    def enter_stage(self, stage: str) -> None:
+        """Mark the start of a planner stage, restarting the stage deadline"""
+        self.check()
+        self.stage = stage
+        if self.stage_timeout:
+            self._stage_deadline = time.monotonic() + self.stage_timeout
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the nearest deadline (None if there is none)"""
+        deadlines = [d for d in (self.deadline, self._stage_deadline) if d is not None]
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def check(self) -> None:
+        """Raise PlanCancelled if the run was cancelled or a deadline has passed"""
+        if self.reason is None:
+            now = time.monotonic()
+            if self.deadline is not None and now >= self.deadline:
+                self.cancel(DEADLINE)
+            elif self._stage_deadline is not None and now >= self._stage_deadline:
+                self.cancel(STAGE_DEADLINE)
+        if self.reason is not None:
+            where = f" during {self.stage}" if self.stage else ""
+            raise PlanCancelled(f"Planning cancelled ({self.reason}){where}", self.reason, self.stage)
+
+
+_current: "contextvars.ContextVar[Optional[CancelToken]]" = contextvars.ContextVar("plan_cancel_token", default=None)
+
+
+@contextmanager
+def bind(token: Optional[CancelToken]) -> Iterator[Optional[CancelToken]]:
+    """Make `token` the current one for this thread (no-op for None)"""
+    if token is None:
+        yield None
+        return
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+
+
+def current_token() -> Optional[CancelToken]:
+    """The token bound to the running planner call, if any"""
+    return _current.get()
+
+
+def check_cancelled() -> None:
+    """check() the current token, if one is bound"""
+    token = _current.get()
+    if token is not None:
+        token.check()
+
+
+def enter_stage(stage: str) -> None:
+    """enter_stage() on the current token, if one is bound"""
+    token = _current.get()
+    if token is not None:
+        token.enter_stage(stage)
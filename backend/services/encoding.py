@@ -0,0 +1,219 @@
+"""
+Response Encoding
+Blueprint responses with client-selected fields, JSON or MessagePack bodies
+and negotiated gzip/brotli compression. Bodies are built straight from the
+model or the stored JSON, skipping FastAPI's jsonable_encoder pass.
+
+orjson, msgpack and brotli are optional: without orjson, dicts go through
+the standard json module; without msgpack or brotli those encodings are
+simply not offered.
+"""
+import gzip
+import json
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+from schemas.workflow import WorkflowBlueprint
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional encoding
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoding
+    brotli = None
+
+
+BLUEPRINT_FIELDS = ("workflow_id", "goal", "steps", "nodes", "edges")
+
+# Shorthands accepted in `fields`
+FIELD_VIEWS = {
+    "full": BLUEPRINT_FIELDS,
+    "steps": ("workflow_id", "goal", "steps"),
+    "graph": ("workflow_id", "goal", "nodes", "edges"),
+}
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+_MSGPACK_TYPES = {MSGPACK, "application/x-msgpack", "application/vnd.msgpack"}
+
+
+class UnsupportedFormat(ValueError):
+    """Raised when a requested encoding is not available in this deployment"""
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Turn a `fields` query value (comma-separated names or one of FIELD_VIEWS)
+    into the fields to return, in model order; None means all of them.
+
+    Raises:
+        ValueError: on unknown field names
+    """
+    if not fields:
+        return None
+    selected = set()
+    for name in (part.strip() for part in fields.split(",")):
+        if not name:
+            continue
+        if name in FIELD_VIEWS:
+            selected.update(FIELD_VIEWS[name])
+        elif name in BLUEPRINT_FIELDS:
+            selected.add(name)
+        else:
+            choices = ", ".join(dict.fromkeys(BLUEPRINT_FIELDS + tuple(FIELD_VIEWS)))
+            raise ValueError(f"Unknown field '{name}'; choose from {choices}")
+    if not selected or selected == set(BLUEPRINT_FIELDS):
+        return None
+    return tuple(name for name in BLUEPRINT_FIELDS if name in selected)
+
+
+def negotiate_media_type(accept: Optional[str], fmt: Optional[str] = None) -> str:
+    """
+    JSON unless the `format` query value or the Accept header asks for
+    MessagePack.
+
+    Raises:
+        UnsupportedFormat: if MessagePack is requested explicitly but msgpack is not installed
+    """
+    if fmt:
+        fmt = fmt.lower()
+        if fmt == "json":
+            return JSON
+        if fmt != "msgpack":
+            raise UnsupportedFormat(f"Unknown format '{fmt}'; use json or msgpack")
+        if msgpack is None:
+            raise UnsupportedFormat("MessagePack is not available on this server")
+        return MSGPACK
+    if accept and msgpack is not None:
+        qualities = _qualities(accept)
+        best = max((qualities.get(media_type, 0.0) for media_type in _MSGPACK_TYPES), default=0.0)
+        if best > 0 and best >= qualities.get(JSON, 0.0):
+            return MSGPACK
+    return JSON
+
+
+def dumps(data: Any) -> bytes:
+    """JSON bytes for plain data (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=str, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def encode_blueprint(
+    blueprint: Union[WorkflowBlueprint, Dict[str, Any], str, bytes],
+    fields: Optional[Sequence[str]] = None,
+    media_type: str = JSON,
+    extra: Optional[Dict[str, Any]] = None
+) -> bytes:
+    """
+    Serialize a blueprint (model, dict or already-serialized JSON) with only
+    `fields`, plus any `extra` top-level keys.
+    """
+    if media_type == JSON:
+        body = None
+        if isinstance(blueprint, WorkflowBlueprint):
+            include = set(fields) if fields else None
+            body = blueprint.model_dump_json(include=include).encode("utf-8")
+        elif isinstance(blueprint, (str, bytes)) and not fields:
+            body = blueprint.encode("utf-8") if isinstance(blueprint, str) else blueprint
+        if body is not None:
+            # Splice extra keys into the serialized object rather than re-encoding it
+            return body[:-1] + b"," + dumps(extra)[1:] if extra else body
+
+    if isinstance(blueprint, WorkflowBlueprint):
+        data = blueprint.model_dump(mode="json", include=set(fields) if fields else None)
+    elif isinstance(blueprint, (str, bytes)):
+        data = orjson.loads(blueprint) if orjson is not None else json.loads(blueprint)
+    else:
+        data = blueprint
+    if fields:
+        data = {name: data[name] for name in fields if name in data}
+    if extra:
+        data = {**data, **extra}
+    if media_type == MSGPACK:
+        return msgpack.packb(data, use_bin_type=True)
+    return dumps(data)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Content coding with the highest q the client gives among those available
+    (br wins ties with gzip); None for an uncompressed response, including
+    when the client weights identity above both
+    """
+    if not accept_encoding:
+        return None
+    offered = _qualities(accept_encoding)
+    wildcard = offered.get("*", 0.0)
+    codings = (["br"] if brotli is not None else []) + ["gzip"]
+    # max() keeps the first of equal weights
+    best = max(codings, key=lambda coding: offered.get(coding, wildcard))
+    quality = offered.get(best, wildcard)
+    if quality <= 0 or offered.get("identity", 0.0) > quality:
+        return None
+    return best
+
+
+def representation_etag(
+    etag: str,
+    media_type: str = JSON,
+    fields: Optional[Sequence[str]] = None,
+    coding: Optional[str] = None
+) -> str:
+    """
+    Strong ETag of one representation of a stored version: the stored tag
+    (full JSON, uncompressed) with a suffix for the format, field selection
+    and content coding, so caches never mix up their bodies
+    """
+    parts = []
+    if media_type != JSON:
+        parts.append("msgpack")
+    if fields:
+        parts.append("f." + ".".join(fields))
+    if coding:
+        parts.append(coding)
+    if not parts:
+        return etag
+    return etag[:-1] + "-" + "-".join(parts) + '"'
+
+
+def etag_version(etag: str) -> str:
+    """The stored version's tag for any of its representation tags"""
+    tag = etag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    value = tag.strip('"').split("-", 1)[0]
+    return f'"{value}"'
+
+
+def compress(body: bytes, encoding: Optional[str], min_size: int = 1024, level: int = 5) -> Tuple[bytes, Optional[str]]:
+    """Compress `body` with `encoding` unless it is too small to be worth it"""
+    if encoding is None or len(body) < min_size:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=level), "br"
+    return gzip.compress(body, compresslevel=level, mtime=0), "gzip"
+
+
+def _qualities(header: str) -> Dict[str, float]:
+    """Lower-cased values of an Accept-style header mapped to their q weights"""
+    qualities: Dict[str, float] = {}
+    for part in header.split(","):
+        value, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if value:
+            qualities[value.lower()] = quality
+    return qualities
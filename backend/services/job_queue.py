@@ -0,0 +1,344 @@
+"""
+Job Queue
+Durable SQLite queue of planning jobs shared by the API processes, which
+enqueue goals, and the planner worker processes (worker.py), which claim
+them. A claim is a lease: the worker must heartbeat before the lease
+expires, otherwise the job becomes visible again and another worker picks it
+up. Failed attempts are retried with exponential backoff up to
+`max_attempts`.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL UNIQUE,
+    tenant TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    workflow_id TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, available_at, seq);
+"""
+
+_COLUMNS = (
+    "job_id, tenant, status, payload, attempts, max_attempts, available_at, "
+    "lease_owner, lease_expires, workflow_id, error, created_at, updated_at, finished_at"
+)
+
+
+class JobQueueFull(Exception):
+    """Raised by enqueue() when `max_queued` jobs are already waiting"""
+
+
+class Job:
+    """A row of the jobs table"""
+
+    __slots__ = (
+        "job_id", "tenant", "status", "payload", "attempts", "max_attempts", "available_at",
+        "lease_owner", "lease_expires", "workflow_id", "error", "created_at", "updated_at", "finished_at"
+    )
+
+    def __init__(self, *values: Any):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+        self.payload = json.loads(self.payload)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public view of the job (no payload or lease details)"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "goal": self.payload.get("goal"),
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "workflow_id": self.workflow_id,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    Jobs table with lease-based claiming. Safe to share between threads and
+    processes: every state change runs in its own short IMMEDIATE
+    transaction, and lease-holder updates are guarded by the worker id so a
+    worker that lost its lease cannot overwrite the new holder's outcome.
+
+    Args:
+        path: SQLite database file
+        lease_seconds: How long a claim stays valid without a heartbeat
+        max_attempts: Claims per job before it is failed for good
+        retry_backoff: Delay before the first retry, doubled for each later one
+        max_queued: Waiting jobs beyond which enqueue() refuses (0 = unbounded)
+    """
+
+    def __init__(
+        self,
+        path: str = "jobs.db",
+        lease_seconds: float = 60.0,
+        max_attempts: int = 3,
+        retry_backoff: float = 5.0,
+        max_queued: int = 1000
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self.max_queued = max_queued
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        # Counters for this process
+        self.enqueued = 0
+        self.rejected = 0
+        self.claimed = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.expired = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def enqueue(self, payload: Dict[str, Any], tenant: str = "anonymous") -> Job:
+        """
+        Add a job; it can be claimed right away.
+
+        Raises:
+            JobQueueFull: if max_queued jobs are already waiting
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            if self.max_queued > 0:
+                (waiting,) = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()
+                if waiting >= self.max_queued:
+                    self._count("rejected")
+                    raise JobQueueFull(f"{waiting} jobs are already waiting")
+            conn.execute(
+                "INSERT INTO jobs (job_id, tenant, status, payload, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, tenant, QUEUED, json.dumps(payload, default=str), self.max_attempts, now, now, now)
+            )
+        self._count("enqueued")
+        return self.get(job_id)
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        """
+        Lease the oldest visible job to `worker_id`: a queued job whose
+        backoff has passed, or a running job whose lease expired. Expired
+        jobs that have used up their attempts are failed instead.
+        """
+        while True:
+            now = time.time()
+            with self._transaction() as conn:
+                row = conn.execute(
+                    f"SELECT {_COLUMNS} FROM jobs "
+                    "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?) "
+                    "ORDER BY seq LIMIT 1",
+                    (QUEUED, now, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                job = Job(*row)
+                if job.status == RUNNING:
+                    self._count("expired")
+                    if job.attempts >= job.max_attempts:
+                        self._finish(conn, job.job_id, FAILED, error="Lease expired on the last attempt")
+                        self._count("failed")
+                        continue
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?, "
+                    "updated_at = ? WHERE job_id = ?",
+                    (RUNNING, worker_id, now + self.lease_seconds, now, job.job_id)
+                )
+            self._count("claimed")
+            job.status = RUNNING
+            job.attempts += 1
+            job.lease_owner = worker_id
+            job.lease_expires = now + self.lease_seconds
+            return job
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease; False if the worker no longer holds it (expired, reclaimed or cancelled)"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE job_id = ? AND status = ? AND lease_owner = ?",
+                (now + self.lease_seconds, now, job_id, RUNNING, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, workflow_id: str) -> bool:
+        """Mark the job succeeded with its stored workflow; False if the lease was lost"""
+        with self._transaction() as conn:
+            done = self._finish(conn, job_id, SUCCEEDED, worker_id=worker_id, workflow_id=workflow_id)
+        if done:
+            self._count("completed")
+        return done
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """
+        Record a failed attempt: the job is queued again after a backoff if
+        `retry` and it has attempts left, else failed. False if the lease was lost.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE job_id = ? AND status = ? AND lease_owner = ?",
+                (job_id, RUNNING, worker_id)
+            ).fetchone()
+            if row is None:
+                return False
+            attempts, max_attempts = row
+            if retry and attempts < max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                    "error = ?, updated_at = ? WHERE job_id = ?",
+                    (QUEUED, now + self.retry_backoff * 2 ** (attempts - 1), error, now, job_id)
+                )
+                self._count("retried")
+                return True
+            self._finish(conn, job_id, FAILED, worker_id=worker_id, error=error)
+        self._count("failed")
+        return True
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        """Hand a claimed job back without using up an attempt (worker shutting down)"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts - 1, available_at = ?, lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE job_id = ? AND status = ? AND lease_owner = ?",
+                (QUEUED, now, now, job_id, RUNNING, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a queued or running job (a running one stops at its worker's
+        next heartbeat). Returns the job, or None if it does not exist.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?, "
+                "finished_at = ? WHERE job_id = ? AND status IN (?, ?)",
+                (CANCELLED, now, now, job_id, QUEUED, RUNNING)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._connection().execute(f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return Job(*row) if row is not None else None
+
+    def prune(self, older_than: float) -> int:
+        """Delete jobs that finished more than `older_than` seconds ago"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - older_than,)
+            )
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Jobs by status and the age of the oldest waiting one, plus this process's counters"""
+        conn = self._connection()
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        (oldest,) = conn.execute("SELECT MIN(created_at) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()
+        with self._lock:
+            return {
+                **{f"{status}_jobs": counts.get(status, 0) for status in (QUEUED, RUNNING) + FINISHED},
+                "oldest_queued_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+                "enqueued": self.enqueued,
+                "rejected": self.rejected,
+                "claimed": self.claimed,
+                "completed": self.completed,
+                "retried": self.retried,
+                "failed": self.failed,
+                "expired": self.expired,
+            }
+
+    def _finish(
+        self,
+        conn: sqlite3.Connection,
+        job_id: str,
+        status: str,
+        worker_id: Optional[str] = None,
+        workflow_id: Optional[str] = None,
+        error: Optional[str] = None
+    ) -> bool:
+        """Move a running job to a final status, guarded by the lease holder if given"""
+        now = time.time()
+        query = (
+            "UPDATE jobs SET status = ?, workflow_id = ?, error = ?, lease_owner = NULL, lease_expires = NULL, "
+            "updated_at = ?, finished_at = ? WHERE job_id = ? AND status = ?"
+        )
+        params: List[Any] = [status, workflow_id, error, now, now, job_id, RUNNING]
+        if worker_id is not None:
+            query += " AND lease_owner = ?"
+            params.append(worker_id)
+        return conn.execute(query, params).rowcount == 1
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread, in autocommit mode so transactions are explicit"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error), so two workers never claim the same job"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
@@ -0,0 +1,327 @@
+"""
+Structured Logs
+Queue-backed JSON-lines logging. Handlers on request and planner threads only
+enqueue records; one listener thread formats and writes them, so a log call
+on the hot path never waits on stdout.
+
+Every record carries the id of the request it was logged for. Request-scoped
+records below WARNING are kept only for sampled requests, and agent
+transcripts are collected in a bounded per-run buffer that is written out
+only when the request is sampled or the run failed.
+"""
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterator, List, Optional, TextIO, Tuple
+
+
+transcript_logger = logging.getLogger("planner.transcript")
+access_logger = logging.getLogger("access")
+
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+
+class RequestLogContext:
+    """Correlation id and sampling decision of one request"""
+
+    __slots__ = ("request_id", "sampled")
+
+    def __init__(self, request_id: str, sampled: bool):
+        self.request_id = request_id
+        self.sampled = sampled
+
+
+class TranscriptBuffer:
+    """
+    Last `max_entries` agent transcript entries of one planner run.
+
+    Entries are stored as given and only rendered (and cut to `max_chars`)
+    when the transcript is actually written.
+    """
+
+    def __init__(self, max_entries: int = 50, max_chars: int = 4000):
+        self.max_chars = max_chars
+        self._entries: Deque[Tuple[float, str, Any]] = deque(maxlen=max_entries)
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, kind: str, content: Any) -> None:
+        if len(self._entries) == self._entries.maxlen:
+            self.dropped += 1
+        self._entries.append((time.time(), kind, content))
+
+    def render(self) -> List[Dict[str, Any]]:
+        return [
+            {"ts": ts, "kind": kind, "content": str(content)[:self.max_chars]}
+            for ts, kind, content in self._entries
+        ]
+
+
+_request: "contextvars.ContextVar[Optional[RequestLogContext]]" = contextvars.ContextVar("log_request", default=None)
+_transcript: "contextvars.ContextVar[Optional[TranscriptBuffer]]" = contextvars.ContextVar("log_transcript", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, request_id, extra fields, exc"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s%(fields_text)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.request_id = getattr(record, "request_id", None) or "-"
+        fields = getattr(record, "fields", None)
+        record.fields_text = " " + json.dumps(fields, default=str) if fields else ""
+        return super().format(record)
+
+
+class _SamplingFilter(logging.Filter):
+    """Drop request-scoped records below WARNING unless the request is sampled"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or getattr(record, "force", False):
+            return True
+        context = _request.get()
+        return context is None or context.sampled
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: records are dropped (and counted) when the queue is full"""
+
+    def __init__(self, log_queue: "queue.Queue"):
+        super().__init__(log_queue)
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Capture what only this thread knows; formatting happens on the listener
+        record = copy.copy(record)
+        context = _request.get()
+        record.request_id = context.request_id if context is not None else None
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room: on shutdown the queue may still be full of records to write
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """The root logger's queue handler and the listener thread that drains it"""
+
+    def __init__(
+        self,
+        level: str = "INFO",
+        fmt: str = "json",
+        queue_size: int = 10000,
+        sample_rate: float = 1.0,
+        transcript_entries: int = 50,
+        transcript_chars: int = 4000,
+        stream: Optional[TextIO] = None
+    ):
+        self.sample_rate = sample_rate
+        self.transcript_entries = transcript_entries
+        self.transcript_chars = transcript_chars
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.handler = _EnqueueHandler(self._queue)
+        self.handler.addFilter(_SamplingFilter())
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+        self._listener = _Listener(self._queue, output)
+        self._level = logging.getLevelName(level.upper())
+        if not isinstance(self._level, int):
+            self._level = logging.INFO
+
+    def start(self) -> None:
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        root.setLevel(self._level)
+        self._listener.start()
+
+    def stop(self) -> None:
+        """Detach from the root logger and write out everything still queued"""
+        logging.getLogger().removeHandler(self.handler)
+        self._listener.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth plus enqueued/dropped record counts"""
+        return {
+            "queue_depth": self._queue.qsize(),
+            "enqueued": self.handler.enqueued,
+            "dropped": self.handler.dropped,
+            "sample_rate": self.sample_rate,
+        }
+
+
+_pipeline: Optional[LogPipeline] = None
+
+
+def configure_logging(
+    level: str = "INFO",
+    fmt: str = "json",
+    queue_size: int = 10000,
+    sample_rate: float = 1.0,
+    transcript_entries: int = 50,
+    transcript_chars: int = 4000
+) -> LogPipeline:
+    """Install the process-wide pipeline (once; later calls return the running one)"""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = LogPipeline(level, fmt, queue_size, sample_rate, transcript_entries, transcript_chars)
+        _pipeline.start()
+    return _pipeline
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def request_scope(request_id: Optional[str] = None, sampled: Optional[bool] = None) -> Iterator[RequestLogContext]:
+    """Tag records logged in this context with a request id, sampling it at LOG_SAMPLE_RATE"""
+    if sampled is None:
+        sampled = _pipeline is None or random.random() < _pipeline.sample_rate
+    context = RequestLogContext(request_id or new_request_id(), sampled)
+    token = _request.set(context)
+    try:
+        yield context
+    finally:
+        _request.reset(token)
+
+
+def current_request_id() -> Optional[str]:
+    context = _request.get()
+    return context.request_id if context is not None else None
+
+
+@contextmanager
+def capture_transcript() -> Iterator[TranscriptBuffer]:
+    """Collect the transcript of one planner run in a fresh bounded buffer"""
+    if _pipeline is not None:
+        buffer = TranscriptBuffer(_pipeline.transcript_entries, _pipeline.transcript_chars)
+    else:
+        buffer = TranscriptBuffer()
+    token = _transcript.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _transcript.reset(token)
+
+
+def current_transcript() -> Optional[TranscriptBuffer]:
+    return _transcript.get()
+
+
+def record_transcript(kind: str, content: Any) -> None:
+    """Add an entry to the current run's transcript, if one is being captured"""
+    buffer = _transcript.get()
+    if buffer is not None:
+        buffer.add(kind, content)
+
+
+def flush_transcript(buffer: TranscriptBuffer, failed: bool, **fields: Any) -> bool:
+    """Write the transcript as one record if the request is sampled or the run failed"""
+    if not len(buffer):
+        return False
+    context = _request.get()
+    if not failed and context is not None and not context.sampled:
+        return False
+    transcript_logger.log(
+        logging.WARNING if failed else logging.INFO,
+        "planner transcript",
+        extra={"fields": {**fields, "transcript": buffer.render(), "transcript_dropped": buffer.dropped}, "force": True}
+    )
+    return True
+
+
+class RequestLogMiddleware:
+    """
+    ASGI middleware that opens a request_scope per HTTP request (reusing a
+    well-formed X-Request-ID header), echoes the id in the response and logs
+    one access record when the response is done.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_RE.match(candidate):
+                    request_id = candidate
+                break
+        status = [500]
+
+        async def send_with_id(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", context.request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        started = time.perf_counter()
+        with request_scope(request_id) as context:
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                access_logger.info("request", extra={"fields": {
+                    "method": scope.get("method"),
+                    "path": scope.get("path"),
+                    "status": status[0],
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                }})
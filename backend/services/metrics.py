@@ -0,0 +1,287 @@
+"""
+Metrics
+Low-overhead counters and histograms rendered in the Prometheus text format.
+
+Each thread records into its own shard, so the hot path never takes a lock;
+shards are only summed when /metrics is scraped.
+"""
+import bisect
+import math
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+LabelValues = Tuple[str, ...]
+
+# Latency buckets in seconds, from cache hits up to slow crew runs
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _ShardedMetric:
+    """Base class keeping one dict of label values -> state per thread"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, Any]] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> Dict[LabelValues, Any]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _snapshots(self) -> List[Dict[LabelValues, Any]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict.copy() runs without releasing the GIL, so it is safe against the owning thread
+        return [shard.copy() for shard in shards]
+
+
+class Counter(_ShardedMetric):
+    """Monotonic counter"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._snapshots():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self.values().items())
+        ]
+
+
+class Histogram(_ShardedMetric):
+    """Fixed-bucket histogram; per-thread state is [bucket counts..., sum, count]"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        state = shard.get(key)
+        if state is None:
+            state = shard[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def values(self) -> Dict[LabelValues, List[float]]:
+        totals: Dict[LabelValues, List[float]] = {}
+        for shard in self._snapshots():
+            for key, state in shard.items():
+                state = list(state)
+                total = totals.get(key)
+                if total is None:
+                    totals[key] = state
+                else:
+                    for i, value in enumerate(state):
+                        total[i] += value
+        return totals
+
+    def render(self) -> List[str]:
+        lines = []
+        bounds = self.buckets + (math.inf,)
+        for key, state in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, state):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+
+class _StatsCollector:
+    """Exports the numeric fields of a component's stats() dict on each scrape"""
+
+    def __init__(self, prefix: str, documentation: str, stats: Callable[[], Dict[str, Any]], counters: Sequence[str]):
+        self.prefix = prefix
+        self.documentation = documentation
+        self.stats = stats
+        self.counters = set(counters)
+
+    def render(self) -> List[str]:
+        try:
+            values = self.stats()
+        except Exception as e:
+            return [f"# {self.prefix} stats unavailable: {_escape(str(e))}"]
+        lines = []
+        for field, value in values.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            kind = "counter" if field in self.counters else "gauge"
+            name = f"{self.prefix}_{field}" + ("_total" if kind == "counter" else "")
+            lines.append(f"# HELP {name} {self.documentation} ({field})")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics plus stats collectors, rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _ShardedMetric] = {}
+        self._collectors: List[_StatsCollector] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_stats(
+        self,
+        prefix: str,
+        documentation: str,
+        stats: Callable[[], Dict[str, Any]],
+        counters: Sequence[str] = ()
+    ) -> None:
+        """Export a component's stats() dict; fields in `counters` are monotonic"""
+        with self._lock:
+            self._collectors = [c for c in self._collectors if c.prefix != prefix]
+            self._collectors.append(_StatsCollector(prefix, documentation, stats, counters))
+
+    def get(self, name: str) -> Optional[_ShardedMetric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collector in collectors:
+            lines.extend(collector.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
+
+
+# Planner metrics shared across modules
+PLAN_SECONDS = metrics.histogram(
+    "planner_plan_seconds",
+    "End-to-end planner run time by mode and result",
+    ["mode", "result"]
+)
+STAGE_SECONDS = metrics.histogram(
+    "planner_stage_seconds",
+    "Wall time per crew task / planner stage",
+    ["stage"]
+)
+MOCK_FALLBACKS = metrics.counter(
+    "planner_mock_fallbacks_total",
+    "Requests answered by the rule-based mock workflow instead of the LLM",
+    ["reason"]
+)
+SIMILAR_PLANS = metrics.counter(
+    "planner_similar_plans_total",
+    "Similarity index lookups by outcome (reused, examples, none)",
+    ["outcome"]
+)
+LLM_SECONDS = metrics.histogram(
+    "llm_request_seconds",
+    "LLM call latency",
+    ["model"]
+)
+LLM_TOKENS = metrics.counter(
+    "llm_tokens_total",
+    "LLM tokens used",
+    ["model", "kind"]
+)
+LLM_COST = metrics.counter(
+    "llm_cost_usd_total",
+    "Estimated LLM spend in US dollars",
+    ["model"]
+)
+LLM_ERRORS = metrics.counter(
+    "llm_errors_total",
+    "Failed LLM calls",
+    ["model"]
+)
+PLANS_CANCELLED = metrics.counter(
+    "planner_cancelled_total",
+    "Planner runs stopped early because the client disconnected or a deadline passed",
+    ["reason"]
+)
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "planner_queue_wait_seconds",
+    "Time planner runs spend queued before a worker picks them up"
+)
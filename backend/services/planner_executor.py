@@ -0,0 +1,224 @@
+"""
+Planner Executor
+Dedicated, bounded thread pool for planner runs with per-tenant fair
+scheduling and admission control.
+"""
+import contextvars
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Optional
+
+from services.metrics import QUEUE_WAIT_SECONDS
+
+
+class PlannerOverloaded(Exception):
+    """
+    Raised when a planner run cannot be admitted.
+
+    `status_code` is 429 when the tenant already has too much queued work and
+    503 when the shared queue is full. `retry_after` is a hint in seconds.
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _WorkItem:
+    """A queued planner call, run in the submitter's context (request id for logs)"""
+
+    __slots__ = ("future", "fn", "args", "kwargs", "context", "enqueued_at")
+
+    def __init__(self, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]):
+        self.future: Future = Future()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.context = contextvars.copy_context()
+        self.enqueued_at = time.monotonic()
+
+
+class PlannerExecutor:
+    """
+    Fixed-size worker pool with a bounded queue.
+
+    Queued work is kept per tenant and workers take from tenants round-robin,
+    so one tenant's burst cannot starve the others. Submissions beyond the
+    queue limits are rejected immediately instead of piling up.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_queue: int = 32,
+        max_queue_per_tenant: int = 8,
+        name: str = "planner"
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.max_queue_per_tenant = max(1, max_queue_per_tenant)
+        self._cond = threading.Condition()
+        self._queues: "OrderedDict[str, Deque[_WorkItem]]" = OrderedDict()
+        self._depth = 0
+        self._running = 0
+        self._shutdown = False
+
+        # Metrics (guarded by _cond)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.abandoned = 0
+        self.rejected_tenant = 0
+        self.rejected_full = 0
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._service_avg = 0.0
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, tenant: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """
+        Queue `fn(*args, **kwargs)` on behalf of `tenant`.
+
+        Returns:
+            A concurrent.futures.Future for the result
+
+        Raises:
+            PlannerOverloaded: if the tenant or the shared queue is full
+        """
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Planner executor is shut down")
+
+            tenant_queue = self._queues.get(tenant)
+            idle_worker = self._running + self._depth < self.max_workers
+            if not idle_worker and self._depth >= self.max_queue:
+                self.rejected_full += 1
+                raise PlannerOverloaded("Planner queue is full", 503, self._retry_after())
+            if tenant_queue is not None and len(tenant_queue) >= self.max_queue_per_tenant:
+                self.rejected_tenant += 1
+                raise PlannerOverloaded("Too many queued requests for this client", 429, self._retry_after())
+
+            item = _WorkItem(fn, args, kwargs)
+            if tenant_queue is None:
+                tenant_queue = self._queues[tenant] = deque()
+            tenant_queue.append(item)
+            self._depth += 1
+            self.submitted += 1
+            self._cond.notify()
+        # A caller that gives up while queued frees its slot right away
+        item.future.add_done_callback(lambda future: future.cancelled() and self._discard(tenant, item))
+        return item.future
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work; queued items are still run before workers exit"""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, utilization, rejections and wait times"""
+        with self._cond:
+            return {
+                "workers": self.max_workers,
+                "running": self._running,
+                "queue_depth": self._depth,
+                "max_queue": self.max_queue,
+                "max_queue_per_tenant": self.max_queue_per_tenant,
+                "tenants_waiting": len(self._queues),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "abandoned": self.abandoned,
+                "rejected_tenant": self.rejected_tenant,
+                "rejected_full": self.rejected_full,
+                "wait_seconds_avg": self._wait_total / self._wait_count if self._wait_count else 0.0,
+                "wait_seconds_max": self._wait_max,
+                "service_seconds_avg": self._service_avg,
+            }
+
+    def _discard(self, tenant: str, item: _WorkItem) -> None:
+        """Drop a cancelled item from its tenant queue if no worker has taken it yet"""
+        with self._cond:
+            tenant_queue = self._queues.get(tenant)
+            if tenant_queue is None or item not in tenant_queue:
+                return
+            tenant_queue.remove(item)
+            if not tenant_queue:
+                del self._queues[tenant]
+            self._depth -= 1
+            self.abandoned += 1
+
+    def _retry_after(self) -> int:
+        """Estimate seconds until a queue slot frees up (lock held)"""
+        service = self._service_avg or 1.0
+        backlog = (self._depth + self._running) / self.max_workers
+        return max(1, math.ceil(backlog * service))
+
+    def _next_item(self) -> Optional[_WorkItem]:
+        """Pop the head of the next tenant's queue, round-robin (lock held)"""
+        if not self._queues:
+            return None
+        tenant, tenant_queue = next(iter(self._queues.items()))
+        item = tenant_queue.popleft()
+        if tenant_queue:
+            self._queues.move_to_end(tenant)
+        else:
+            del self._queues[tenant]
+        self._depth -= 1
+        return item
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queues and not self._shutdown:
+                    self._cond.wait()
+                item = self._next_item()
+                if item is None:
+                    return
+                waited = time.monotonic() - item.enqueued_at
+                self._wait_count += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+                self._running += 1
+            QUEUE_WAIT_SECONDS.observe(waited)
+
+            # Skip work whose caller already gave up
+            if not item.future.set_running_or_notify_cancel():
+                with self._cond:
+                    self._running -= 1
+                    self.abandoned += 1
+                continue
+
+            started = time.monotonic()
+            failed = False
+            try:
+                result = item.context.run(item.fn, *item.args, **item.kwargs)
+            except BaseException as e:
+                failed = True
+                item.future.set_exception(e)
+            else:
+                item.future.set_result(result)
+
+            elapsed = time.monotonic() - started
+            with self._cond:
+                self._running -= 1
+                if failed:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+                # Exponentially weighted average of run time, used for Retry-After
+                self._service_avg = elapsed if not self._service_avg else 0.8 * self._service_avg + 0.2 * elapsed
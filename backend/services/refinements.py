@@ -0,0 +1,108 @@
+"""
+Refinements
+Tracks progressive generations: a workflow answered with an instant template
+while the full planner run refines it in the background. Lives on the event
+loop, so callers can await a workflow's refinement instead of polling.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+
+REFINING = "refining"
+READY = "ready"
+FAILED = "failed"
+
+
+class _Refinement:
+    __slots__ = ("status", "etag", "error", "started_at", "finished_at", "done")
+
+    def __init__(self):
+        self.status = REFINING
+        self.etag: Optional[str] = None
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+
+class RefinementTracker:
+    """
+    Status of background refinements by workflow id.
+
+    Finished entries are forgotten `ttl_seconds` after they finish; workflows
+    that were never progressive are simply not tracked. Not thread-safe: use
+    it from the event loop only.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600.0):
+        self.ttl_seconds = ttl_seconds
+        self._items: Dict[str, _Refinement] = {}
+        self.started = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def start(self, workflow_id: str) -> None:
+        """Mark a workflow as being refined"""
+        self._prune()
+        self._items[workflow_id] = _Refinement()
+        self.started += 1
+
+    def finish(self, workflow_id: str, status: str, etag: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Record the outcome and wake everyone waiting on the workflow"""
+        item = self._items.get(workflow_id)
+        if item is None:
+            return
+        item.status = status
+        item.etag = etag
+        item.error = error
+        item.finished_at = time.time()
+        item.done.set()
+        if status == READY:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def status(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """Refinement status of a workflow, or None if it is not tracked"""
+        item = self._items.get(workflow_id)
+        if item is None:
+            return None
+        return {
+            "workflow_id": workflow_id,
+            "status": item.status,
+            "etag": item.etag,
+            "error": item.error,
+            "started_at": item.started_at,
+            "finished_at": item.finished_at,
+        }
+
+    async def wait(self, workflow_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait up to `timeout` seconds for a refinement to finish; returns its status"""
+        item = self._items.get(workflow_id)
+        if item is None:
+            return None
+        try:
+            await asyncio.wait_for(item.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.status(workflow_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counts of tracked, in-progress and finished refinements"""
+        return {
+            "tracked": len(self._items),
+            "refining": sum(1 for item in self._items.values() if item.status == REFINING),
+            "started": self.started,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            workflow_id for workflow_id, item in self._items.items()
+            if item.finished_at is not None and item.finished_at < cutoff
+        ]
+        for workflow_id in expired:
+            del self._items[workflow_id]
@@ -0,0 +1,186 @@
+"""
+Sessions
+Server-side conversation state for multi-turn planning. Clients send only the
+new turn and a session id; the store keeps the last few turns verbatim, folds
+older ones into a bounded summary and remembers the latest goal analysis and
+blueprint outline, so the context handed to the planner stays about the same
+size however long the conversation gets.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from schemas.workflow import WorkflowBlueprint
+
+
+SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+class Session:
+    """One conversation: recent turns, folded older turns and the latest plan"""
+
+    __slots__ = (
+        "session_id", "recent", "earlier", "earlier_count", "turn_count",
+        "analysis", "workflow_id", "outline", "created_at", "updated_at"
+    )
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.recent: Deque[str] = deque()
+        self.earlier: Deque[str] = deque()
+        self.earlier_count = 0
+        self.turn_count = 0
+        self.analysis: Optional[str] = None
+        self.workflow_id: Optional[str] = None
+        self.outline: List[str] = []
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "turns": self.turn_count,
+            "recent_turns": list(self.recent),
+            "earlier_summary": " | ".join(self.earlier),
+            "earlier_turns": self.earlier_count,
+            "workflow_id": self.workflow_id,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class SessionStore:
+    """
+    Thread-safe LRU of sessions with an idle TTL.
+
+    Args:
+        max_sessions: Sessions kept before the least recently used is dropped
+        ttl_seconds: Idle time after which a session is forgotten
+        recent_turns: Previous turns passed to the planner verbatim (clipped)
+        summary_chars: Budget for the folded summary of older turns
+        turn_chars: Longest single turn kept
+        analysis_chars: Longest goal analysis kept
+        outline_steps: Steps of the latest blueprint passed back as context
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        ttl_seconds: float = 3600.0,
+        recent_turns: int = 4,
+        summary_chars: int = 1200,
+        turn_chars: int = 300,
+        analysis_chars: int = 1500,
+        outline_steps: int = 20
+    ):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.recent_turns = recent_turns
+        self.summary_chars = summary_chars
+        self.turn_chars = turn_chars
+        self.analysis_chars = analysis_chars
+        self.outline_steps = outline_steps
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.turns = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def context_for(self, session_id: str, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Planner context for the next turn of a session (created if unknown):
+        the compacted conversation and prior state, with `extra` on top.
+        """
+        with self._lock:
+            session = self._get(session_id, create=True)
+            context: Dict[str, Any] = {}
+            if session.earlier:
+                context["earlier_requests"] = f"{session.earlier_count} earlier: " + " | ".join(session.earlier)
+            if session.recent:
+                context["recent_requests"] = list(session.recent)
+            if session.analysis:
+                context["previous_analysis"] = session.analysis
+            if session.outline:
+                context["current_workflow"] = list(session.outline)
+        context.update(extra or {})
+        return context
+
+    def record_turn(
+        self,
+        session_id: str,
+        goal: str,
+        blueprint: Optional[WorkflowBlueprint] = None,
+        analysis: Optional[str] = None
+    ) -> None:
+        """Append a finished turn, folding the oldest recent turn into the summary"""
+        with self._lock:
+            session = self._get(session_id, create=True)
+            session.recent.append(_clip(goal, self.turn_chars))
+            while len(session.recent) > self.recent_turns:
+                self._fold(session, session.recent.popleft())
+            if analysis:
+                session.analysis = _clip(analysis, self.analysis_chars)
+            if blueprint is not None:
+                session.workflow_id = blueprint.workflow_id
+                session.outline = [
+                    f"{step.id}: {step.name} [{step.action_type} via {step.tool}]"
+                    for step in blueprint.steps[:self.outline_steps]
+                ]
+            session.turn_count += 1
+            session.updated_at = time.time()
+            self.turns += 1
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            session = self._get(session_id, create=False)
+            return session.snapshot() if session is not None else None
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "created": self.created,
+                "turns": self.turns,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _fold(self, session: Session, turn: str) -> None:
+        """Move a turn into the summary, dropping the oldest folded turns past the budget (lock held)"""
+        session.earlier.append(_clip(turn, max(40, self.turn_chars // 3)))
+        session.earlier_count += 1
+        while len(session.earlier) > 1 and sum(len(text) + 3 for text in session.earlier) > self.summary_chars:
+            session.earlier.popleft()
+
+    def _get(self, session_id: str, create: bool) -> Optional[Session]:
+        """Look up (and optionally create) a session, expiring idle ones (lock held)"""
+        now = time.time()
+        session = self._sessions.get(session_id)
+        if session is not None and now - session.updated_at > self.ttl_seconds:
+            del self._sessions[session_id]
+            self.expirations += 1
+            session = None
+        if session is None:
+            if not create:
+                return None
+            session = self._sessions[session_id] = Session(session_id)
+            self.created += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        self._sessions.move_to_end(session_id)
+        return session
@@ -0,0 +1,303 @@
+"""
+Workflow Store
+SQLite-backed persistence for generated blueprints, with a write-behind queue
+and an in-memory hot LRU of serialized responses.
+"""
+import hashlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from schemas.workflow import WorkflowBlueprint
+
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workflows (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    workflow_id TEXT NOT NULL UNIQUE,
+    goal TEXT NOT NULL,
+    step_count INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    etag TEXT NOT NULL,
+    body TEXT NOT NULL,
+    reusable INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+_UPSERT = """
+INSERT INTO workflows (workflow_id, goal, step_count, created_at, updated_at, etag, body, reusable)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(workflow_id) DO UPDATE SET
+    goal = excluded.goal,
+    step_count = excluded.step_count,
+    updated_at = excluded.updated_at,
+    etag = excluded.etag,
+    body = excluded.body,
+    reusable = excluded.reusable
+"""
+
+
+class StoredWorkflow:
+    """
+    A serialized blueprint as returned to clients. `reusable` marks plans
+    parsed from LLM output, which the planner's similarity index is rebuilt
+    from at startup.
+    """
+
+    __slots__ = ("workflow_id", "goal", "step_count", "created_at", "etag", "body", "reusable")
+
+    def __init__(
+        self,
+        workflow_id: str,
+        goal: str,
+        step_count: int,
+        created_at: float,
+        etag: str,
+        body: str,
+        reusable: bool = False
+    ):
+        self.workflow_id = workflow_id
+        self.goal = goal
+        self.step_count = step_count
+        self.created_at = created_at
+        self.etag = etag
+        self.body = body
+        self.reusable = reusable
+
+    @classmethod
+    def from_blueprint(cls, blueprint: WorkflowBlueprint, reusable: bool = False) -> "StoredWorkflow":
+        body = blueprint.model_dump_json()
+        etag = '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+        return cls(blueprint.workflow_id, blueprint.goal, len(blueprint.steps), time.time(), etag, body, reusable)
+
+    def blueprint(self) -> WorkflowBlueprint:
+        return WorkflowBlueprint.model_validate_json(self.body)
+
+
+class WorkflowStore:
+    """
+    Persists every generated blueprint without blocking the request path.
+
+    `save` makes the blueprint readable immediately (hot LRU plus a pending
+    map) and hands the SQLite write to a background writer thread, which
+    batches inserts. When the write queue is full, `save` still does not
+    block: the newest version per id goes to a spill map the writer drains
+    with its next batch (see `overflows` in stats). Reads check memory first
+    (`get_cached`) and fall back to a primary-key lookup on a per-thread
+    connection, which async callers should run in a thread.
+    """
+
+    def __init__(self, path: str = "workflows.db", hot_size: int = 1024, batch_size: int = 100, queue_size: int = 10000):
+        self.path = path
+        self.hot_size = hot_size
+        self.batch_size = batch_size
+        self._hot: "OrderedDict[str, StoredWorkflow]" = OrderedDict()
+        self._pending: Dict[str, StoredWorkflow] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Items are blueprints to write, flush() markers, or None to stop
+        self._queue: "queue.Queue[Union[StoredWorkflow, threading.Event, None]]" = queue.Queue(maxsize=queue_size)
+        self._spilled: Dict[str, StoredWorkflow] = {}
+        self.hot_hits = 0
+        self.db_reads = 0
+        self.writes = 0
+        self.overflows = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(workflows)")}
+        if "reusable" not in columns:
+            # Databases created before the column existed
+            conn.execute("ALTER TABLE workflows ADD COLUMN reusable INTEGER NOT NULL DEFAULT 0")
+        conn.commit()
+
+        self._writer = threading.Thread(target=self._write_loop, name="workflow-store-writer", daemon=True)
+        self._writer.start()
+
+    def save(self, blueprint: WorkflowBlueprint, reusable: bool = False) -> StoredWorkflow:
+        """
+        Queue a blueprint for persistence; it is readable right away.
+        `reusable` is set for plans the similarity index should hold.
+        """
+        stored = StoredWorkflow.from_blueprint(blueprint, reusable)
+        with self._lock:
+            previous = self._pending.get(stored.workflow_id) or self._hot.get(stored.workflow_id)
+            if previous is not None:
+                stored.created_at = previous.created_at
+            self._pending[stored.workflow_id] = stored
+            self._remember(stored)
+        try:
+            self._queue.put_nowait(stored)
+        except queue.Full:
+            # The writer is behind: spill instead of blocking the caller
+            # (a later save of the same id replaces the spilled version)
+            with self._lock:
+                self._spilled[stored.workflow_id] = stored
+                self.overflows += 1
+        return stored
+
+    def get_cached(self, workflow_id: str) -> Optional[StoredWorkflow]:
+        """Look up a workflow in memory only (never touches SQLite)"""
+        with self._lock:
+            stored = self._hot.get(workflow_id) or self._pending.get(workflow_id)
+            if stored is not None:
+                if workflow_id in self._hot:
+                    self._hot.move_to_end(workflow_id)
+                self.hot_hits += 1
+            return stored
+
+    def get(self, workflow_id: str) -> Optional[StoredWorkflow]:
+        """Look up a stored workflow by id (a blocking SQLite read on a memory miss)"""
+        stored = self.get_cached(workflow_id)
+        if stored is not None:
+            return stored
+
+        row = self._connection().execute(
+            "SELECT workflow_id, goal, step_count, created_at, etag, body, reusable FROM workflows WHERE workflow_id = ?",
+            (workflow_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        stored = StoredWorkflow(*row[:6], reusable=bool(row[6]))
+        with self._lock:
+            self.db_reads += 1
+            self._remember(stored)
+        return stored
+
+    def list_workflows(
+        self,
+        limit: int = 20,
+        before: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        List workflows newest first.
+
+        Args:
+            limit: Page size
+            before: Cursor from a previous page
+
+        Returns:
+            (items, next_cursor) - next_cursor is None on the last page
+        """
+        self.flush()
+        query = "SELECT seq, workflow_id, goal, step_count, created_at FROM workflows"
+        params: List[Any] = []
+        if before is not None:
+            query += " WHERE seq < ?"
+            params.append(before)
+        query += " ORDER BY seq DESC LIMIT ?"
+        params.append(limit + 1)
+        rows = self._connection().execute(query, params).fetchall()
+
+        items = [
+            {"workflow_id": workflow_id, "goal": goal, "step_count": step_count, "created_at": created_at}
+            for _, workflow_id, goal, step_count, created_at in rows[:limit]
+        ]
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return items, next_cursor
+
+    def reusable_goals(self, limit: int) -> List[Tuple[str, str]]:
+        """(workflow_id, goal) of the newest `limit` reusable plans, newest first"""
+        self.flush()
+        return self._connection().execute(
+            "SELECT workflow_id, goal FROM workflows WHERE reusable = 1 ORDER BY seq DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+
+    def flush(self) -> None:
+        """Block until every write queued or spilled before the call has been committed"""
+        flushed = threading.Event()
+        self._queue.put(flushed)
+        flushed.wait()
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer thread"""
+        self._queue.put(None)
+        self._writer.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hot-cache and write-behind counters"""
+        with self._lock:
+            return {
+                "hot_entries": len(self._hot),
+                "hot_size": self.hot_size,
+                "pending_writes": len(self._pending),
+                "hot_hits": self.hot_hits,
+                "db_reads": self.db_reads,
+                "writes": self.writes,
+                "queued_writes": self._queue.qsize(),
+                "spilled_writes": len(self._spilled),
+                "overflows": self.overflows,
+            }
+
+    def _remember(self, stored: StoredWorkflow) -> None:
+        """Insert into the hot LRU (lock held)"""
+        if self.hot_size <= 0:
+            return
+        self._hot[stored.workflow_id] = stored
+        self._hot.move_to_end(stored.workflow_id)
+        while len(self._hot) > self.hot_size:
+            self._hot.popitem(last=False)
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write_loop(self) -> None:
+        conn = self._connection()
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in batch:
+                running = False
+            with self._lock:
+                # Spilled saves happened while the queue was full, i.e. before
+                # this batch's flush markers were queued
+                candidates = [item for item in batch if isinstance(item, StoredWorkflow)]
+                candidates.extend(self._spilled.values())
+                self._spilled.clear()
+                # Write only the newest version of each id: a spilled version
+                # can be newer or older than one still in the queue
+                items = [stored for stored in candidates if self._pending.get(stored.workflow_id) is stored]
+            try:
+                if items:
+                    conn.executemany(_UPSERT, [
+                        (s.workflow_id, s.goal, s.step_count, s.created_at, time.time(), s.etag, s.body, int(s.reusable))
+                        for s in items
+                    ])
+                    conn.commit()
+            except sqlite3.Error as e:
+                logger.error("Error persisting workflows", extra={"fields": {"count": len(items), "error": str(e)}})
+            finally:
+                with self._lock:
+                    self.writes += len(items)
+                    for stored in items:
+                        # Only drop the pending entry if no newer version was saved meanwhile
+                        if self._pending.get(stored.workflow_id) is stored:
+                            del self._pending[stored.workflow_id]
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
@@ -0,0 +1,27 @@
+"""
+Shared test setup. main.py opens its databases at import, so they are
+pointed at a scratch directory first, and planning runs in mock mode.
+"""
+import os
+import tempfile
+
+import pytest
+
+_DATA_DIR = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ["WORKFLOW_DB_PATH"] = os.path.join(_DATA_DIR, "workflows.db")
+os.environ["LLM_CACHE_PATH"] = os.path.join(_DATA_DIR, "llm_cache.db")
+os.environ["JOB_QUEUE_PATH"] = os.path.join(_DATA_DIR, "jobs.db")
+os.environ["MOCK_MODE"] = "true"
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    TestClient for the API. Shutdown closes the workflow store, so one client
+    serves the whole session.
+    """
+    from fastapi.testclient import TestClient
+
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
@@ -0,0 +1,31 @@
+"""Batch generation: per-item validation and goal deduplication"""
+import pytest
+
+
+def test_batch_plans_identical_goals_once(client):
+    response = client.post("/api/workflow/generate/batch", json={"requests": [
+        {"goal": "Send a weekly digest", "mode": "fast"},
+        {"goal": "send a weekly digest.", "mode": "fast"},
+        {"goal": "sync leads to airtable", "timeout": 30},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"], body["unique_goals"]) == (3, 0, 2)
+    ids = {result["blueprint"]["workflow_id"] for result in body["results"]}
+    assert len(ids) == 3
+
+
+@pytest.mark.parametrize("field, value", [
+    ("job", True),
+    ("progressive", True),
+    ("session_id", "s-1"),
+    ("job", False),
+])
+def test_batch_rejects_unsupported_item_fields(client, field, value):
+    response = client.post("/api/workflow/generate/batch", json={"requests": [
+        {"goal": "send a weekly digest"},
+        {"goal": "sync leads to airtable", field: value},
+    ]})
+    assert response.status_code == 422
+    [error] = response.json()["detail"]
+    assert error["loc"] == ["body", "requests", 1, field]
@@ -0,0 +1,145 @@
+"""BlueprintCache: keys, single-flight coalescing and failure propagation"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agents.blueprint_cache import BlueprintCache, make_cache_key
+from schemas.workflow import WorkflowStep
+from services.cancellation import DEADLINE, DISCONNECTED, CancelToken, PlanCancelled
+from workflow.graph import blueprint_from_steps
+
+
+WAITERS = 4
+
+
+def blueprint(goal="sync leads"):
+    step = WorkflowStep(id="a", name="A", description="", action_type="api_call", tool="http", parameters={})
+    return blueprint_from_steps(goal, [step])
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+class BlockingPlan:
+    """A plan callable that blocks until released, then returns or raises"""
+
+    def __init__(self, result=None, error=None):
+        self.release = threading.Event()
+        self.result = result
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def start_leader_and_waiters(cache, leader_plan, waiter_plan, waiter_cancel=None):
+    """Run the leader, then WAITERS callers that coalesce onto it; returns their futures"""
+    pool = ThreadPoolExecutor(max_workers=WAITERS + 1)
+    leader = pool.submit(cache.get_or_plan, "Sync leads", None, leader_plan)
+    wait_until(lambda: cache.stats()["in_flight"] == 1)
+    waiters = [
+        pool.submit(cache.get_or_plan, "sync  leads!", None, waiter_plan, cancel=waiter_cancel)
+        for _ in range(WAITERS)
+    ]
+    wait_until(lambda: cache.stats()["coalesced"] == WAITERS)
+    pool.shutdown(wait=False)
+    return leader, waiters
+
+
+def test_key_ignores_wording_and_context_order():
+    assert make_cache_key("Sync leads.", {"a": 1, "b": 2}) == make_cache_key(" sync   LEADS", {"b": 2, "a": 1})
+    assert make_cache_key("sync leads", {"a": 1}) != make_cache_key("sync leads", {"a": 2})
+    assert make_cache_key("sync leads", None, "mock") != make_cache_key("sync leads", None, "crew")
+
+
+def test_concurrent_misses_run_the_planner_once():
+    cache = BlueprintCache()
+    plan = BlockingPlan(result=(blueprint(), True))
+    leader, waiters = start_leader_and_waiters(cache, plan, plan)
+    plan.release.set()
+
+    results = [leader.result(5)] + [future.result(5) for future in waiters]
+    assert plan.calls == 1
+    assert len({result.workflow_id for result in results}) == len(results)
+    assert {result.goal for result in results[1:]} == {"sync  leads!"}
+    assert cache.get_or_plan("sync leads", None, plan).steps == results[0].steps
+    assert cache.stats()["hits"] == 1 and cache.stats()["in_flight"] == 0
+
+
+def test_leader_failure_reaches_every_waiter():
+    cache = BlueprintCache()
+    error = RuntimeError("planner crashed")
+    leader_plan = BlockingPlan(error=error)
+    waiter_plan = BlockingPlan(result=(blueprint(), True))
+    leader, waiters = start_leader_and_waiters(cache, leader_plan, waiter_plan)
+    leader_plan.release.set()
+
+    for future in [leader] + waiters:
+        with pytest.raises(RuntimeError) as excinfo:
+            future.result(5)
+        assert excinfo.value is error
+    assert waiter_plan.calls == 0
+    # Failures are not cached: the next caller plans again
+    waiter_plan.release.set()
+    assert cache.get_or_plan("sync leads", None, waiter_plan).goal == "sync leads"
+    assert waiter_plan.calls == 1
+
+
+def test_cancelled_leader_hands_the_plan_to_a_waiter():
+    cache = BlueprintCache()
+    leader_plan = BlockingPlan(error=PlanCancelled("client went away", DISCONNECTED))
+    waiter_plan = BlockingPlan(result=(blueprint(), True))
+    waiter_plan.release.set()
+    leader, waiters = start_leader_and_waiters(cache, leader_plan, waiter_plan)
+    leader_plan.release.set()
+
+    with pytest.raises(PlanCancelled):
+        leader.result(5)
+    for future in waiters:
+        assert future.result(5).steps[0].id == "a"
+    # One waiter became the new leader and the rest coalesced onto it or hit the cache
+    assert waiter_plan.calls == 1
+
+
+def test_waiter_stops_on_its_own_deadline():
+    cache = BlueprintCache()
+    plan = BlockingPlan(result=(blueprint(), True))
+    leader, waiters = start_leader_and_waiters(cache, plan, plan, waiter_cancel=CancelToken(timeout=0.05))
+    for future in waiters:
+        with pytest.raises(PlanCancelled) as excinfo:
+            future.result(5)
+        assert excinfo.value.reason == DEADLINE
+    plan.release.set()
+    assert leader.result(5).goal == "sync leads"
+
+
+def test_uncacheable_result_is_shared_but_not_stored():
+    cache = BlueprintCache()
+    plan = BlockingPlan(result=(blueprint(), False))
+    leader, waiters = start_leader_and_waiters(cache, plan, plan)
+    plan.release.set()
+    for future in [leader] + waiters:
+        future.result(5)
+    assert cache.peek("sync leads", None) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disabled_cache_always_plans():
+    cache = BlueprintCache(max_entries=0)
+    plan = BlockingPlan(result=(blueprint(), True))
+    plan.release.set()
+    cache.get_or_plan("sync leads", None, plan)
+    cache.get_or_plan("sync leads", None, plan)
+    assert plan.calls == 2
+    assert cache.peek("sync leads", None) is None
@@ -0,0 +1,89 @@
+"""Content negotiation and per-representation ETags"""
+import pytest
+
+from services import encoding
+from services.encoding import JSON, MSGPACK, etag_version, negotiate_encoding, representation_etag
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    monkeypatch.setattr(encoding, "brotli", object())
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1, br;q=0.1", "gzip"),
+    ("gzip;q=0.5, br;q=0.8", "br"),
+    ("br;q=0, gzip;q=0.2", "gzip"),
+    ("*", "br"),
+    ("*;q=0.5, gzip;q=0.9", "gzip"),
+    ("gzip;q=0, br;q=0", None),
+    ("identity;q=1, gzip;q=0.5", None),
+    ("deflate", None),
+])
+def test_negotiate_encoding_prefers_highest_weight(with_brotli, header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(encoding, "brotli", None)
+    assert negotiate_encoding("br;q=1, gzip;q=0.1") == "gzip"
+    assert negotiate_encoding("br") is None
+
+
+def test_representation_etags_differ_per_variant():
+    stored = '"abc123"'
+    tags = {
+        representation_etag(stored),
+        representation_etag(stored, coding="gzip"),
+        representation_etag(stored, coding="br"),
+        representation_etag(stored, MSGPACK),
+        representation_etag(stored, MSGPACK, coding="gzip"),
+        representation_etag(stored, JSON, ("workflow_id", "goal", "steps")),
+    }
+    assert len(tags) == 6
+    assert representation_etag(stored) == stored
+    assert all(etag_version(tag) == stored for tag in tags)
+    assert etag_version('W/"abc123-gzip"') == stored
+
+
+def test_get_workflow_etag_follows_representation(client):
+    workflow_id = client.post("/api/workflow/generate", json={"goal": "email me a daily report"}).json()["workflow_id"]
+    plain = client.get(f"/api/workflow/{workflow_id}", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get(f"/api/workflow/{workflow_id}", headers={"Accept-Encoding": "gzip"})
+    packed = client.get(f"/api/workflow/{workflow_id}?format=msgpack", headers={"Accept-Encoding": "identity"})
+
+    tags = {plain.headers["etag"], gzipped.headers["etag"], packed.headers["etag"]}
+    assert len(tags) == 3
+    assert {"Accept", "Accept-Encoding"} <= set(plain.headers["vary"].split(", "))
+
+    # A tag only revalidates its own representation
+    not_modified = client.get(
+        f"/api/workflow/{workflow_id}",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]}
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == gzipped.headers["etag"]
+    assert {"Accept", "Accept-Encoding"} <= set(not_modified.headers["vary"].split(", "))
+    other = client.get(
+        f"/api/workflow/{workflow_id}",
+        headers={"Accept-Encoding": "identity", "If-None-Match": gzipped.headers["etag"]}
+    )
+    assert other.status_code == 200
+
+
+def test_replan_if_match_accepts_any_representation_tag(client):
+    workflow_id = client.post("/api/workflow/generate", json={"goal": "add form leads to airtable"}).json()["workflow_id"]
+    gzipped = client.get(f"/api/workflow/{workflow_id}", headers={"Accept-Encoding": "gzip"})
+    step_id = gzipped.json()["steps"][0]["id"]
+    edit = {"instruction": "use the Leads table", "step_ids": [step_id]}
+
+    replanned = client.post(f"/api/workflow/{workflow_id}/replan", json=edit, headers={"If-Match": gzipped.headers["etag"]})
+    assert replanned.status_code == 200
+    assert replanned.json()["base_etag"] == etag_version(gzipped.headers["etag"])
+
+    stale = client.post(f"/api/workflow/{workflow_id}/replan", json=edit, headers={"If-Match": gzipped.headers["etag"]})
+    assert stale.status_code == 412
@@ -0,0 +1,122 @@
+"""WorkflowExecutor: streaming, retries, failure propagation and checkpoint resume"""
+import asyncio
+
+import pytest
+
+from schemas.workflow import WorkflowStep
+from workflow.adapters import AdapterRegistry, EchoAdapter, StubAdapter, ToolAdapter
+from workflow.executor import (
+    FAILED, RESTORED, SKIPPED, SUCCEEDED, MemoryCheckpointStore, SQLiteCheckpointStore, WorkflowExecutor
+)
+from workflow.graph import WorkflowGraphError
+
+
+def step(step_id, next_id=None, more=None, tool="http"):
+    return WorkflowStep(
+        id=step_id,
+        name=step_id,
+        description="",
+        action_type="api_call",
+        tool=tool,
+        parameters={},
+        next_step_id=next_id,
+        next_step_ids=more
+    )
+
+
+# a -> b -> d, a -> c -> d (c uses the "flaky" tool)
+DIAMOND = [step("a", "b", ["c"]), step("b", "d"), step("c", "d", tool="flaky"), step("d")]
+
+
+class CountingAdapter(StubAdapter):
+    """StubAdapter that records which steps it ran"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.ran = []
+
+    async def run(self, step, inputs):
+        self.ran.append(step.id)
+        async for chunk in super().run(step, inputs):
+            yield chunk
+
+
+def statuses(result):
+    return {step_id: step_result.status for step_id, step_result in result.steps.items()}
+
+
+def run(executor, steps, **kwargs):
+    return asyncio.run(executor.run(steps, **kwargs))
+
+
+def test_diamond_streams_every_chunk():
+    events = []
+    result = run(WorkflowExecutor(AdapterRegistry(default=StubAdapter(chunks=3))), DIAMOND, on_event=lambda e, _: events.append(e))
+    assert result.succeeded
+    assert {step_id: r.chunks for step_id, r in result.steps.items()} == {"a": 3, "b": 3, "c": 3, "d": 3}
+    assert events.count("step_completed") == 4 and events[-1] == "run_completed"
+
+
+def test_echo_passes_inputs_through():
+    registry = AdapterRegistry(default=StubAdapter(chunks=2)).register(EchoAdapter(), tool="echo")
+    result = run(WorkflowExecutor(registry), [step("a", "b"), step("b", "c", tool="echo"), step("c")])
+    # Two chunks from a, then b's own parameters record
+    assert result.steps["b"].chunks == 3
+
+
+def test_failed_attempts_are_retried_before_output():
+    registry = AdapterRegistry(default=StubAdapter()).register(StubAdapter(fail_times=2), tool="flaky")
+    result = run(WorkflowExecutor(registry, max_retries=2, retry_backoff=0), DIAMOND)
+    assert result.succeeded
+    assert result.steps["c"].attempts == 3
+
+
+def test_failed_step_skips_descendants_only():
+    registry = AdapterRegistry(default=StubAdapter()).register(StubAdapter(fail_times=9), tool="flaky")
+    result = run(WorkflowExecutor(registry, max_retries=1, retry_backoff=0), DIAMOND)
+    assert statuses(result) == {"a": SUCCEEDED, "b": SUCCEEDED, "c": FAILED, "d": SKIPPED}
+    assert "Stub failure" in result.steps["c"].error
+    assert not result.succeeded
+
+
+def test_step_timeout_fails_the_step():
+    registry = AdapterRegistry(default=StubAdapter(latency=1.0))
+    result = run(WorkflowExecutor(registry, step_timeout=0.05, max_retries=0), [step("a", "b"), step("b")])
+    assert statuses(result) == {"a": FAILED, "b": SKIPPED}
+    assert result.steps["a"].error == "timed out"
+
+
+def test_missing_adapter_fails_the_step():
+    registry = AdapterRegistry().register(StubAdapter(), tool="http")
+    result = run(WorkflowExecutor(registry), [step("a", "b"), step("b", tool="fax")])
+    assert statuses(result) == {"a": SUCCEEDED, "b": FAILED}
+    assert "No adapter" in result.steps["b"].error
+
+
+def test_cyclic_workflow_is_rejected():
+    with pytest.raises(WorkflowGraphError, match="cycle"):
+        run(WorkflowExecutor(AdapterRegistry(default=StubAdapter())), [step("a", "b"), step("b", "a")])
+
+
+@pytest.mark.parametrize("store_factory", [
+    lambda tmp_path: MemoryCheckpointStore(),
+    lambda tmp_path: SQLiteCheckpointStore(str(tmp_path / "checkpoints.db")),
+], ids=["memory", "sqlite"])
+def test_resume_after_failed_step_reruns_only_unfinished_steps(tmp_path, store_factory):
+    checkpoints = store_factory(tmp_path)
+    broken = AdapterRegistry(default=StubAdapter(chunks=2)).register(StubAdapter(fail_times=9), tool="flaky")
+    first = run(WorkflowExecutor(broken, max_retries=0, checkpoints=checkpoints), DIAMOND, run_id="run-1")
+    assert statuses(first) == {"a": SUCCEEDED, "b": SUCCEEDED, "c": FAILED, "d": SKIPPED}
+
+    adapter = CountingAdapter(chunks=2)
+    second = run(WorkflowExecutor(AdapterRegistry(default=adapter), checkpoints=checkpoints), DIAMOND, run_id="run-1")
+    assert statuses(second) == {"a": RESTORED, "b": RESTORED, "c": SUCCEEDED, "d": SUCCEEDED}
+    assert sorted(adapter.ran) == ["c", "d"]
+    # Restored outputs are replayed to the re-run steps
+    assert second.steps["a"].chunks == 2
+    assert second.succeeded
+
+
+def test_tool_adapter_is_abstract():
+    with pytest.raises(TypeError):
+        ToolAdapter()
@@ -0,0 +1,85 @@
+"""WorkflowGraph: indexing, validation and topological order"""
+import pytest
+
+from schemas.workflow import WorkflowStep
+from workflow.graph import WorkflowGraph, WorkflowGraphError, blueprint_from_steps, successor_ids
+
+
+def step(step_id, next_id=None, more=None):
+    return WorkflowStep(
+        id=step_id,
+        name=step_id,
+        description="",
+        action_type="api_call",
+        tool="http",
+        parameters={},
+        next_step_id=next_id,
+        next_step_ids=more
+    )
+
+
+def ids(graph, positions):
+    return [graph.steps[position].id for position in positions]
+
+
+def test_branching_graph_is_indexed():
+    graph = WorkflowGraph([step("a", "b", ["c"]), step("b", "d"), step("c", "d"), step("d")])
+    assert graph.problems() == []
+    assert ids(graph, graph.successors[graph.index["a"]]) == ["b", "c"]
+    assert ids(graph, graph.predecessors[graph.index["d"]]) == ["b", "c"]
+    assert ids(graph, graph.sources()) == ["a"]
+    assert ids(graph, graph.sinks()) == ["d"]
+
+
+def test_topological_order_respects_every_edge():
+    # Listed out of dependency order on purpose
+    graph = WorkflowGraph([step("d"), step("b", "d"), step("a", "b", ["c"]), step("c", "d")])
+    order = ids(graph, graph.topological_order())
+    assert sorted(order) == ["a", "b", "c", "d"]
+    for source, target in graph.edge_pairs():
+        assert order.index(source) < order.index(target)
+
+
+@pytest.mark.parametrize("steps, cycle", [
+    ([step("a", "b"), step("b", "a")], ["a", "b", "a"]),
+    ([step("a", "b"), step("b", "c"), step("c", "b")], ["b", "c", "b"]),
+    ([step("s", "a"), step("a", "b", ["x"]), step("x"), step("b", "a")], ["a", "b", "a"]),
+])
+def test_cycles_are_found_and_rejected(steps, cycle):
+    graph = WorkflowGraph(steps)
+    assert graph.topological_order() is None
+    assert graph.find_cycle() == cycle
+    with pytest.raises(WorkflowGraphError) as excinfo:
+        graph.validate()
+    assert excinfo.value.problems == ["cycle " + " -> ".join(cycle)]
+
+
+def test_reference_problems_are_recorded_not_raised():
+    graph = WorkflowGraph([step("a", "a", ["ghost"]), step("b"), step("b", "a")])
+    assert graph.duplicate_ids == ["b"]
+    assert graph.dangling == [("a", "a"), ("a", "ghost")]
+    assert graph.problems() == [
+        "duplicate step id 'b'",
+        "step 'a' points to itself",
+        "step 'a' points to unknown step 'ghost'",
+    ]
+    with pytest.raises(WorkflowGraphError):
+        graph.validate()
+
+
+def test_sanitized_steps_drop_bad_references():
+    graph = WorkflowGraph([step("a", "ghost", ["b", "a"]), step("b"), step("b", "a")])
+    steps = graph.sanitized_steps()
+    assert [(s.id, successor_ids(s)) for s in steps] == [("a", ["b"]), ("b", [])]
+    assert WorkflowGraph(steps).problems() == []
+
+
+def test_empty_workflow_is_invalid():
+    with pytest.raises(WorkflowGraphError, match="no steps"):
+        WorkflowGraph([]).validate()
+
+
+def test_react_flow_nodes_and_edges():
+    blueprint = blueprint_from_steps("goal", [step("a", "b", ["c"]), step("b"), step("c")])
+    assert [(node["id"], node["type"]) for node in blueprint.nodes] == [("a", "input"), ("b", "output"), ("c", "output")]
+    assert [(edge["source"], edge["target"]) for edge in blueprint.edges] == [("a", "b"), ("a", "c")]
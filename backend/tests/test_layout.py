@@ -0,0 +1,90 @@
+"""LayeredLayout: incremental updates must layer like a full re-layout"""
+import random
+
+import pytest
+
+from workflow.layout import LayeredLayout
+
+
+def random_dag(rng, nodes):
+    node_ids = [f"step-{i}" for i in range(nodes)]
+    edges = set()
+    for i in range(1, nodes):
+        for _ in range(rng.randint(1, 2)):
+            edges.add((node_ids[rng.randrange(max(0, i - 5), i)], node_ids[i]))
+    return node_ids, edges
+
+
+def full_layers(node_ids, edges):
+    layout = LayeredLayout()
+    layout.layout(node_ids, edges)
+    return dict(layout.layer), len(layout.layers)
+
+
+def assert_matches_full_layout(layout, node_ids, edges):
+    layers, depth = full_layers(node_ids, edges)
+    assert layout.layer == layers
+    assert len(layout.layers) == depth
+    assert sorted(node_id for members in layout.layers for node_id in members) == sorted(node_ids)
+
+
+def test_chain_keeps_the_planner_coordinates():
+    positions = LayeredLayout().layout(["a", "b", "c"], [("a", "b"), ("b", "c")])
+    assert positions == {
+        "a": {"x": 100.0, "y": 150.0},
+        "b": {"x": 400.0, "y": 150.0},
+        "c": {"x": 700.0, "y": 150.0},
+    }
+
+
+def test_update_without_changes_keeps_positions():
+    layout = LayeredLayout()
+    before = layout.layout(["a", "b", "c", "d"], [("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")])
+    assert layout.update() == before
+
+
+def test_insert_into_chain_pushes_descendants():
+    layout = LayeredLayout()
+    layout.layout(["a", "b", "c"], [("a", "b"), ("b", "c")])
+    layout.update(add_nodes=["x"], remove_edges=[("a", "b")], add_edges=[("a", "x"), ("x", "b")])
+    assert layout.layer == {"a": 0, "x": 1, "b": 2, "c": 3}
+
+
+def test_removing_a_node_pulls_descendants_back():
+    layout = LayeredLayout()
+    layout.layout(["a", "b", "c", "d"], [("a", "b"), ("b", "c"), ("c", "d"), ("a", "c")])
+    layout.update(remove_nodes=["b"])
+    assert_matches_full_layout(layout, ["a", "c", "d"], {("a", "c"), ("c", "d")})
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_edits_match_full_layout(seed):
+    rng = random.Random(seed)
+    node_ids, edges = random_dag(rng, 30)
+    layout = LayeredLayout()
+    layout.layout(node_ids, edges)
+
+    for step in range(15):
+        add_nodes, remove_nodes, add_edges, remove_edges = [], [], [], []
+        action = rng.choice(["add_node", "remove_node", "add_edge", "remove_edge"])
+        if action == "add_node":
+            new_id = f"new-{step}"
+            source = rng.choice(node_ids)
+            add_nodes.append(new_id)
+            add_edges.append((source, new_id))
+            node_ids = node_ids + [new_id]
+        elif action == "remove_node" and len(node_ids) > 2:
+            victim = rng.choice(node_ids)
+            remove_nodes.append(victim)
+            node_ids = [node_id for node_id in node_ids if node_id != victim]
+        elif action == "remove_edge" and edges:
+            remove_edges.append(rng.choice(sorted(edges)))
+        else:
+            # Forward in node order, so the graph stays acyclic
+            a, b = sorted(rng.sample(range(len(node_ids)), 2))
+            add_edges.append((node_ids[a], node_ids[b]))
+
+        edges = (edges | set(add_edges)) - set(remove_edges)
+        edges = {(s, t) for s, t in edges if s not in remove_nodes and t not in remove_nodes}
+        layout.update(add_nodes=add_nodes, remove_nodes=remove_nodes, add_edges=add_edges, remove_edges=remove_edges)
+        assert_matches_full_layout(layout, node_ids, edges)
@@ -0,0 +1,68 @@
+"""Mock rule engine: template selection must match the original if/elif chain"""
+import itertools
+
+import pytest
+
+from agents.mock_rules import KeywordMatcher, mock_rule_engine
+
+
+def baseline_template(goal):
+    """Template the original _generate_mock_workflow chain picked for a goal"""
+    goal_lower = goal.lower()
+    if "typeform" in goal_lower or "form" in goal_lower:
+        return "form_to_airtable" if "airtable" in goal_lower else "form_other"
+    elif "email" in goal_lower and "trello" in goal_lower:
+        return "email_to_trello"
+    elif "order" in goal_lower or "inventory" in goal_lower:
+        return "order_inventory"
+    elif "crm" in goal_lower or "contact" in goal_lower:
+        return "crm_contact"
+    elif "newsletter" in goal_lower or "mailchimp" in goal_lower:
+        return "newsletter_signup"
+    return "generic"
+
+
+def tools(goal):
+    return [step.tool for step in mock_rule_engine.build_steps(goal)]
+
+
+@pytest.mark.parametrize("goal, template, expected_tools", [
+    ("When a Typeform is submitted, add it to Airtable", "form_to_airtable", ["typeform", "airtable"]),
+    ("Form to Airtable and send a welcome email", "form_to_airtable", ["typeform", "airtable", "sendgrid"]),
+    ("Collect form entries and add the contact to our CRM", "form_other", []),
+    # "form" also matches inside other words, as it did before
+    ("Transform new orders and update inventory", "form_other", []),
+    ("Turn customer emails into Trello cards", "email_to_trello", ["gmail", "trello"]),
+    ("Email me about new orders", "order_inventory", ["shopify", "google_sheets"]),
+    ("New order: update inventory and notify the team on Slack", "order_inventory", ["shopify", "google_sheets", "slack"]),
+    ("Add each new CRM contact to the newsletter", "crm_contact", ["hubspot", "mailchimp"]),
+    ("Newsletter signups go to Mailchimp", "newsletter_signup", ["website", "mailchimp", "mailchimp"]),
+    ("Back up my photos every night", "generic", ["generic", "processor", "integration"]),
+])
+def test_goal_selects_template(goal, template, expected_tools):
+    rule, _ = mock_rule_engine.select(goal)
+    assert rule.name == template == baseline_template(goal)
+    assert tools(goal) == expected_tools
+
+
+KEYWORDS = ["typeform", "form", "airtable", "email", "welcome", "trello", "order", "inventory",
+            "slack", "notify", "crm", "contact", "newsletter", "mailchimp"]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3])
+def test_every_keyword_combination_matches_the_baseline_chain(size):
+    for words in itertools.combinations(KEYWORDS, size):
+        goal = "please " + " and ".join(words)
+        assert mock_rule_engine.select(goal)[0].name == baseline_template(goal), goal
+
+
+def test_steps_are_chained():
+    steps = mock_rule_engine.build_steps("typeform to airtable with welcome email")
+    assert [step.id for step in steps] == ["step-1", "step-2", "step-3"]
+    assert [step.next_step_id for step in steps] == ["step-2", "step-3", None]
+
+
+def test_keyword_matcher_finds_overlapping_keywords():
+    matcher = KeywordMatcher(["form", "typeform", "orm", "or"])
+    found = matcher.find("typeform order")
+    assert sorted(matcher.keywords[i] for i in found) == ["form", "or", "orm", "typeform"]
@@ -0,0 +1,38 @@
+"""Progressive generation updates over the workflow websocket"""
+import time
+
+import pytest
+
+import main
+from services.refinements import REFINING
+
+
+@pytest.fixture
+def refining(client):
+    """A stored template whose refinement never finishes"""
+    workflow_id = client.post("/api/workflow/generate", json={"goal": "post new leads to slack"}).json()["workflow_id"]
+    main.refinements.start(workflow_id)
+    yield workflow_id
+    main.refinements.finish(workflow_id, "failed", error="test over")
+
+
+def test_ws_wait_stops_at_the_request_deadline(client, refining, monkeypatch):
+    monkeypatch.setattr(main, "PLAN_TIMEOUT", 0.2)
+    with client.websocket_connect(f"/api/workflow/{refining}/ws") as websocket:
+        assert websocket.receive_json() == {"event": "status", "status": REFINING}
+        assert websocket.receive_json()["event"] == "timeout"
+
+
+def test_ws_wait_ends_when_the_client_disconnects(client, refining):
+    started = time.monotonic()
+    with client.websocket_connect(f"/api/workflow/{refining}/ws") as websocket:
+        assert websocket.receive_json()["status"] == REFINING
+        websocket.send_text("ignored")
+    # Leaving the block waits for the handler, which must not sit out PLAN_TIMEOUT
+    assert time.monotonic() - started < 5
+    assert main.refinements.status(refining)["status"] == REFINING
+
+
+def test_ws_unknown_workflow(client):
+    with client.websocket_connect("/api/workflow/missing/ws") as websocket:
+        assert websocket.receive_json() == {"event": "error", "detail": "Workflow not found"}
@@ -0,0 +1,86 @@
+"""Step edits: merged blueprints keep untouched nodes, so patches stay small"""
+import pytest
+
+from agents.workflow_planner import _merge_step_edit
+from schemas.workflow import WorkflowStep
+from workflow.graph import WorkflowGraphError, blueprint_from_steps
+from workflow.patch import apply_patch, diff_blueprints, patch_blueprint
+
+
+def step(step_id, next_id=None, more=None, **parameters):
+    return WorkflowStep(
+        id=step_id,
+        name=step_id.title(),
+        description=f"Run {step_id}",
+        action_type="api_call",
+        tool="http",
+        parameters=parameters,
+        next_step_id=next_id,
+        next_step_ids=more
+    )
+
+
+@pytest.fixture
+def base():
+    # a -> b -> d, a -> c -> d
+    return blueprint_from_steps("sync leads", [
+        step("a", "b", ["c"]),
+        step("b", "d", table="Leads"),
+        step("c", "d"),
+        step("d"),
+    ])
+
+
+def paths(patch):
+    return [op["path"] for op in patch]
+
+
+def by_id(blueprint):
+    """Blueprint document with its arrays sorted, since patches keep the base's order"""
+    document = blueprint.model_dump()
+    for name in ("steps", "nodes", "edges"):
+        document[name].sort(key=lambda item: item["id"])
+    return document
+
+
+def test_parameter_edit_patches_only_that_step(base):
+    edited = _merge_step_edit(base, ["b"], [step("b", "d", table="Contacts")])
+    patch = diff_blueprints(base, edited)
+    assert patch == [{"op": "replace", "path": "/steps/1/parameters", "value": {"table": "Contacts"}}]
+    assert patch_blueprint(base, patch) == edited
+
+
+def test_renamed_step_patches_only_its_step_and_node(base):
+    renamed = step("b", "d", table="Leads").model_copy(update={"name": "Upsert lead"})
+    edited = _merge_step_edit(base, ["b"], [renamed])
+    assert sorted(paths(diff_blueprints(base, edited))) == ["/nodes/1/data", "/steps/1/name"]
+
+
+def test_edit_keeps_moved_nodes_in_place(base):
+    # Positions the user dragged on the canvas survive an edit elsewhere
+    base.nodes[0]["position"] = {"x": 5.0, "y": 5.0}
+    edited = _merge_step_edit(base, ["d"], [step("d", None, None, to="ops@example.com")])
+    assert edited.nodes[0]["position"] == {"x": 5.0, "y": 5.0}
+    assert not [path for path in paths(diff_blueprints(base, edited)) if "position" in path]
+
+
+def test_inserted_step_only_moves_downstream_nodes(base):
+    edited = _merge_step_edit(base, ["d"], [step("d", "e"), step("e")])
+    old = {node["id"]: node["position"] for node in base.nodes}
+    new = {node["id"]: node["position"] for node in edited.nodes}
+    assert all(new[node_id] == old[node_id] for node_id in "abcd")
+    assert new["e"]["x"] > new["d"]["x"]
+    patch = diff_blueprints(base, edited)
+    assert apply_patch(base.model_dump(), patch) == edited.model_dump()
+
+
+def test_deleted_step_is_bypassed(base):
+    edited = _merge_step_edit(base, ["b"], [])
+    assert [s.id for s in edited.steps] == ["a", "c", "d"]
+    assert {edited.steps[0].next_step_id, *edited.steps[0].next_step_ids} == {"c", "d"}
+    assert by_id(patch_blueprint(base, diff_blueprints(base, edited))) == by_id(edited)
+
+
+def test_edit_closing_a_cycle_is_rejected(base):
+    with pytest.raises(WorkflowGraphError):
+        _merge_step_edit(base, ["d"], [step("d", "a")])
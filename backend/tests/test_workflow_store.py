@@ -0,0 +1,141 @@
+"""WorkflowStore: write-behind persistence, overflow spilling and reads"""
+import sqlite3
+import time
+
+import pytest
+
+from schemas.workflow import WorkflowStep
+from services.workflow_store import WorkflowStore
+from workflow.graph import blueprint_from_steps
+
+
+def blueprint(goal, version=0):
+    step = WorkflowStep(
+        id="a",
+        name="A",
+        description="",
+        action_type="api_call",
+        tool="http",
+        parameters={"version": version}
+    )
+    return blueprint_from_steps(goal, [step])
+
+
+def with_id(source, workflow_id):
+    return source.model_copy(update={"workflow_id": workflow_id})
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "workflows.db")
+
+
+@pytest.fixture
+def store(path):
+    store = WorkflowStore(path)
+    yield store
+    store.close()
+
+
+def test_saved_workflow_is_readable_before_and_after_the_write(path, store):
+    stored = store.save(blueprint("send a digest"))
+    assert store.get_cached(stored.workflow_id) is stored
+    store.flush()
+    assert store.stats()["pending_writes"] == 0
+
+    reopened = WorkflowStore(path)
+    try:
+        assert reopened.get_cached(stored.workflow_id) is None
+        loaded = reopened.get(stored.workflow_id)
+        assert (loaded.etag, loaded.body) == (stored.etag, stored.body)
+        assert loaded.blueprint() == stored.blueprint()
+        assert reopened.stats()["db_reads"] == 1
+        assert reopened.get("missing") is None
+    finally:
+        reopened.close()
+
+
+def test_resave_keeps_created_at_and_replaces_the_body(store):
+    first = store.save(blueprint("sync leads"))
+    store.flush()
+    second = store.save(with_id(blueprint("sync leads", version=1), first.workflow_id))
+    store.flush()
+    assert second.created_at == first.created_at
+    assert second.etag != first.etag
+    items, _ = store.list_workflows()
+    assert [item["workflow_id"] for item in items] == [first.workflow_id]
+
+
+def test_full_queue_spills_without_blocking_and_persists_newest_versions(path):
+    store = WorkflowStore(path, batch_size=1, queue_size=2)
+    # Hold the database write lock so the writer stalls on its first batch
+    blocker = sqlite3.connect(path, timeout=30)
+    blocker.execute("BEGIN EXCLUSIVE")
+    try:
+        store.save(blueprint("warm up"))
+        wait_until(lambda: store.stats()["queued_writes"] == 0)
+
+        ids = [f"wf-{i}" for i in range(5)]
+        started = time.monotonic()
+        for version in range(3):
+            for workflow_id in ids:
+                store.save(with_id(blueprint("goal " + workflow_id, version), workflow_id))
+        assert time.monotonic() - started < 1.0
+
+        stats = store.stats()
+        assert stats["queued_writes"] == 2
+        assert stats["overflows"] == 13
+        assert stats["spilled_writes"] == 5
+        # Readers see the newest version while it waits
+        assert store.get_cached("wf-0").blueprint().steps[0].parameters == {"version": 2}
+    finally:
+        blocker.rollback()
+        blocker.close()
+
+    store.flush()
+    stats = store.stats()
+    assert stats["pending_writes"] == stats["spilled_writes"] == 0
+    store.close()
+
+    reopened = WorkflowStore(path)
+    try:
+        for workflow_id in ids:
+            assert reopened.get(workflow_id).blueprint().steps[0].parameters == {"version": 2}
+    finally:
+        reopened.close()
+
+
+def test_list_workflows_pages_newest_first(store):
+    saved = [store.save(blueprint(f"goal {i}")).workflow_id for i in range(5)]
+    first, cursor = store.list_workflows(limit=3)
+    rest, last = store.list_workflows(limit=3, before=cursor)
+    assert [item["workflow_id"] for item in first + rest] == saved[::-1]
+    assert last is None
+
+
+def test_reusable_column_is_added_to_old_databases(path):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE workflows (seq INTEGER PRIMARY KEY AUTOINCREMENT, workflow_id TEXT NOT NULL UNIQUE, "
+        "goal TEXT NOT NULL, step_count INTEGER NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+        "etag TEXT NOT NULL, body TEXT NOT NULL)"
+    )
+    conn.execute("INSERT INTO workflows VALUES (1, 'old', 'old goal', 1, 0, 0, '\"x\"', '{}')")
+    conn.commit()
+    conn.close()
+
+    store = WorkflowStore(path)
+    try:
+        planned = store.save(blueprint("planned goal"), reusable=True)
+        store.save(blueprint("template goal"))
+        assert store.reusable_goals(10) == [(planned.workflow_id, "planned goal")]
+        assert store.get("old").reusable is False
+    finally:
+        store.close()
@@ -0,0 +1,277 @@
+"""
+Planner Worker
+Runs WorkflowPlanner in processes of its own, taking generation jobs that the
+API enqueued with {"job": true} from the SQLite job queue. Planning capacity
+then scales apart from the API processes: run as many light API workers as
+needed and a tuned number of planner processes next to them.
+
+Each process runs `--threads` claim loops. A claimed job's lease is renewed
+while the planner runs; if the heartbeat fails (the job was cancelled or
+its lease passed to another worker) the run is cancelled. On shutdown a
+running job gets JOB_SHUTDOWN_GRACE seconds to finish; after that it is
+cancelled and released back to the queue without using up an attempt, so
+another worker picks it up right away instead of after the lease. The blueprint is
+written to the shared workflow store before the job is marked done, so API
+processes serve it from GET /api/workflow/{id}. The supervisor restarts
+processes that die and prunes old finished jobs.
+
+Usage (from backend/):
+    python worker.py --processes 4 --threads 2
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+from agents.workflow_planner import WorkflowPlanner
+from services.cancellation import JOB_CANCELLED, WORKER_STOPPING, CancelToken, PlanCancelled
+from services.job_queue import Job, JobQueue
+from services.logs import LogPipeline, configure_logging, request_scope
+from services.workflow_store import WorkflowStore
+
+
+logger = logging.getLogger("worker")
+
+# How often a running job's heartbeat thread checks for shutdown
+HEARTBEAT_POLL_SECONDS = 0.25
+
+
+def _job_queue() -> JobQueue:
+    return JobQueue(
+        path=os.getenv("JOB_QUEUE_PATH", "jobs.db"),
+        lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+        max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+        retry_backoff=float(os.getenv("JOB_RETRY_BACKOFF", "5")),
+        max_queued=int(os.getenv("JOB_QUEUE_MAX", "1000"))
+    )
+
+
+def _configure_logging() -> LogPipeline:
+    return configure_logging(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        fmt=os.getenv("LOG_FORMAT", "json"),
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        sample_rate=float(os.getenv("LOG_SAMPLE_RATE", "0.1")),
+        transcript_entries=int(os.getenv("LOG_TRANSCRIPT_ENTRIES", "50")),
+        transcript_chars=int(os.getenv("LOG_TRANSCRIPT_CHARS", "4000"))
+    )
+
+
+class PlannerWorker:
+    """
+    One claim loop: take a job, plan it under a heartbeat, store the result.
+
+    Args:
+        jobs: Queue to claim from
+        store: Workflow store the blueprints are saved to
+        planner: Planner shared by the loops of this process
+        worker_id: Lease owner id, unique per loop
+        poll_seconds: Sleep between claims while the queue is empty
+    """
+
+    def __init__(self, jobs: JobQueue, store: WorkflowStore, planner: WorkflowPlanner, worker_id: str, poll_seconds: float = 0.5):
+        self.jobs = jobs
+        self.store = store
+        self.planner = planner
+        self.worker_id = worker_id
+        self.poll_seconds = poll_seconds
+        self.plan_timeout = float(os.getenv("PLAN_TIMEOUT", "180"))
+        self.stage_timeout = float(os.getenv("PLAN_STAGE_TIMEOUT", "120"))
+        self.shutdown_grace = float(os.getenv("JOB_SHUTDOWN_GRACE", "10"))
+
+    def run(self, stop: threading.Event) -> None:
+        """
+        Claim and process jobs until `stop` is set. The current job is
+        finished first if it takes at most shutdown_grace seconds more,
+        otherwise it is released back to the queue.
+        """
+        while not stop.is_set():
+            try:
+                job = self.jobs.claim(self.worker_id)
+            except Exception:
+                logger.exception("Claiming a job failed", extra={"fields": {"worker_id": self.worker_id}})
+                job = None
+            if job is None:
+                stop.wait(self.poll_seconds)
+                continue
+            # Log under the id of the request that enqueued the job
+            with request_scope(job.payload.get("request_id") or job.job_id):
+                self.process(job, stop)
+
+    def process(self, job: Job, stop: Optional[threading.Event] = None) -> None:
+        payload = job.payload
+        cancel = self._cancel_token(payload.get("timeout"))
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job, cancel, done, stop), name=f"{self.worker_id}-heartbeat", daemon=True
+        )
+        heartbeat.start()
+        started = time.perf_counter()
+        try:
+            blueprint = self.planner.plan_workflow(
+                payload["goal"], payload.get("context") or {}, mode=payload.get("mode"), cancel=cancel
+            )
+            # Persist before completing so the result is readable from every API process
+            self.store.save(blueprint, reusable=self.planner.index_plan(blueprint))
+            self.store.flush()
+            if self.jobs.complete(job.job_id, self.worker_id, blueprint.workflow_id):
+                logger.info("Job succeeded", extra={"fields": {
+                    "job_id": job.job_id, "workflow_id": blueprint.workflow_id, "attempt": job.attempts,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                }})
+        except PlanCancelled as e:
+            if e.reason == WORKER_STOPPING:
+                released = self.jobs.release(job.job_id, self.worker_id)
+                logger.warning("Job released on shutdown", extra={"fields": {"job_id": job.job_id, "released": released}})
+                return
+            if e.reason != JOB_CANCELLED:
+                # Out of time: another attempt would hit the same deadline
+                self.jobs.fail(job.job_id, self.worker_id, str(e), retry=False)
+            logger.warning("Job cancelled", extra={"fields": {"job_id": job.job_id, "reason": e.reason}})
+        except ValueError as e:
+            self.jobs.fail(job.job_id, self.worker_id, str(e), retry=False)
+            logger.warning("Job rejected", extra={"fields": {"job_id": job.job_id, "error": str(e)}})
+        except Exception as e:
+            self.jobs.fail(job.job_id, self.worker_id, f"{type(e).__name__}: {e}")
+            logger.exception("Job attempt failed", extra={"fields": {"job_id": job.job_id, "attempt": job.attempts}})
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def _cancel_token(self, timeout: Optional[float]) -> CancelToken:
+        """Token with the job's deadline (never beyond PLAN_TIMEOUT), counted from the claim"""
+        limit = self.plan_timeout or None
+        if timeout and timeout > 0:
+            limit = min(timeout, limit) if limit else timeout
+        return CancelToken(timeout=limit, stage_timeout=self.stage_timeout)
+
+    def _heartbeat(self, job: Job, cancel: CancelToken, done: threading.Event, stop: Optional[threading.Event]) -> None:
+        """
+        Renew the lease every third of its length; cancel the run once it is
+        lost, or once the worker has been stopping for shutdown_grace seconds
+        """
+        interval = max(0.1, self.jobs.lease_seconds / 3)
+        renew_at = time.monotonic() + interval
+        stopping_since = None
+        while not done.wait(HEARTBEAT_POLL_SECONDS):
+            now = time.monotonic()
+            if stop is not None and stop.is_set():
+                stopping_since = stopping_since or now
+                if now - stopping_since >= self.shutdown_grace:
+                    cancel.cancel(WORKER_STOPPING)
+                    return
+            if now < renew_at:
+                continue
+            renew_at = now + interval
+            try:
+                held = self.jobs.heartbeat(job.job_id, self.worker_id)
+            except Exception as e:
+                # A transient database error; the lease still has time left
+                logger.warning("Heartbeat failed", extra={"fields": {"job_id": job.job_id, "error": str(e)}})
+                continue
+            if not held:
+                cancel.cancel(JOB_CANCELLED)
+                return
+
+
+def run_process(index: int, threads: int) -> None:
+    """Entry point of one planner process: `threads` claim loops sharing one planner"""
+    load_dotenv()
+    # One prebuilt crew per claim loop
+    os.environ.setdefault("PLANNER_CREW_POOL_SIZE", str(threads))
+    log_pipeline = _configure_logging()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    jobs = _job_queue()
+    store = WorkflowStore(path=os.getenv("WORKFLOW_DB_PATH", "workflows.db"), hot_size=0)
+    planner = WorkflowPlanner()
+
+    def stored_blueprint(workflow_id: str):
+        stored = store.get(workflow_id)
+        return stored.blueprint() if stored is not None else None
+
+    planner.blueprint_lookup = stored_blueprint
+    # Plans stored by the API and the other planner processes
+    planner.load_similarity(store.reusable_goals(planner.similarity.max_entries))
+    if os.getenv("MOCK_MODE", "false").lower() != "true":
+        planner.warm_up()
+
+    poll_seconds = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+    prefix = f"planner-{index}-{uuid.uuid4().hex[:8]}"
+    loops = [
+        threading.Thread(
+            target=PlannerWorker(jobs, store, planner, f"{prefix}-{n}", poll_seconds).run,
+            args=(stop,),
+            name=f"{prefix}-{n}"
+        )
+        for n in range(threads)
+    ]
+    for loop in loops:
+        loop.start()
+    logger.info("Planner process started", extra={"fields": {"process": index, "threads": threads, "pid": os.getpid()}})
+    for loop in loops:
+        loop.join()
+    store.close()
+    logger.info("Planner process stopped", extra={"fields": {"process": index}})
+    log_pipeline.stop()
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=int(os.getenv("PLANNER_PROCESSES", "2")))
+    parser.add_argument("--threads", type=int, default=int(os.getenv("PLANNER_PROCESS_THREADS", "1")),
+                        help="concurrent jobs per process")
+    args = parser.parse_args()
+    log_pipeline = _configure_logging()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    context = multiprocessing.get_context("spawn")
+    jobs = _job_queue()
+    retention = float(os.getenv("JOB_RETENTION", "86400"))
+
+    def spawn(index: int) -> multiprocessing.Process:
+        process = context.Process(target=run_process, args=(index, max(1, args.threads)), name=f"planner-{index}")
+        process.start()
+        return process
+
+    processes: List[multiprocessing.Process] = [spawn(i) for i in range(max(1, args.processes))]
+    last_prune = 0.0
+    while not stop.wait(1.0):
+        for index, process in enumerate(processes):
+            if not process.is_alive():
+                logger.warning("Planner process exited, restarting", extra={"fields": {
+                    "process": index, "exitcode": process.exitcode
+                }})
+                processes[index] = spawn(index)
+        if time.monotonic() - last_prune > 60:
+            last_prune = time.monotonic()
+            try:
+                jobs.prune(retention)
+            except Exception as e:
+                logger.warning("Pruning finished jobs failed", extra={"fields": {"error": str(e)}})
+
+    # Processes finish their current jobs within JOB_SHUTDOWN_GRACE, then release them
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join()
+    log_pipeline.stop()
+
+
+if __name__ == "__main__":
+    main()
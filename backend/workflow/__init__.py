@@ -0,0 +1 @@
+"""Workflow graph utilities: layout, graph construction, patches and execution for blueprints"""
@@ -0,0 +1,107 @@
+"""
+Tool Adapters
+Pluggable step implementations for the workflow executor, looked up by
+`WorkflowStep.tool`, then `action_type`, then a default. Includes local stub
+adapters for tests and benchmarks.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Optional
+
+from schemas.workflow import WorkflowStep
+
+
+class NoAdapterError(LookupError):
+    """Raised when no adapter is registered for a step's tool or action type"""
+
+
+class ToolAdapter(ABC):
+    """
+    Runs one workflow step.
+
+    `run` is an async generator: each yielded chunk is passed on to the
+    step's successors as soon as it is produced, so large results flow
+    through the workflow without being collected first. `inputs` gives the
+    streamed output of each predecessor (see workflow.executor.StepInputs).
+    """
+
+    @abstractmethod
+    def run(self, step: WorkflowStep, inputs: Any) -> AsyncIterator[Any]:
+        """Implemented as `async def run(...)` with `yield`"""
+
+
+class AdapterRegistry:
+    """Adapters keyed on tool name and action type, with an optional default"""
+
+    def __init__(self, default: Optional[ToolAdapter] = None):
+        self.default = default
+        self._by_tool: Dict[str, ToolAdapter] = {}
+        self._by_action: Dict[str, ToolAdapter] = {}
+
+    def register(
+        self,
+        adapter: ToolAdapter,
+        tool: Optional[str] = None,
+        action_type: Optional[str] = None
+    ) -> "AdapterRegistry":
+        """Register an adapter for a tool and/or an action type"""
+        if tool is None and action_type is None:
+            raise ValueError("Register an adapter for a tool, an action type or both")
+        if tool is not None:
+            self._by_tool[tool.lower()] = adapter
+        if action_type is not None:
+            self._by_action[action_type.lower()] = adapter
+        return self
+
+    def resolve(self, step: WorkflowStep) -> ToolAdapter:
+        """Adapter for a step: exact tool first, then action type, then the default"""
+        adapter = self._by_tool.get(step.tool.lower()) or self._by_action.get(step.action_type.lower())
+        if adapter is None:
+            adapter = self.default
+        if adapter is None:
+            raise NoAdapterError(f"No adapter for tool '{step.tool}' / action type '{step.action_type}'")
+        return adapter
+
+
+class StubAdapter(ToolAdapter):
+    """
+    Local stand-in for a real integration: drains its inputs, waits
+    `latency` seconds, then yields `chunks` small records. Fails the first
+    `fail_times` attempts of each step to exercise retries.
+    """
+
+    def __init__(self, latency: float = 0.0, chunks: int = 1, chunk_latency: float = 0.0, fail_times: int = 0):
+        self.latency = latency
+        self.chunks = chunks
+        self.chunk_latency = chunk_latency
+        self.fail_times = fail_times
+        self._attempts: Dict[str, int] = {}
+
+    async def run(self, step: WorkflowStep, inputs: Any) -> AsyncIterator[Any]:
+        received = 0
+        async for _, _chunk in inputs.merged():
+            received += 1
+        attempt = self._attempts.get(step.id, 0) + 1
+        self._attempts[step.id] = attempt
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if attempt <= self.fail_times:
+            raise RuntimeError(f"Stub failure {attempt}/{self.fail_times} for step '{step.id}'")
+        for index in range(self.chunks):
+            if self.chunk_latency:
+                await asyncio.sleep(self.chunk_latency)
+            yield {"step": step.id, "tool": step.tool, "index": index, "inputs": received}
+
+
+class EchoAdapter(ToolAdapter):
+    """Passes every input chunk through, tagged with its source, then the step's parameters"""
+
+    async def run(self, step: WorkflowStep, inputs: Any) -> AsyncIterator[Any]:
+        async for source_id, chunk in inputs.merged():
+            yield {"from": source_id, "data": chunk}
+        yield {"step": step.id, "parameters": step.parameters}
+
+
+def stub_registry(latency: float = 0.0, chunks: int = 1) -> AdapterRegistry:
+    """Registry that runs every step with a StubAdapter"""
+    return AdapterRegistry(default=StubAdapter(latency=latency, chunks=chunks))
@@ -0,0 +1,495 @@
+"""
+Workflow Executor
+Runs a blueprint's steps as an asyncio DAG: independent branches run
+concurrently under per-tool concurrency limits, each step's output chunks
+are streamed to its successors as they are produced, and steps get
+timeouts, retries and optional checkpointing so an interrupted run can
+resume without redoing finished steps.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+from schemas.workflow import WorkflowBlueprint, WorkflowStep
+from workflow.adapters import AdapterRegistry
+from workflow.graph import WorkflowGraph
+
+
+logger = logging.getLogger(__name__)
+
+
+# Callback receiving (event_name, payload) as steps start and finish
+ExecutionEventCallback = Callable[[str, Dict[str, Any]], None]
+
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+RESTORED = "restored"
+
+
+class UpstreamFailed(Exception):
+    """Raised into a step reading from a predecessor that failed or was skipped"""
+
+
+class _End:
+    """End-of-stream marker; carries the producer's error if it did not succeed"""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: Optional[str] = None):
+        self.error = error
+
+
+class _Reader:
+    """
+    One consumer's view of a predecessor's output stream.
+
+    Chunks are kept for replay only while the consuming step can still be
+    retried (until it emits its first chunk); after that each chunk is
+    dropped as soon as it has been read.
+    """
+
+    def __init__(self, source_id: str, record: bool):
+        self.source_id = source_id
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        self._history: Optional[List[Any]] = [] if record else None
+        self._cursor = 0
+        self._end: Optional[_End] = None
+
+    def rewind(self) -> None:
+        self._cursor = 0
+
+    def stop_recording(self) -> None:
+        self._history = None
+
+    def __aiter__(self) -> "_Reader":
+        return self
+
+    async def __anext__(self) -> Any:
+        if self._history is not None and self._cursor < len(self._history):
+            self._cursor += 1
+            return self._history[self._cursor - 1]
+        if self._end is None:
+            item = await self.queue.get()
+            if not isinstance(item, _End):
+                if self._history is not None:
+                    self._history.append(item)
+                    self._cursor += 1
+                return item
+            self._end = item
+        if self._end.error is not None:
+            raise UpstreamFailed(f"Step '{self.source_id}' did not complete: {self._end.error}")
+        raise StopAsyncIteration
+
+
+class StepInputs:
+    """Streamed outputs of a step's predecessors, keyed by predecessor id"""
+
+    def __init__(self, readers: Dict[str, _Reader]):
+        self._readers = readers
+        self._pumps: List[asyncio.Task] = []
+
+    @property
+    def ids(self) -> List[str]:
+        return list(self._readers)
+
+    def __getitem__(self, source_id: str) -> AsyncIterator[Any]:
+        return self._readers[source_id]
+
+    def __len__(self) -> int:
+        return len(self._readers)
+
+    async def collect(self, source_id: str) -> List[Any]:
+        """Read one predecessor's whole output (buffers it; prefer iterating)"""
+        return [chunk async for chunk in self._readers[source_id]]
+
+    async def merged(self) -> AsyncIterator[Tuple[str, Any]]:
+        """(source_id, chunk) from all predecessors, in arrival order"""
+        if len(self._readers) == 1:
+            source_id, reader = next(iter(self._readers.items()))
+            async for chunk in reader:
+                yield source_id, chunk
+            return
+        queue: "asyncio.Queue[Any]" = asyncio.Queue()
+
+        async def pump(source_id: str, reader: _Reader) -> None:
+            try:
+                async for chunk in reader:
+                    await queue.put((source_id, chunk))
+                await queue.put(None)
+            except BaseException as e:
+                await queue.put(e)
+
+        tasks = [asyncio.create_task(pump(source_id, reader)) for source_id, reader in self._readers.items()]
+        self._pumps.extend(tasks)
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await queue.get()
+                if item is None:
+                    remaining -= 1
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _rewind(self) -> None:
+        # Stop readers left running by an abandoned merged(); what they read stays in the history
+        for task in self._pumps:
+            task.cancel()
+        self._pumps.clear()
+        for reader in self._readers.values():
+            reader.rewind()
+
+    def _stop_recording(self) -> None:
+        for reader in self._readers.values():
+            reader.stop_recording()
+
+
+class StepResult:
+    """Outcome of one step in a run"""
+
+    __slots__ = ("step_id", "status", "attempts", "chunks", "seconds", "error")
+
+    def __init__(self, step_id: str, status: str, attempts: int = 0, chunks: int = 0,
+                 seconds: float = 0.0, error: Optional[str] = None):
+        self.step_id = step_id
+        self.status = status
+        self.attempts = attempts
+        self.chunks = chunks
+        self.seconds = seconds
+        self.error = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ExecutionResult:
+    """Outcome of a whole run"""
+
+    def __init__(self, run_id: str, steps: Dict[str, StepResult], seconds: float):
+        self.run_id = run_id
+        self.steps = steps
+        self.seconds = seconds
+
+    @property
+    def succeeded(self) -> bool:
+        return all(result.status in (SUCCEEDED, RESTORED) for result in self.steps.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "succeeded": self.succeeded,
+            "seconds": self.seconds,
+            "steps": [result.to_dict() for result in self.steps.values()],
+        }
+
+
+class MemoryCheckpointStore:
+    """Checkpoints kept in process memory (tests, single-process resumes)"""
+
+    def __init__(self):
+        self._runs: Dict[str, Dict[str, List[Any]]] = {}
+
+    async def load(self, run_id: str) -> Dict[str, List[Any]]:
+        return dict(self._runs.get(run_id, {}))
+
+    async def save(self, run_id: str, step_id: str, chunks: List[Any]) -> None:
+        self._runs.setdefault(run_id, {})[step_id] = list(chunks)
+
+    async def clear(self, run_id: str) -> None:
+        self._runs.pop(run_id, None)
+
+
+class SQLiteCheckpointStore:
+    """Completed step outputs in SQLite, keyed by (run_id, step_id); chunks must be JSON-serializable"""
+
+    def __init__(self, path: str = "checkpoints.db"):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "run_id TEXT NOT NULL, step_id TEXT NOT NULL, output TEXT NOT NULL, saved_at REAL NOT NULL, "
+            "PRIMARY KEY (run_id, step_id))"
+        )
+        conn.commit()
+
+    async def load(self, run_id: str) -> Dict[str, List[Any]]:
+        return await asyncio.to_thread(self._load, run_id)
+
+    async def save(self, run_id: str, step_id: str, chunks: List[Any]) -> None:
+        await asyncio.to_thread(self._save, run_id, step_id, json.dumps(chunks, default=str))
+
+    async def clear(self, run_id: str) -> None:
+        await asyncio.to_thread(self._clear, run_id)
+
+    def _load(self, run_id: str) -> Dict[str, List[Any]]:
+        rows = self._connection().execute(
+            "SELECT step_id, output FROM checkpoints WHERE run_id = ?", (run_id,)
+        ).fetchall()
+        return {step_id: json.loads(output) for step_id, output in rows}
+
+    def _save(self, run_id: str, step_id: str, output: str) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO checkpoints (run_id, step_id, output, saved_at) VALUES (?, ?, ?, ?)",
+            (run_id, step_id, output, time.time())
+        )
+        conn.commit()
+
+    def _clear(self, run_id: str) -> None:
+        conn = self._connection()
+        conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+
+class WorkflowExecutor:
+    """
+    Asyncio DAG runner for workflow blueprints.
+
+    A step starts as soon as every predecessor has started producing output,
+    so chains run as pipelines and independent branches run side by side;
+    `tool_limits` (per tool, else `default_tool_limit`) caps how many steps
+    of one tool run at once. Edge buffers are not bounded: a producer never
+    waits on a consumer, which keeps tool limits from deadlocking a chain of
+    same-tool steps.
+
+    A failed attempt is retried (up to `max_retries`, with exponential
+    backoff) only while the step has not emitted output yet, replaying the
+    inputs it had read. A step whose predecessor fails is skipped, as are
+    its descendants. With a checkpoint store, each succeeded step's output
+    is saved and replayed instead of re-run when the same run_id resumes.
+    """
+
+    def __init__(
+        self,
+        adapters: AdapterRegistry,
+        tool_limits: Optional[Dict[str, int]] = None,
+        default_tool_limit: int = 8,
+        step_timeout: Optional[float] = 60.0,
+        max_retries: int = 2,
+        retry_backoff: float = 0.5,
+        checkpoints: Optional[Union[MemoryCheckpointStore, SQLiteCheckpointStore]] = None
+    ):
+        self.adapters = adapters
+        self.tool_limits = {tool.lower(): limit for tool, limit in (tool_limits or {}).items()}
+        self.default_tool_limit = default_tool_limit
+        self.step_timeout = step_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.checkpoints = checkpoints
+
+    async def run(
+        self,
+        workflow: Union[WorkflowBlueprint, List[WorkflowStep]],
+        run_id: Optional[str] = None,
+        on_event: Optional[ExecutionEventCallback] = None
+    ) -> ExecutionResult:
+        """
+        Execute a blueprint (or list of steps) to completion.
+
+        Raises:
+            WorkflowGraphError: if the steps do not form a valid DAG
+        """
+        steps = workflow.steps if isinstance(workflow, WorkflowBlueprint) else workflow
+        graph = WorkflowGraph(steps).validate()
+        return await _Run(self, graph, run_id or str(uuid.uuid4()), on_event).execute()
+
+    def _semaphore(self, semaphores: Dict[str, asyncio.Semaphore], tool: str) -> asyncio.Semaphore:
+        tool = tool.lower()
+        semaphore = semaphores.get(tool)
+        if semaphore is None:
+            limit = self.tool_limits.get(tool, self.default_tool_limit)
+            semaphore = semaphores[tool] = asyncio.Semaphore(max(1, limit))
+        return semaphore
+
+
+class _Run:
+    """State of one execution"""
+
+    def __init__(self, executor: WorkflowExecutor, graph: WorkflowGraph, run_id: str,
+                 on_event: Optional[ExecutionEventCallback]):
+        self.executor = executor
+        self.graph = graph
+        self.run_id = run_id
+        self.on_event = on_event
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.started = [asyncio.Event() for _ in graph.steps]
+        self.finished = [asyncio.Event() for _ in graph.steps]
+        self.results: List[Optional[StepResult]] = [None] * len(graph.steps)
+        record = executor.max_retries > 0
+        # readers[target][source_id] is the target's view of that predecessor's output
+        self.readers: List[Dict[str, _Reader]] = [
+            {graph.steps[source].id: _Reader(graph.steps[source].id, record) for source in preds}
+            for preds in graph.predecessors
+        ]
+
+    async def execute(self) -> ExecutionResult:
+        started = time.perf_counter()
+        restored = await self.executor.checkpoints.load(self.run_id) if self.executor.checkpoints else {}
+        await asyncio.gather(*(self._run_step(position, restored) for position in range(len(self.graph.steps))))
+        result = ExecutionResult(
+            self.run_id,
+            {step.id: self.results[position] for position, step in enumerate(self.graph.steps)},
+            time.perf_counter() - started
+        )
+        self._emit("run_completed", {"run_id": self.run_id, "succeeded": result.succeeded, "seconds": result.seconds})
+        return result
+
+    def _outputs(self, position: int) -> List[_Reader]:
+        step_id = self.graph.steps[position].id
+        return [self.readers[target][step_id] for target in self.graph.successors[position]]
+
+    def _publish(self, position: int, chunk: Any) -> None:
+        for reader in self._outputs(position):
+            reader.queue.put_nowait(chunk)
+
+    def _finish(self, position: int, result: StepResult) -> None:
+        error = None if result.status in (SUCCEEDED, RESTORED) else (result.error or result.status)
+        for reader in self._outputs(position):
+            reader.queue.put_nowait(_End(error))
+        self.results[position] = result
+        self.started[position].set()
+        self.finished[position].set()
+        event = "step_completed" if result.status in (SUCCEEDED, RESTORED) else f"step_{result.status}"
+        self._emit(event, {"run_id": self.run_id, **result.to_dict()})
+
+    async def _run_step(self, position: int, restored: Dict[str, List[Any]]) -> None:
+        step = self.graph.steps[position]
+        predecessors = self.graph.predecessors[position]
+        for source in predecessors:
+            await self.started[source].wait()
+        failed_upstream = [
+            self.graph.steps[source].id for source in predecessors
+            if self.results[source] is not None and self.results[source].status not in (SUCCEEDED, RESTORED)
+        ]
+        if failed_upstream:
+            self._finish(position, StepResult(step.id, SKIPPED, error=f"Upstream step '{failed_upstream[0]}' did not complete"))
+            return
+
+        if step.id in restored:
+            self.started[position].set()
+            for chunk in restored[step.id]:
+                self._publish(position, chunk)
+            await self._await_predecessors(position)
+            self._finish(position, StepResult(step.id, RESTORED, chunks=len(restored[step.id])))
+            return
+
+        try:
+            adapter = self.executor.adapters.resolve(step)
+        except LookupError as e:
+            self._finish(position, StepResult(step.id, FAILED, error=str(e)))
+            return
+
+        async with self.executor._semaphore(self.semaphores, step.tool):
+            result = await self._attempt_loop(position, step, adapter)
+        if result.status == SUCCEEDED:
+            # Only claim success once every input has been fully produced
+            upstream_error = await self._await_predecessors(position)
+            if upstream_error:
+                result.status, result.error = SKIPPED, upstream_error
+        self._finish(position, result)
+
+    async def _attempt_loop(self, position: int, step: WorkflowStep, adapter: Any) -> StepResult:
+        executor = self.executor
+        inputs = StepInputs(self.readers[position])
+        checkpoint: Optional[List[Any]] = [] if executor.checkpoints else None
+        started = time.perf_counter()
+        emitted = 0
+        attempt = 0
+        self.started[position].set()
+        self._emit("step_started", {"run_id": self.run_id, "step_id": step.id, "tool": step.tool})
+
+        async def drain() -> None:
+            nonlocal emitted
+            async with contextlib.aclosing(adapter.run(step, inputs)) as chunks:
+                async for chunk in chunks:
+                    if not emitted:
+                        inputs._stop_recording()
+                    emitted += 1
+                    self._publish(position, chunk)
+                    if checkpoint is not None:
+                        checkpoint.append(chunk)
+
+        while True:
+            attempt += 1
+            try:
+                await self._run_attempt(position, drain)
+                break
+            except UpstreamFailed as e:
+                return StepResult(step.id, SKIPPED, attempt, emitted, time.perf_counter() - started, str(e))
+            except Exception as e:
+                error = "timed out" if isinstance(e, asyncio.TimeoutError) else f"{type(e).__name__}: {e}"
+                if emitted or attempt > executor.max_retries:
+                    return StepResult(step.id, FAILED, attempt, emitted, time.perf_counter() - started, error)
+                self._emit("step_retry", {"run_id": self.run_id, "step_id": step.id, "attempt": attempt, "error": error})
+                await asyncio.sleep(executor.retry_backoff * (2 ** (attempt - 1)))
+                inputs._rewind()
+
+        if checkpoint is not None:
+            await executor.checkpoints.save(self.run_id, step.id, checkpoint)
+        return StepResult(step.id, SUCCEEDED, attempt, emitted, time.perf_counter() - started)
+
+    async def _run_attempt(self, position: int, drain: Callable[[], Any]) -> None:
+        """
+        Run one attempt. The timeout starts once every predecessor has finished,
+        so time spent waiting on a slow upstream stream is not held against the step.
+        """
+        task = asyncio.create_task(drain())
+        try:
+            waits = [self.finished[source].wait() for source in self.graph.predecessors[position]]
+            if waits:
+                upstream = asyncio.ensure_future(asyncio.gather(*waits))
+                try:
+                    await asyncio.wait({task, upstream}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    upstream.cancel()
+                    # Retrieve the cancelled gather's outcome so it is not logged as unhandled
+                    upstream.add_done_callback(lambda f: f.cancelled() or f.exception())
+            done, _ = await asyncio.wait({task}, timeout=self.executor.step_timeout)
+            if not done:
+                raise asyncio.TimeoutError()
+            task.result()
+        finally:
+            if not task.done():
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+
+    async def _await_predecessors(self, position: int) -> Optional[str]:
+        """Wait for all predecessors to finish; the first upstream failure, if any"""
+        for source in self.graph.predecessors[position]:
+            await self.finished[source].wait()
+            result = self.results[source]
+            if result.status not in (SUCCEEDED, RESTORED):
+                return f"Upstream step '{result.step_id}' did not complete"
+        return None
+
+    def _emit(self, event: str, data: Dict[str, Any]) -> None:
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(event, data)
+        except Exception as e:
+            logger.warning("Execution listener failed", extra={"fields": {"event": event, "error": str(e)}})
@@ -0,0 +1,271 @@
+"""
+Workflow Graph
+Compact, index-based view of a workflow's steps: adjacency and reverse
+adjacency built once, validation, topological ordering, and conversion to
+React Flow nodes and edges.
+"""
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from schemas.workflow import WorkflowBlueprint, WorkflowStep
+from workflow.layout import LayeredLayout, Position
+
+
+class WorkflowGraphError(ValueError):
+    """Raised when a workflow's steps do not form a valid DAG"""
+
+    def __init__(self, problems: List[str]):
+        super().__init__("Invalid workflow: " + "; ".join(problems))
+        self.problems = problems
+
+
+class WorkflowGraph:
+    """
+    Steps indexed by position with integer adjacency lists.
+
+    Successors come from `next_step_id` plus `next_step_ids`, so a step can
+    branch. Duplicate step ids (later ones are ignored), references to
+    unknown steps and self references are recorded rather than raised, so
+    callers can choose between `validate()` and `sanitized_steps()`.
+    """
+
+    def __init__(self, steps: List[WorkflowStep]):
+        self.steps: List[WorkflowStep] = []
+        self.index: Dict[str, int] = {}
+        self.duplicate_ids: List[str] = []
+        self.dangling: List[Tuple[str, str]] = []
+
+        for step in steps:
+            if step.id in self.index:
+                self.duplicate_ids.append(step.id)
+                continue
+            self.index[step.id] = len(self.steps)
+            self.steps.append(step)
+
+        self.successors: List[List[int]] = [[] for _ in self.steps]
+        self.predecessors: List[List[int]] = [[] for _ in self.steps]
+        for position, step in enumerate(self.steps):
+            seen = set()
+            for target_id in successor_ids(step):
+                target = self.index.get(target_id)
+                if target is None or target == position:
+                    self.dangling.append((step.id, target_id))
+                    continue
+                if target in seen:
+                    continue
+                seen.add(target)
+                self.successors[position].append(target)
+                self.predecessors[target].append(position)
+
+        self._order: Optional[List[int]] = None
+        self._order_computed = False
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def topological_order(self) -> Optional[List[int]]:
+        """Step positions in dependency order (Kahn), or None if there is a cycle"""
+        if not self._order_computed:
+            indegree = [len(preds) for preds in self.predecessors]
+            ready = [position for position, degree in enumerate(indegree) if degree == 0]
+            ready.reverse()
+            order = []
+            while ready:
+                position = ready.pop()
+                order.append(position)
+                for target in reversed(self.successors[position]):
+                    indegree[target] -= 1
+                    if indegree[target] == 0:
+                        ready.append(target)
+            self._order = order if len(order) == len(self.steps) else None
+            self._order_computed = True
+        return self._order
+
+    def find_cycle(self) -> Optional[List[str]]:
+        """Step ids along one cycle (first id repeated at the end), or None"""
+        if self.topological_order() is not None:
+            return None
+        state = [0] * len(self.steps)  # 0 = unvisited, 1 = on stack, 2 = done
+        for root in range(len(self.steps)):
+            if state[root]:
+                continue
+            path = [root]
+            iterators = [iter(self.successors[root])]
+            state[root] = 1
+            while path:
+                child = next(iterators[-1], None)
+                if child is None:
+                    state[path.pop()] = 2
+                    iterators.pop()
+                elif state[child] == 1:
+                    cycle = path[path.index(child):] + [child]
+                    return [self.steps[position].id for position in cycle]
+                elif state[child] == 0:
+                    state[child] = 1
+                    path.append(child)
+                    iterators.append(iter(self.successors[child]))
+        return None
+
+    def sources(self) -> List[int]:
+        """Positions of steps with no predecessors (triggers)"""
+        return [position for position, preds in enumerate(self.predecessors) if not preds]
+
+    def sinks(self) -> List[int]:
+        """Positions of steps with no successors"""
+        return [position for position, succs in enumerate(self.successors) if not succs]
+
+    def problems(self) -> List[str]:
+        """Human-readable validation problems (empty when the graph is valid)"""
+        problems = []
+        if not self.steps:
+            problems.append("workflow has no steps")
+        for step_id in self.duplicate_ids:
+            problems.append(f"duplicate step id '{step_id}'")
+        for source_id, target_id in self.dangling:
+            if source_id == target_id:
+                problems.append(f"step '{source_id}' points to itself")
+            else:
+                problems.append(f"step '{source_id}' points to unknown step '{target_id}'")
+        cycle = self.find_cycle()
+        if cycle:
+            problems.append("cycle " + " -> ".join(cycle))
+        return problems
+
+    def validate(self) -> "WorkflowGraph":
+        """Raise WorkflowGraphError unless the steps form a valid DAG"""
+        problems = self.problems()
+        if problems:
+            raise WorkflowGraphError(problems)
+        return self
+
+    def sanitized_steps(self) -> List[WorkflowStep]:
+        """
+        Copies of the unique steps with successor references limited to known
+        steps. Cycles are left in place; use validate() to reject them.
+        """
+        steps = []
+        for position, step in enumerate(self.steps):
+            targets = [self.steps[target].id for target in self.successors[position]]
+            steps.append(step.model_copy(update={
+                "next_step_id": targets[0] if targets else None,
+                "next_step_ids": targets[1:] or None
+            }))
+        return steps
+
+    def edge_pairs(self) -> List[Tuple[str, str]]:
+        """(source_id, target_id) for every edge"""
+        return [
+            (step.id, self.steps[target].id)
+            for position, step in enumerate(self.steps)
+            for target in self.successors[position]
+        ]
+
+    def to_react_flow(
+        self,
+        layout: Optional[LayeredLayout] = None,
+        positions: Optional[Dict[str, Position]] = None
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        React Flow nodes and edges. Sources are "input" nodes and sinks
+        "output" nodes; positions come from the layered layout unless given.
+        """
+        pairs = self.edge_pairs()
+        edges = [
+            {
+                "id": f"edge-{source_id}-{target_id}",
+                "source": source_id,
+                "target": target_id,
+                "type": "smoothstep"
+            }
+            for source_id, target_id in pairs
+        ]
+        if positions is None:
+            positions = (layout or LayeredLayout()).layout([step.id for step in self.steps], pairs)
+
+        nodes = []
+        for position, step in enumerate(self.steps):
+            if not self.successors[position]:
+                node_type = "output"
+            elif not self.predecessors[position]:
+                node_type = "input"
+            else:
+                node_type = "default"
+            nodes.append({
+                "id": step.id,
+                "type": node_type,
+                "position": positions[step.id],
+                "data": {
+                    "label": step.name,
+                    "description": step.description,
+                    "tool": step.tool,
+                    "action_type": step.action_type
+                }
+            })
+        return nodes, edges
+
+
+def successor_ids(step: WorkflowStep) -> List[str]:
+    """All successor ids of a step, `next_step_id` first"""
+    ids = [step.next_step_id] if step.next_step_id else []
+    if step.next_step_ids:
+        ids.extend(step.next_step_ids)
+    return ids
+
+
+def blueprint_from_steps(
+    goal: str,
+    steps: List[WorkflowStep],
+    workflow_id: Optional[str] = None,
+    graph: Optional[WorkflowGraph] = None
+) -> WorkflowBlueprint:
+    """Build a WorkflowBlueprint (steps, React Flow nodes and edges) from steps"""
+    graph = graph or WorkflowGraph(steps)
+    nodes, edges = graph.to_react_flow()
+    return WorkflowBlueprint(
+        workflow_id=workflow_id or str(uuid.uuid4()),
+        goal=goal,
+        steps=graph.steps,
+        edges=edges,
+        nodes=nodes
+    )
+
+
+def edited_blueprint(
+    base: WorkflowBlueprint,
+    graph: WorkflowGraph,
+    layout: Optional[LayeredLayout] = None
+) -> WorkflowBlueprint:
+    """
+    Blueprint for an edited version of `base`, keeping its workflow id and
+    goal. The base graph is laid out and the difference applied with
+    LayeredLayout.update, so only the layers the edit touches are laid out
+    again; every node the edit did not move keeps its stored position.
+    """
+    layout = layout or LayeredLayout()
+    base_ids = [step.id for step in base.steps]
+    base_pairs = WorkflowGraph(base.steps).edge_pairs()
+    before = layout.layout(base_ids, base_pairs)
+
+    new_ids = [step.id for step in graph.steps]
+    new_pairs = graph.edge_pairs()
+    kept_ids, base_edges, new_edges = set(new_ids), set(base_pairs), set(new_pairs)
+    after = layout.update(
+        add_nodes=[node_id for node_id in new_ids if node_id not in before],
+        remove_nodes=[node_id for node_id in base_ids if node_id not in kept_ids],
+        add_edges=[pair for pair in new_pairs if pair not in base_edges],
+        remove_edges=[pair for pair in base_pairs if pair not in new_edges]
+    )
+
+    stored = {node["id"]: node.get("position") for node in base.nodes}
+    positions = {
+        node_id: stored[node_id] if stored.get(node_id) and before.get(node_id) == position else position
+        for node_id, position in after.items()
+    }
+    nodes, edges = graph.to_react_flow(positions=positions)
+    return WorkflowBlueprint(
+        workflow_id=base.workflow_id,
+        goal=base.goal,
+        steps=graph.steps,
+        edges=edges,
+        nodes=nodes
+    )
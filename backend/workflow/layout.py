@@ -0,0 +1,338 @@
+"""
+Workflow Layout
+Layered (Sugiyama-style) layout for blueprint graphs: cycle breaking,
+longest-path layering, barycenter crossing minimization and coordinate
+assignment, with incremental updates after small edits.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+Edge = Tuple[str, str]
+Position = Dict[str, float]
+
+
+class LayeredLayout:
+    """
+    Left-to-right layered layout.
+
+    Layers are columns (x grows with depth) and nodes within a layer are
+    stacked vertically around `origin_y`, so a straight chain lands on the
+    same coordinates the planner has always used (x = i * 300 + 100, y = 150).
+
+    Each pass is linear in the graph size apart from the per-layer sorts.
+    Long edges are not split into dummy nodes; barycenters compare relative
+    positions across layers instead, which keeps incremental updates cheap.
+    """
+
+    def __init__(
+        self,
+        layer_spacing: float = 300.0,
+        node_spacing: float = 150.0,
+        origin_x: float = 100.0,
+        origin_y: float = 150.0,
+        sweeps: int = 4
+    ):
+        self.layer_spacing = layer_spacing
+        self.node_spacing = node_spacing
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.sweeps = sweeps
+        self._reset()
+
+    def _reset(self) -> None:
+        self._insertion: Dict[str, int] = {}
+        self._edges: Set[Edge] = set()
+        self._reversed: Set[Edge] = set()
+        self._succ: Dict[str, Set[str]] = {}
+        self._pred: Dict[str, Set[str]] = {}
+        self.layer: Dict[str, int] = {}
+        self.layers: List[List[str]] = []
+        self._index: Dict[str, int] = {}
+
+    # Full layout
+
+    def layout(self, node_ids: Iterable[str], edges: Iterable[Edge]) -> Dict[str, Position]:
+        """
+        Lay out a whole graph from scratch.
+
+        Args:
+            node_ids: Node ids; their order is the tie-breaker within a layer
+            edges: (source, target) pairs; self loops and unknown ids are ignored
+
+        Returns:
+            {node_id: {"x": ..., "y": ...}}
+        """
+        self._reset()
+        for node_id in node_ids:
+            self._add_node(node_id)
+        for source, target in edges:
+            if source in self._insertion and target in self._insertion and source != target:
+                self._edges.add((source, target))
+
+        self._break_cycles()
+        for source, target in self._edges:
+            self._link(*self._effective(source, target))
+
+        self._assign_layers(list(self._insertion))
+        self.layers = []
+        for node_id in sorted(self._insertion, key=self._insertion.get):
+            self._place(node_id, self.layer[node_id])
+        self._reindex(range(len(self.layers)))
+        self._minimize_crossings(range(len(self.layers)), self.sweeps)
+        return self.positions()
+
+    def positions(self) -> Dict[str, Position]:
+        """Coordinates for every node from the current layering and order"""
+        positions = {}
+        for depth, members in enumerate(self.layers):
+            x = self.origin_x + depth * self.layer_spacing
+            middle = (len(members) - 1) / 2
+            for index, node_id in enumerate(members):
+                positions[node_id] = {"x": x, "y": self.origin_y + (index - middle) * self.node_spacing}
+        return positions
+
+    # Incremental updates
+
+    def update(
+        self,
+        add_nodes: Iterable[str] = (),
+        remove_nodes: Iterable[str] = (),
+        add_edges: Iterable[Edge] = (),
+        remove_edges: Iterable[Edge] = ()
+    ) -> Dict[str, Position]:
+        """
+        Apply a small edit and re-lay out only what it affects.
+
+        Only descendants of the edit are re-layered, and crossing
+        minimization only runs on the layers they touch; the order of every
+        other layer is kept so the rest of the canvas does not jump.
+        """
+        seeds: Set[str] = set()
+        touched_layers: Set[int] = set()
+
+        for node_id in remove_nodes:
+            if node_id not in self._insertion:
+                continue
+            for other in self._succ[node_id] | self._pred[node_id]:
+                for edge in ((node_id, other), (other, node_id)):
+                    if edge in self._edges:
+                        seeds.update(self._remove_edge(edge))
+            touched_layers.add(self.layer[node_id])
+            self.layers[self.layer[node_id]].remove(node_id)
+            del self._insertion[node_id], self._succ[node_id], self._pred[node_id], self.layer[node_id]
+            seeds.discard(node_id)
+
+        for edge in remove_edges:
+            if edge in self._edges:
+                seeds.update(self._remove_edge(edge))
+
+        for node_id in add_nodes:
+            if node_id not in self._insertion:
+                self._add_node(node_id)
+                seeds.add(node_id)
+
+        for source, target in add_edges:
+            if (
+                source == target
+                or (source, target) in self._edges
+                or source not in self._insertion
+                or target not in self._insertion
+            ):
+                continue
+            self._edges.add((source, target))
+            # Reverse edges that would close a cycle
+            if self._reaches(target, source):
+                self._reversed.add((source, target))
+            effective = self._effective(source, target)
+            self._link(*effective)
+            seeds.add(effective[1])
+
+        old_layers = {node_id: self.layer.get(node_id) for node_id in self._descendants(seeds)}
+        self._assign_layers(list(old_layers))
+
+        for node_id, old in old_layers.items():
+            new = self.layer[node_id]
+            if old == new:
+                continue
+            if old is not None:
+                self.layers[old].remove(node_id)
+                touched_layers.add(old)
+            self._place(node_id, new)
+            touched_layers.add(new)
+
+        while self.layers and not self.layers[-1]:
+            self.layers.pop()
+        touched = sorted(depth for depth in touched_layers if depth < len(self.layers))
+        self._reindex(touched)
+        self._minimize_crossings(touched, max(1, self.sweeps // 2))
+        return self.positions()
+
+    # Graph bookkeeping
+
+    def _add_node(self, node_id: str) -> None:
+        if node_id in self._insertion:
+            return
+        self._insertion[node_id] = len(self._insertion)
+        self._succ[node_id] = set()
+        self._pred[node_id] = set()
+
+    def _effective(self, source: str, target: str) -> Edge:
+        """The DAG direction of an original edge"""
+        return (target, source) if (source, target) in self._reversed else (source, target)
+
+    def _link(self, source: str, target: str) -> None:
+        self._succ[source].add(target)
+        self._pred[target].add(source)
+
+    def _remove_edge(self, edge: Edge) -> List[str]:
+        """Remove an original edge; returns the nodes whose layer may change"""
+        source, target = self._effective(*edge)
+        self._edges.discard(edge)
+        self._reversed.discard(edge)
+        # An edge and its reverse can both exist in the input; keep the link if so
+        still_linked = any(
+            self._effective(*other) == (source, target)
+            for other in ((source, target), (target, source))
+            if other in self._edges
+        )
+        if not still_linked:
+            self._succ[source].discard(target)
+            self._pred[target].discard(source)
+        return [target]
+
+    def _reaches(self, start: str, goal: str) -> bool:
+        """Whether `goal` is reachable from `start` in the DAG"""
+        stack = [start]
+        seen = {start}
+        while stack:
+            node_id = stack.pop()
+            if node_id == goal:
+                return True
+            for next_id in self._succ[node_id]:
+                if next_id not in seen:
+                    seen.add(next_id)
+                    stack.append(next_id)
+        return False
+
+    def _descendants(self, seeds: Iterable[str]) -> List[str]:
+        """Seeds plus everything reachable from them"""
+        result = [node_id for node_id in seeds if node_id in self._insertion]
+        seen = set(result)
+        i = 0
+        while i < len(result):
+            for next_id in self._succ[result[i]]:
+                if next_id not in seen:
+                    seen.add(next_id)
+                    result.append(next_id)
+            i += 1
+        return result
+
+    # Phase 1: cycle breaking
+
+    def _break_cycles(self) -> None:
+        """Mark DFS back edges as reversed so the graph becomes acyclic"""
+        adjacency: Dict[str, List[str]] = {node_id: [] for node_id in self._insertion}
+        for source, target in self._edges:
+            adjacency[source].append(target)
+        for targets in adjacency.values():
+            targets.sort(key=self._insertion.get)
+
+        state: Dict[str, int] = {}  # 1 = on stack, 2 = done
+        for root in self._insertion:
+            if root in state:
+                continue
+            state[root] = 1
+            stack = [(root, iter(adjacency[root]))]
+            while stack:
+                node_id, children = stack[-1]
+                advanced = False
+                for child in children:
+                    child_state = state.get(child)
+                    if child_state == 1:
+                        self._reversed.add((node_id, child))
+                    elif child_state is None:
+                        state[child] = 1
+                        stack.append((child, iter(adjacency[child])))
+                        advanced = True
+                        break
+                if not advanced:
+                    state[node_id] = 2
+                    stack.pop()
+
+    # Phase 2: layering
+
+    def _assign_layers(self, node_ids: List[str]) -> None:
+        """
+        Longest-path layering for `node_ids` (Kahn's algorithm). Predecessors
+        outside the set keep their current layer.
+        """
+        members = set(node_ids)
+        indegree = {node_id: 0 for node_id in node_ids}
+        for node_id in node_ids:
+            for pred_id in self._pred[node_id]:
+                if pred_id in members:
+                    indegree[node_id] += 1
+
+        ready = [node_id for node_id in node_ids if indegree[node_id] == 0]
+        while ready:
+            node_id = ready.pop()
+            depth = 0
+            for pred_id in self._pred[node_id]:
+                depth = max(depth, self.layer[pred_id] + 1)
+            self.layer[node_id] = depth
+            for next_id in self._succ[node_id]:
+                if next_id in members:
+                    indegree[next_id] -= 1
+                    if indegree[next_id] == 0:
+                        ready.append(next_id)
+
+    def _place(self, node_id: str, depth: int) -> None:
+        """Append a node to its layer"""
+        while len(self.layers) <= depth:
+            self.layers.append([])
+        self.layers[depth].append(node_id)
+
+    # Phase 3: crossing minimization
+
+    def _reindex(self, depths: Iterable[int]) -> None:
+        for depth in depths:
+            for index, node_id in enumerate(self.layers[depth]):
+                self._index[node_id] = index
+
+    def _relative(self, node_id: str) -> float:
+        """Position within its layer scaled to [0, 1], comparable across layers"""
+        size = len(self.layers[self.layer[node_id]])
+        return (self._index[node_id] + 0.5) / size
+
+    def _minimize_crossings(self, depths: Iterable[int], sweeps: int) -> None:
+        """Alternate downward (by predecessors) and upward (by successors) barycenter sweeps"""
+        depths = list(depths)
+        for _ in range(sweeps):
+            for depth in depths:
+                self._order_layer(depth, self._pred)
+            for depth in reversed(depths):
+                self._order_layer(depth, self._succ)
+
+    def _order_layer(self, depth: int, neighbours: Dict[str, Set[str]]) -> None:
+        members = self.layers[depth]
+        if len(members) < 2:
+            return
+        keys: Dict[str, Tuple[float, int]] = {}
+        for node_id in members:
+            adjacent = neighbours[node_id]
+            if adjacent:
+                barycenter = sum(self._relative(other) for other in adjacent) / len(adjacent)
+            else:
+                barycenter = self._relative(node_id)
+            keys[node_id] = (barycenter, self._index[node_id])
+        members.sort(key=keys.__getitem__)
+        self._reindex([depth])
+
+
+def layout_positions(
+    node_ids: Iterable[str],
+    edges: Iterable[Edge],
+    layout: Optional[LayeredLayout] = None
+) -> Dict[str, Position]:
+    """One-shot layout of a graph"""
+    return (layout or LayeredLayout()).layout(node_ids, edges)
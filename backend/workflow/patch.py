@@ -0,0 +1,111 @@
+"""
+Workflow Patch
+JSON Patch (RFC 6902) deltas between two versions of a blueprint. The steps,
+nodes and edges arrays are matched by "id" and changed items are diffed
+field by field, so a one-step edit costs a handful of small operations.
+"""
+import copy
+from typing import Any, Dict, List, Tuple
+
+from schemas.workflow import WorkflowBlueprint
+
+
+# Blueprint arrays whose items are matched by their "id" field
+COLLECTIONS = ("steps", "nodes", "edges")
+
+
+def diff_blueprints(old: WorkflowBlueprint, new: WorkflowBlueprint) -> List[Dict[str, Any]]:
+    """
+    Operations that turn `old` into `new`, up to array order: surviving
+    items keep their old order and added items follow in their new order.
+    """
+    old_document = old.model_dump()
+    new_document = new.model_dump()
+    ops: List[Dict[str, Any]] = []
+    for field in ("workflow_id", "goal"):
+        if old_document[field] != new_document[field]:
+            ops.append({"op": "replace", "path": f"/{field}", "value": new_document[field]})
+    for name in COLLECTIONS:
+        ops.extend(_diff_collection(name, old_document[name], new_document[name]))
+    return ops
+
+
+def apply_patch(document: Dict[str, Any], ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply add/remove/replace operations to a copy of a JSON document"""
+    result = copy.deepcopy(document)
+    for op in ops:
+        parent, key = _resolve(result, op["path"])
+        if op["op"] == "remove":
+            del parent[key]
+        elif op["op"] == "add":
+            if isinstance(parent, list):
+                parent.insert(len(parent) if key == "-" else key, copy.deepcopy(op["value"]))
+            else:
+                parent[key] = copy.deepcopy(op["value"])
+        elif op["op"] == "replace":
+            parent[key] = copy.deepcopy(op["value"])
+        else:
+            raise ValueError(f"Unsupported patch operation: {op['op']}")
+    return result
+
+
+def patch_blueprint(blueprint: WorkflowBlueprint, ops: List[Dict[str, Any]]) -> WorkflowBlueprint:
+    """
+    The blueprint a client holding `blueprint` gets by applying `ops`.
+    Store this version so its ETag matches theirs.
+    """
+    return WorkflowBlueprint.model_validate(apply_patch(blueprint.model_dump(), ops))
+
+
+def _diff_collection(
+    name: str,
+    old_items: List[Dict[str, Any]],
+    new_items: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    new_by_id = {item["id"]: item for item in new_items}
+    old_ids = {item["id"] for item in old_items}
+    ops: List[Dict[str, Any]] = []
+
+    # Removals from the back so earlier indices stay valid
+    for index in range(len(old_items) - 1, -1, -1):
+        if old_items[index]["id"] not in new_by_id:
+            ops.append({"op": "remove", "path": f"/{name}/{index}"})
+
+    kept = [item for item in old_items if item["id"] in new_by_id]
+    for index, item in enumerate(kept):
+        ops.extend(_diff_fields(f"/{name}/{index}", item, new_by_id[item["id"]]))
+
+    for item in new_items:
+        if item["id"] not in old_ids:
+            ops.append({"op": "add", "path": f"/{name}/-", "value": item})
+    return ops
+
+
+def _diff_fields(path: str, old: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    ops = []
+    for key, value in new.items():
+        pointer = f"{path}/{_escape(key)}"
+        if key not in old:
+            ops.append({"op": "add", "path": pointer, "value": value})
+        elif old[key] != value:
+            ops.append({"op": "replace", "path": pointer, "value": value})
+    for key in old:
+        if key not in new:
+            ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+    return ops
+
+
+def _escape(key: str) -> str:
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def _resolve(document: Any, pointer: str) -> Tuple[Any, Any]:
+    """Container and key/index addressed by the last token of a JSON pointer"""
+    tokens = [token.replace("~1", "/").replace("~0", "~") for token in pointer.split("/")[1:]]
+    parent = document
+    for token in tokens[:-1]:
+        parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+    last = tokens[-1]
+    if isinstance(parent, list) and last != "-":
+        return parent, int(last)
+    return parent, last
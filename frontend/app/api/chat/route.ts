@@ -66,7 +66,9 @@ Respond with only "goal" or "chat":`,
 // Workflow generation with streaming status updates
 async function* generateWorkflowWithStatus(
   goal: string,
-  apiKey: string | undefined
+  apiKey: string | undefined,
+  signal?: AbortSignal,
+  sessionId?: string
 ): AsyncGenerator<string | { type: 'status' | 'blueprint'; data: any }, void, unknown> {
   const useMockMode = process.env.MOCK_MODE === 'true' || !apiKey
   
@@ -196,31 +198,66 @@ async function* generateWorkflowWithStatus(
   }
   
   // Real API mode: Call Python backend for workflow generation
-  // For now, we'll call the backend and stream status updates
-  // TODO: In the future, we can integrate CrewAI directly or use a streaming backend
+  // The backend streams crew progress as server-sent events
   
   yield { type: 'status', data: 'Analyzing your goal...' }
   
+  const stageStatus: Record<string, string> = {
+    goal_analysis: 'Analyzing your goal...',
+    workflow_design: 'Designing workflow steps...',
+    blueprint: 'Generating workflow blueprint...',
+  }
+  
   try {
     const backendUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
-    const response = await fetch(`${backendUrl}/api/workflow/generate`, {
+    const response = await fetch(`${backendUrl}/api/workflow/generate/stream`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ goal, context: {} }),
+      headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+      body: JSON.stringify({ goal, context: {}, session_id: sessionId }),
+      // Abort the backend run when the browser goes away
+      signal,
     })
     
-    if (!response.ok) {
+    if (!response.ok || !response.body) {
       throw new Error(`Workflow generation failed: ${response.statusText}`)
     }
     
-    yield { type: 'status', data: 'Designing workflow steps...' }
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
     
-    const blueprint = await response.json()
-    
-    yield {
-      type: 'blueprint',
-      data: blueprint,
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      
+      // Events are separated by a blank line
+      let boundary = buffer.indexOf('\n\n')
+      while (boundary !== -1) {
+        const rawEvent = buffer.slice(0, boundary)
+        buffer = buffer.slice(boundary + 2)
+        boundary = buffer.indexOf('\n\n')
+        
+        let event = 'message'
+        let data = ''
+        for (const line of rawEvent.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7)
+          else if (line.startsWith('data: ')) data += line.slice(6)
+        }
+        const payload = data ? JSON.parse(data) : null
+        
+        if (event === 'stage' && payload?.status === 'started' && stageStatus[payload.stage]) {
+          yield { type: 'status', data: stageStatus[payload.stage] }
+        } else if (event === 'complete') {
+          yield { type: 'blueprint', data: payload }
+          return
+        } else if (event === 'error') {
+          throw new Error(payload?.detail || 'Workflow generation failed')
+        }
+      }
     }
+    
+    throw new Error('Workflow generation stream ended without a blueprint')
   } catch (error) {
     console.error('Workflow generation error:', error)
     throw error
@@ -230,12 +267,14 @@ async function* generateWorkflowWithStatus(
 export async function POST(req: NextRequest) {
   let messages: any[] = []
   let userGoal = ''
+  let sessionId: string | undefined
   
   try {
     console.log('[API /api/chat] Request received')
     const body = await req.json()
     console.log('[API /api/chat] Body parsed:', body)
     messages = body?.messages || []
+    sessionId = typeof body?.sessionId === 'string' ? body.sessionId : undefined
     console.log('[API /api/chat] Messages:', messages.length)
 
     // Get the last user message
@@ -271,7 +310,7 @@ export async function POST(req: NextRequest) {
               controller.enqueue(encoder.encode(confirmationChunk))
               
               // Stream workflow generation with status updates
-              for await (const update of generateWorkflowWithStatus(userGoal, apiKey)) {
+              for await (const update of generateWorkflowWithStatus(userGoal, apiKey, req.signal, sessionId)) {
                 if (update.type === 'status') {
                   // Stream status update as a text delta
                   const statusChunk = `0:"${update.data.replace(/\\/g, '\\\\').replace(/"/g, '\\"')}"\n`
@@ -340,7 +379,7 @@ export async function POST(req: NextRequest) {
       // Stream workflow generation
       // First, generate the workflow by calling the backend
       // Then stream status updates and final blueprint
-      const workflowGenerator = generateWorkflowWithStatus(userGoal, apiKey)
+      const workflowGenerator = generateWorkflowWithStatus(userGoal, apiKey, req.signal, sessionId)
       
       // Create a custom stream that combines status updates with AI response
       const encoder = new TextEncoder()
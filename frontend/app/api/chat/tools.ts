@@ -50,6 +50,7 @@ export const tools = {
         tool: z.string(),
         parameters: z.record(z.any()),
         next_step_id: z.string().nullable().optional(),
+        next_step_ids: z.array(z.string()).nullable().optional(),
       })).describe('Workflow steps array'),
     }),
   },
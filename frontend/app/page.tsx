@@ -19,10 +19,15 @@ export default function Home() {
   const [isGenerating, setIsGenerating] = useState(false)
   const [isChatStarted, setIsChatStarted] = useState(false)
 
+  // One backend session per page load: the backend keeps the conversation,
+  // so each workflow request only carries the newest message
+  const [sessionId] = useState(() => crypto.randomUUID())
+
   // Lift chat state to parent so it persists
   const chat = useChat({
     api: '/api/chat',
     id: 'main-chat',
+    body: { sessionId },
   })
 
   const handleBlueprintGenerated = (blueprintData: WorkflowBlueprintData) => {
@@ -10,6 +10,7 @@ export interface WorkflowStep {
   tool: string
   parameters: Record<string, any>
   next_step_id?: string | null
+  next_step_ids?: string[] | null
 }
 
 export interface WorkflowBlueprintData {